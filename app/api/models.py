@@ -16,16 +16,110 @@ class QueryResponse(BaseModel):
     response: str
     confidence: float
     documents_used: List[str]
+    # Prompt tokens with the retrieved chunks as they are and after context packing; None without an LLM call
+    prompt_tokens: Optional[Dict[str, int]] = None
+    cache_hit: bool = False  # Served from the semantic answer cache
+    timings: Dict[str, float] = {}  # Per-stage wall-clock time in milliseconds
+
+
+class BatchQueryRequest(BaseModel):
+    """Request model for batch query endpoint"""
+    queries: List[str]
+
+
+class BatchQueryResult(BaseModel):
+    """One result of the batch query endpoint: the query response fields, or an error"""
+    query: str
+    success: bool
+    error: Optional[str] = None
+    intent: Optional[str] = None
+    slots: Optional[Dict[str, str]] = None
+    is_out_of_scope: Optional[bool] = None
+    response: Optional[str] = None
+    confidence: Optional[float] = None
+    documents_used: Optional[List[str]] = None
+    prompt_tokens: Optional[Dict[str, int]] = None
+    cache_hit: bool = False
+    timings: Dict[str, float] = {}
+
+
+class BatchQueryResponse(BaseModel):
+    """Response model for batch query endpoint"""
+    results: List[BatchQueryResult]  # In the order of the queries
+    errors: int
+    timings: Dict[str, float] = {}  # Batch stage wall-clock times in milliseconds
+
+
+class DeleteResponse(BaseModel):
+    """Response model for document deletion endpoint"""
+    message: str
+    chunks_removed: int
+    document_count: int
+    success: bool
+
+
+class CatalogEntry(BaseModel):
+    """One indexed file in the document catalog"""
+    file_path: str
+    chunks: int
+    bytes: Optional[int]  # None for files indexed before the catalog existed
+    sha256: Optional[str]
+    indexed_at: Optional[float]  # Unix time
 
 
 class DocumentInfo(BaseModel):
     """Response model for document info endpoint"""
-    document_count: int
-    document_names: List[str]
+    document_count: int  # Chunks in the store
+    file_count: int
+    document_names: List[str]  # File names of this page
+    files: List[CatalogEntry]
+    offset: int
+    limit: int
 
 
 class UploadResponse(BaseModel):
     """Response model for document upload endpoint"""
     message: str
     document_count: int
-    success: bool
\ No newline at end of file
+    success: bool
+    job_id: str  # Poll GET /api/jobs/{job_id} for indexing progress
+    priority: str
+
+
+class BulkUploadResponse(BaseModel):
+    """Response model for bulk upload endpoint"""
+    message: str
+    files: List[str]
+    job_id: str
+    priority: str
+    success: bool
+
+
+class JobStatus(BaseModel):
+    """Response model for ingestion job status endpoint"""
+    job_id: str
+    filename: str
+    state: str  # queued, running, completed or failed
+    priority: str
+    total_bytes: int
+    bytes_read: int
+    percent: float
+    documents: int
+    segments: int
+    embedding_batches: int
+    chunks_indexed: int
+    chunks_skipped: int  # Unchanged chunks whose embedding was reused
+    chunks_removed: int  # Chunks of the previous version of the file that went away
+    elapsed_seconds: Optional[float]
+    documents_per_second: Optional[float]
+    chunks_per_second: Optional[float]
+    bytes_per_second: Optional[float]
+    queued_seconds: float
+    error: Optional[str]
+
+
+class ReadinessStatus(BaseModel):
+    """Response model for readiness endpoint"""
+    ready: bool
+    warmup_seconds: Optional[float]
+    error: Optional[str]
@@ -1,127 +1,283 @@
-import os
-from pathlib import Path
-from typing import Dict, List, Any
+import json
+import time
+from contextlib import AsyncExitStack
+from typing import AsyncIterator, Dict, List, Any, Literal, Optional
 
-from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
-from fastapi.responses import JSONResponse
-from app.api.models import QueryRequest, QueryResponse, DocumentInfo, UploadResponse
+from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.api.models import (
+    QueryRequest, QueryResponse, BatchQueryRequest, BatchQueryResponse, DocumentInfo, UploadResponse,
+    BulkUploadResponse, JobStatus, DeleteResponse, ReadinessStatus
+)
+from utils.concurrency import ConcurrencyLimitExceeded, query_slot, run_in_executor
 from utils.config import settings
-from utils.logging import logger, log_qa_to_file
-from service.intent_processor import intent_service
-from service.rag_service import rag_service
-from service.response_generator import ResponseGeneratorService
+from utils.logging import logger
+from utils.metrics import INGESTION_STAGE_SECONDS, QUERY_ERRORS
+from service.providers import (
+    get_ingestion_queue, get_query_service, get_rag_service, get_traffic_capture, get_warmup_service
+)
 
 # Initialize router
 router = APIRouter(prefix="/api", tags=["Document Chatbot"])
 
-# Initialize response generator
-response_generator_service = ResponseGeneratorService(settings.SCHEMA_PATH)
-
 
 @router.post("/query", response_model=QueryResponse)
-async def query_endpoint(request: QueryRequest) -> Dict[str, Any]:
+async def query_endpoint(request: QueryRequest, query_service: Any = Depends(get_query_service)) -> Dict[str, Any]:
 
+    if settings.CAPTURE_ENABLED:
+        get_traffic_capture().record("/api/query", [request.query])
     try:
-        query = request.query
-        logger.info(f"Processing query: '{query}'")
-
-        # Step 1: Process intent and slots
-        intent_result = intent_service.process_intent(query=query)
-        intent = intent_result["intent"]
-        slots = intent_result["slots"]
-        is_out_of_scope = intent_result["is_out_of_scope"]
-        missing_required_slots = intent_result["missing_required_slots"]
-        confidence = intent_result["confidence"]
-
-        # Step 2: Enhance retrieval query with slot values
-        retrieval_query = query
-        if "topic" in slots:
-            retrieval_query = f"{query} {slots['topic']}"
-        if "term" in slots:
-            retrieval_query = f"{query} {slots['term']}"
-        if "section" in slots:
-            retrieval_query = f"{query} {slots['section']}"
-
-        # Step 3: Retrieve relevant documents
-        documents = []
-        if not is_out_of_scope:
-            qa_result = rag_service.get_answer(query=query, enhanced_query=retrieval_query)
-            if qa_result["success"]:
-                documents = qa_result["documents"]
-
-        # Step 4: Generate response
-        response_result = response_generator_service.generate_response(
-            query=query,
-            documents=documents,
-            intent=intent,
-            slots=slots,
-            is_out_of_scope=is_out_of_scope,
-            missing_required_slots=missing_required_slots,
-            confidence=confidence
-        )
-
-        # Step 5: Log question and answer to file
-        log_qa_to_file(query, response_result["response"])
-
-        # Return the response
-        return {
-            "query": query,
-            "intent": intent,
-            "slots": slots,
-            "is_out_of_scope": is_out_of_scope,
-            "response": response_result["response"],
-            "confidence": confidence,
-            "documents_used": [doc.content for doc in documents]
-        }
+        async with query_slot():
+            return await query_service.answer(request.query)
+    except ConcurrencyLimitExceeded as e:
+        logger.warning(f"Rejecting query: {str(e)}")
+        QUERY_ERRORS.inc(endpoint="query", reason="overloaded")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing query: {str(e)}")
+        QUERY_ERRORS.inc(endpoint="query", reason="error")
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
 
 
-@router.post("/upload", response_model=UploadResponse)
-async def upload_document(file: UploadFile = File(...)) -> Dict[str, Any]:
+@router.post("/query/batch", response_model=BatchQueryResponse)
+async def query_batch_endpoint(request: BatchQueryRequest,
+                               query_service: Any = Depends(get_query_service)) -> Dict[str, Any]:
+
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="No queries given")
+    if len(request.queries) > settings.BATCH_QUERY_MAX_SIZE:
+        raise HTTPException(status_code=400,
+                            detail=f"At most {settings.BATCH_QUERY_MAX_SIZE} queries per batch")
+    if settings.CAPTURE_ENABLED:
+        get_traffic_capture().record("/api/query/batch", request.queries)
 
     try:
-        if not file.filename.endswith(".txt"):
-            raise HTTPException(status_code=400, detail="Only .txt files are supported")
+        async with query_slot():
+            return await query_service.answer_batch(request.queries)
+    except ConcurrencyLimitExceeded as e:
+        logger.warning(f"Rejecting batch query: {str(e)}")
+        QUERY_ERRORS.inc(endpoint="batch", reason="overloaded")
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        QUERY_ERRORS.inc(endpoint="batch", reason="error")
+        logger.error(f"Error processing batch query: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing batch query: {str(e)}")
+
 
-        temp_file_path = f"temp_{file.filename}"
-        with open(temp_file_path, "wb") as temp_file:
-            content = await file.read()
-            temp_file.write(content)
+def _sse(event: str, data: Any) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-        index_result = rag_service.index_document(Path(temp_file_path))
-        os.remove(temp_file_path)
 
-        if not index_result["success"]:
-            raise HTTPException(status_code=500,
-                                detail=f"Error indexing document: {index_result.get('error', 'Unknown error')}")
+@router.post("/query/stream")
+async def query_stream_endpoint(request: QueryRequest,
+                                query_service: Any = Depends(get_query_service)) -> StreamingResponse:
+
+    if settings.CAPTURE_ENABLED:
+        get_traffic_capture().record("/api/query/stream", [request.query])
+    # Take the query slot before the response starts so overload is still a plain 503
+    slot = AsyncExitStack()
+    try:
+        await slot.enter_async_context(query_slot())
+    except ConcurrencyLimitExceeded as e:
+        logger.warning(f"Rejecting query: {str(e)}")
+        QUERY_ERRORS.inc(endpoint="stream", reason="overloaded")
+        raise HTTPException(status_code=503, detail=str(e))
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event in query_service.answer_stream(request.query):
+                yield _sse(event["event"], event["data"])
+        except Exception as e:
+            logger.error(f"Error processing streamed query: {str(e)}")
+            QUERY_ERRORS.inc(endpoint="stream", reason="error")
+            yield _sse("error", {"detail": f"Error processing query: {str(e)}"})
+        finally:
+            await slot.aclose()
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.post("/upload", response_model=UploadResponse, status_code=202)
+async def upload_document(request: Request, file: UploadFile = File(...),
+                          priority: Optional[Literal["high", "normal", "low"]] = None,
+                          ingestion_queue: Any = Depends(get_ingestion_queue),
+                          rag_service: Any = Depends(get_rag_service)) -> Dict[str, Any]:
+
+    spool_path = None
+    try:
+        if not file.filename.endswith(".txt"):
+            raise HTTPException(status_code=400, detail="Only .txt files are supported")
+
+        # Spool the upload to disk chunk by chunk; a background job indexes it
+        started = time.perf_counter()
+        spool_path = ingestion_queue.spool_path(file.filename)
+        with open(spool_path, "wb") as spool_file:
+            while data := await file.read(settings.UPLOAD_CHUNK_SIZE):
+                spool_file.write(data)
+        INGESTION_STAGE_SECONDS.observe(time.perf_counter() - started, stage="spool", kind="single")
+        job = ingestion_queue.submit(file.filename, spool_path, priority=priority,
+                                     profile=hasattr(request.state, "profile"))
 
         return {
-            "message": f"Document '{file.filename}' uploaded and indexed successfully",
-            "document_count": index_result["document_count"],
+            "message": f"Document '{file.filename}' uploaded and queued for indexing",
+            "document_count": rag_service.document_store.count_documents(),
+            "job_id": job.id,
+            "priority": job.priority,
             "success": True
         }
     except HTTPException as he:
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
         raise he
     except Exception as e:
         logger.error(f"Error processing upload: {str(e)}")
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
+        if spool_path is not None and spool_path.exists():
+            spool_path.unlink()
         raise HTTPException(status_code=500, detail=f"Error processing upload: {str(e)}")
 
 
-@router.get("/documents", response_model=DocumentInfo)
-async def get_documents() -> Dict[str, Any]:
+@router.post("/upload/bulk", response_model=BulkUploadResponse, status_code=202)
+async def upload_bulk(request: Request, files: List[UploadFile] = File(...),
+                      priority: Optional[Literal["high", "normal", "low"]] = None,
+                      ingestion_queue: Any = Depends(get_ingestion_queue)) -> Dict[str, Any]:
 
+    from service.bulk_ingestion import is_archive
+
+    spooled = []
     try:
-        doc_info = rag_service.get_document_info()
+        for file in files:
+            if not (file.filename.endswith(".txt") or is_archive(file.filename)):
+                raise HTTPException(status_code=400,
+                                    detail=f"'{file.filename}': only .txt files and zip/tar archives are supported")
+
+        # Spool every upload to disk; one background job indexes them all with pooled embedding batches
+        started = time.perf_counter()
+        for file in files:
+            spool_path = ingestion_queue.spool_path(file.filename)
+            spooled.append((file.filename, spool_path))
+            with open(spool_path, "wb") as spool_file:
+                while data := await file.read(settings.UPLOAD_CHUNK_SIZE):
+                    spool_file.write(data)
+        INGESTION_STAGE_SECONDS.observe(time.perf_counter() - started, stage="spool", kind="bulk")
+        job = ingestion_queue.submit_bulk(spooled, priority=priority, profile=hasattr(request.state, "profile"))
+
         return {
-            "document_count": doc_info["document_count"],
-            "document_names": doc_info["document_names"]
+            "message": f"{len(files)} files uploaded and queued for bulk indexing",
+            "files": [file.filename for file in files],
+            "job_id": job.id,
+            "priority": job.priority,
+            "success": True
         }
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Error processing bulk upload: {str(e)}")
+        for _, spool_path in spooled:
+            if spool_path.exists():
+                spool_path.unlink()
+        raise HTTPException(status_code=500, detail=f"Error processing bulk upload: {str(e)}")
+
+
+@router.put("/documents/{filename}", response_model=UploadResponse, status_code=202)
+async def replace_document(request: Request, filename: str, file: UploadFile = File(...),
+                           priority: Optional[Literal["high", "normal", "low"]] = None,
+                           ingestion_queue: Any = Depends(get_ingestion_queue),
+                           rag_service: Any = Depends(get_rag_service)) -> Dict[str, Any]:
+
+    spool_path = None
+    try:
+        if not filename.endswith(".txt"):
+            raise HTTPException(status_code=400, detail="Only .txt files are supported")
+
+        # Re-indexing under the same name embeds only changed chunks and drops the ones that went away
+        started = time.perf_counter()
+        spool_path = ingestion_queue.spool_path(filename)
+        with open(spool_path, "wb") as spool_file:
+            while data := await file.read(settings.UPLOAD_CHUNK_SIZE):
+                spool_file.write(data)
+        INGESTION_STAGE_SECONDS.observe(time.perf_counter() - started, stage="spool", kind="single")
+        job = ingestion_queue.submit(filename, spool_path, priority=priority,
+                                     profile=hasattr(request.state, "profile"))
+
+        return {
+            "message": f"Document '{filename}' uploaded and queued for re-indexing",
+            "document_count": rag_service.document_store.count_documents(),
+            "job_id": job.id,
+            "priority": job.priority,
+            "success": True
+        }
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Error replacing document: {str(e)}")
+        if spool_path is not None and spool_path.exists():
+            spool_path.unlink()
+        raise HTTPException(status_code=500, detail=f"Error replacing document: {str(e)}")
+
+
+@router.delete("/documents/{filename}", response_model=DeleteResponse)
+async def delete_document(filename: str, ingestion_queue: Any = Depends(get_ingestion_queue)) -> Dict[str, Any]:
+
+    # Through the ingestion queue, so it waits for a running re-index of the file and cancels queued ones
+    result = await ingestion_queue.delete_file(filename)
+    if not result["success"]:
+        raise HTTPException(status_code=500, detail=f"Error deleting document: {result.get('error', 'Unknown error')}")
+    if result["chunks_removed"] == 0 and result["jobs_cancelled"] == 0:
+        raise HTTPException(status_code=404, detail=f"Unknown document '{filename}'")
+
+    cancelled = f", {result['jobs_cancelled']} queued uploads cancelled" if result["jobs_cancelled"] else ""
+    return {
+        "message": f"Document '{filename}' deleted{cancelled}",
+        "chunks_removed": result["chunks_removed"],
+        "document_count": result["document_count"],
+        "success": True
+    }
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str, ingestion_queue: Any = Depends(get_ingestion_queue)) -> Dict[str, Any]:
+
+    job = ingestion_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'")
+    return job.to_dict()
+
+
+@router.get("/documents", response_model=DocumentInfo)
+async def get_documents(offset: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=1),
+                        rag_service: Any = Depends(get_rag_service)) -> Dict[str, Any]:
+
+    limit = limit or settings.DOCUMENT_PAGE_SIZE
+    if limit > settings.DOCUMENT_PAGE_MAX:
+        raise HTTPException(status_code=400, detail=f"limit must be at most {settings.DOCUMENT_PAGE_MAX}")
+
+    try:
+        # Served from the document catalog: no store scan, a page costs O(limit)
+        doc_info = rag_service.get_document_info(offset=offset, limit=limit)
+        if "error" in doc_info:
+            raise RuntimeError(doc_info["error"])
+        return doc_info
     except Exception as e:
         logger.error(f"Error retrieving documents: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error retrieving documents: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error retrieving documents: {str(e)}")
+
+
+@router.get("/ready", response_model=ReadinessStatus, responses={503: {"model": ReadinessStatus}})
+async def get_ready(warmup_service: Any = Depends(get_warmup_service)) -> Any:
+
+    # 503 until the startup warm-up has finished, so load balancers hold traffic back
+    status = warmup_service.get_status()
+    if not status["ready"]:
+        return JSONResponse(status_code=503, content=status)
+    return status
+
+
+@router.get("/stats")
+async def get_stats(query_service: Any = Depends(get_query_service),
+                    ingestion_queue: Any = Depends(get_ingestion_queue)) -> Dict[str, Any]:
+
+    try:
+        return {**query_service.get_stats(), "ingestion": ingestion_queue.get_stats()}
+    except Exception as e:
+        logger.error(f"Error retrieving stats: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving stats: {str(e)}")
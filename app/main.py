@@ -1,9 +1,14 @@
-from fastapi import FastAPI
+import asyncio
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.routes import router as api_router
+from app.middleware import ProfilingMiddleware
+from service.providers import get_ingestion_queue, get_qa_log, get_traffic_capture, get_warmup_service
 from utils.config import settings
 from utils.logging import logger
+from utils.metrics import CONTENT_TYPE, registry
 
 
 def create_application() -> FastAPI:
@@ -23,18 +28,45 @@ def create_application() -> FastAPI:
         allow_headers=["*"],
     )
 
+    if settings.PROFILING_ENABLED:
+        application.add_middleware(
+            ProfilingMiddleware,
+            paths=settings.PROFILE_PATHS,
+            header=settings.PROFILE_HEADER,
+            sample_rate=settings.PROFILE_SAMPLE_RATE
+        )
+
     # Include API routes
     application.include_router(api_router)
 
+    if settings.METRICS_ENABLED:
+        @application.get("/metrics", include_in_schema=False)
+        async def metrics() -> Response:
+            """Prometheus scrape endpoint"""
+            return Response(registry.render(), media_type=CONTENT_TYPE)
+
     # Add startup event
     @application.on_event("startup")
     async def startup_event():
         logger.info("Starting application...")
+        get_ingestion_queue().start()
+        if settings.WARMUP_ON_STARTUP:
+            # Services are built and warmed up in the background, so the server accepts connections
+            # (and answers /api/ready) meanwhile
+            application.state.warmup_task = asyncio.create_task(get_warmup_service().run())
+        else:
+            get_warmup_service().ready = True
 
     # Add shutdown event
     @application.on_event("shutdown")
     async def shutdown_event():
         logger.info("Shutting down application...")
+        await get_ingestion_queue().stop()
+        # Write the records still queued
+        if get_qa_log.is_built:
+            get_qa_log().close()
+        if get_traffic_capture.is_built:
+            get_traffic_capture().close()
 
     return application
 
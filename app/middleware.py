@@ -0,0 +1,69 @@
+import random
+import time
+from typing import Sequence
+
+from utils.concurrency import run_in_executor
+from utils.config import settings
+from utils.logging import logger
+from utils.profiling import SamplingProfiler, profile_name, write_profile
+
+
+class ProfilingMiddleware:
+    """
+    Profile requests to selected paths on demand and store their folded stacks in PROFILE_DIR
+
+    A request is profiled when it sends the profile header with a non-empty value other than "0", or
+    with probability `sample_rate`. The profile covers the whole request including a streamed response
+    body, and its file name is returned in the `X-Profile-File` response header. Routes can read
+    `request.state.profile` to profile work they hand off (e.g. the ingestion job of an upload).
+
+    Only added to the app when PROFILING_ENABLED is set, so requests pay nothing otherwise.
+    """
+
+    def __init__(self, app, paths: Sequence[str], header: str, sample_rate: float = 0.0):
+        """
+        Initialize the middleware
+
+        Args:
+            app: The wrapped ASGI app
+            paths: Path prefixes that may be profiled
+            header: Request header asking for a profile
+            sample_rate: Fraction of requests to the paths profiled without the header
+        """
+        self.app = app
+        self.paths = tuple(paths)
+        self.header = header.lower().encode("latin-1")
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        name = profile_name(f"{scope['method']} {scope['path']}")
+        scope.setdefault("state", {})["profile"] = name
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-file", name.encode("latin-1"))]
+            await send(message)
+
+        profiler = SamplingProfiler(settings.PROFILE_INTERVAL)
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            stacks = profiler.stop()
+            path = await run_in_executor(write_profile, settings.PROFILE_DIR, name, stacks, settings.PROFILE_MAX_FILES)
+            logger.info(f"Profiled {scope['method']} {scope['path']} "
+                        f"({(time.perf_counter() - started) * 1000:.1f} ms, {profiler.samples} samples): {path}")
+
+    def _wanted(self, scope) -> bool:
+        if not scope["path"].startswith(self.paths):
+            return False
+        for key, value in scope["headers"]:
+            if key == self.header:
+                return value not in (b"", b"0")
+        return self.sample_rate > 0 and random.random() < self.sample_rate
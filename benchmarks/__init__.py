@@ -0,0 +1,4 @@
+import os
+
+# Benchmarks must not depend on (or be slowed down by) outbound telemetry
+os.environ.setdefault("HAYSTACK_TELEMETRY_ENABLED", "False")
@@ -0,0 +1,157 @@
+"""
+Recall@k and latency of the IVF ANN index against exact retrieval on synthetic corpora.
+
+Corpora are clustered random 384-dim unit vectors (like all-MiniLM-L6-v2 chunk embeddings); queries are
+perturbed corpus vectors. Exact brute-force search defines the ground truth. Haystack's
+InMemoryEmbeddingRetriever, the retriever used by default, is also timed up to --haystack-max chunks, and
+the MatrixDocumentStore exact search, single and batched, on every size. ANNEmbeddingRetriever, the IVF
+index over that store as the retrieval pipeline runs it, is timed without filters, with a metadata filter
+(which falls back to the store's exact search) and after a tenth of the chunks were deleted from the
+store but not from the index (it then returns fewer than top_k documents).
+
+Usage:
+    python -m benchmarks.ann_retrieval --sizes 10000 100000 1000000 --nprobe 4 8 16 32
+"""
+import argparse
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from haystack.components.retrievers.in_memory import InMemoryEmbeddingRetriever
+from haystack.dataclasses import Document
+from haystack.document_stores.in_memory import InMemoryDocumentStore
+
+from benchmarks.stubs import EMBEDDING_DIM
+from service.ann_index import ANNEmbeddingRetriever, IVFIndex
+from service.matrix_store import MatrixDocumentStore
+
+
+def synthetic_corpus(size: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    centers = rng.standard_normal((clusters, EMBEDDING_DIM)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, size)] + 0.6 * rng.standard_normal((size, EMBEDDING_DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def latency_stats(search: Callable[[np.ndarray], List[str]], queries: np.ndarray) -> Dict[str, float]:
+    latencies = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(search(query))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {"p50_ms": float(np.percentile(latencies, 50)), "p99_ms": float(np.percentile(latencies, 99)),
+            "results": results}
+
+
+def write_in_batches(store: MatrixDocumentStore, ids: List[str], corpus: np.ndarray,
+                     metas: Optional[List[Dict[str, Any]]] = None):
+    """Write the corpus in pipeline-sized batches so no full list of Documents is alive at once"""
+    for start in range(0, len(ids), 1000):
+        store.write_documents([
+            Document(id=ids[i], content="", meta=metas[i] if metas is not None else {}, embedding=corpus[i].tolist())
+            for i in range(start, min(start + 1000, len(ids)))
+        ])
+
+
+def recall(results: List[List[str]], truth: List[List[str]]) -> float:
+    return float(np.mean([len(set(r) & set(t)) / len(t) for r, t in zip(results, truth)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--haystack-max", type=int, default=100_000,
+                        help="Largest corpus on which InMemoryEmbeddingRetriever is timed")
+    parser.add_argument("--filtered-queries", type=int, default=5,
+                        help="Queries timed with a metadata filter (a Python scan of the store)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    print(f"{'chunks':>9} {'retriever':<24}{'recall@' + str(args.top_k):>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for size in args.sizes:
+        corpus = synthetic_corpus(size, clusters=max(16, size // 1000), rng=rng)
+        ids = [str(i) for i in range(size)]
+        picks = rng.integers(0, size, args.queries)
+        queries = corpus[picks] + 0.3 * rng.standard_normal((args.queries, EMBEDDING_DIM)).astype(np.float32)
+
+        def exact_search(query: np.ndarray) -> List[str]:
+            scores = corpus @ query
+            best = np.argpartition(-scores, args.top_k - 1)[:args.top_k]
+            return [ids[i] for i in best[np.argsort(-scores[best])]]
+
+        exact = latency_stats(exact_search, queries)
+        truth = exact["results"]
+        print(f"{size:>9} {'exact (numpy scan)':<24}{1.0:>10.3f}{exact['p50_ms']:>10.2f}{exact['p99_ms']:>10.2f}")
+
+        if size <= args.haystack_max:
+            store = InMemoryDocumentStore()
+            store.write_documents([Document(id=ids[i], content="", embedding=corpus[i].tolist()) for i in range(size)])
+            retriever = InMemoryEmbeddingRetriever(document_store=store, top_k=args.top_k)
+            haystack = latency_stats(
+                lambda q: [doc.id for doc in retriever.run(query_embedding=q.tolist())["documents"]], queries[:20]
+            )
+            print(f"{size:>9} {'InMemoryEmbeddingRetriever':<24}{recall(haystack['results'], truth[:20]):>10.3f}"
+                  f"{haystack['p50_ms']:>10.2f}{haystack['p99_ms']:>10.2f}")
+            del store, retriever
+
+        store = MatrixDocumentStore()
+        write_in_batches(store, ids, corpus, [{"file_path": f"file{i % 100}.txt"} for i in range(size)])
+        matrix = latency_stats(
+            lambda q: [doc.id for doc in store.embedding_retrieval(q, top_k=args.top_k)], queries
+        )
+        print(f"{size:>9} {'matrix store':<24}{recall(matrix['results'], truth):>10.3f}"
+              f"{matrix['p50_ms']:>10.2f}{matrix['p99_ms']:>10.2f}")
+        start = time.perf_counter()
+        batched = store.embedding_retrieval_batch(queries, top_k=args.top_k)
+        per_query_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        print(f"{size:>9} {'matrix store, batched':<24}"
+              f"{recall([[doc.id for doc in docs] for docs in batched], truth):>10.3f}{per_query_ms:>10.2f}{'':>10}")
+
+        start = time.perf_counter()
+        index = IVFIndex()
+        for batch_start in range(0, size, 10_000):  # incremental inserts, as from the indexing pipeline
+            index.add(ids[batch_start:batch_start + 10_000], corpus[batch_start:batch_start + 10_000])
+        build_s = time.perf_counter() - start
+
+        for nprobe in args.nprobe:
+            ivf = latency_stats(lambda q: [doc_id for doc_id, _ in index.search(q, args.top_k, nprobe=nprobe)],
+                                queries)
+            print(f"{size:>9} {'ivf nprobe=' + str(nprobe):<24}{recall(ivf['results'], truth):>10.3f}"
+                  f"{ivf['p50_ms']:>10.2f}{ivf['p99_ms']:>10.2f}")
+        print(f"{size:>9} ivf build time {build_s:.1f}s ({len(index._lists)} lists)")
+
+        retriever = ANNEmbeddingRetriever(document_store=store, index=index, top_k=args.top_k)
+        ann = latency_stats(lambda q: [doc.id for doc in retriever.run(query_embedding=q.tolist())["documents"]],
+                            queries)
+        print(f"{size:>9} {'ANN retriever':<24}{recall(ann['results'], truth):>10.3f}"
+              f"{ann['p50_ms']:>10.2f}{ann['p99_ms']:>10.2f}")
+
+        # A filter is applied by the store's exact search, so it is compared with an exact scan of that file
+        filters = {"field": "meta.file_path", "operator": "==", "value": "file0.txt"}
+        in_file = np.arange(0, size, 100)
+        filtered_truth = [[ids[in_file[i]] for i in np.argsort(-(corpus[in_file] @ query))[:args.top_k]]
+                          for query in queries[:args.filtered_queries]]
+        filtered = latency_stats(
+            lambda q: [doc.id for doc in retriever.run(query_embedding=q.tolist(), filters=filters)["documents"]],
+            queries[:args.filtered_queries]
+        )
+        print(f"{size:>9} {'ANN retriever, filtered':<24}{recall(filtered['results'], filtered_truth):>10.3f}"
+              f"{filtered['p50_ms']:>10.2f}{filtered['p99_ms']:>10.2f}")
+
+        # Chunks deleted from the store but still in the index are dropped from the results
+        deleted = set(ids[::10])
+        store.delete_documents(list(deleted))
+        stale = latency_stats(lambda q: [doc.id for doc in retriever.run(query_embedding=q.tolist())["documents"]],
+                              queries)
+        returned = np.mean([len(result) for result in stale["results"]])
+        print(f"{size:>9} {'ANN retriever, stale ids':<24}{recall(stale['results'], truth):>10.3f}"
+              f"{stale['p50_ms']:>10.2f}{stale['p99_ms']:>10.2f}  ({returned:.2f} of {args.top_k} returned, "
+              f"{np.mean([len(set(t) & deleted) for t in truth]):.2f} of the true top {args.top_k} deleted)")
+        del store, retriever, index
+
+
+if __name__ == "__main__":
+    main()
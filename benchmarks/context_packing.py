@@ -0,0 +1,74 @@
+"""
+Prompt tokens and LLM time with and without context packing.
+
+banana.txt is indexed with the stub embedders; for every query and top-k the answer prompt is built
+from the retrieved chunks as they are and packed (overlapping chunks merged, repeated sentences
+dropped, per-intent token budget). The stub LLM charges prefill time per prompt token, so the
+latency column shows what the saved tokens are worth at --prefill-tokens-per-second.
+
+Usage:
+    python -m benchmarks.context_packing --top-k 3 5 10 --budget 1000
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+from benchmarks.query_llm_calls import QUERIES, StubRAGService
+from benchmarks.stubs import StubChatGenerator
+from service.context_packer import ContextPacker
+from service.response_generator import IntentBasedResponseGenerator
+from utils.config import settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--top-k", type=int, nargs="+", default=[3, 5, 10])
+    parser.add_argument("--budget", type=int, default=settings.CONTEXT_TOKEN_BUDGET,
+                        help="Context token budget of the document_query intent")
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=5000.0,
+                        help="Stub LLM prompt processing rate")
+    parser.add_argument("--split-by", default=settings.SPLIT_BY,
+                        help="Splitter unit; 'period' needs no NLTK data")
+    args = parser.parse_args()
+
+    settings.SPLIT_BY = args.split_by
+    llm = StubChatGenerator(latency=0.0)
+    rag = StubRAGService(llm)
+    indexed = rag.index_document(settings.BASE_DIR / "banana.txt")
+    if not indexed["success"]:
+        sys.exit(f"Indexing banana.txt failed: {indexed.get('error')}")
+    slots = {"topic": "banana"}
+
+    print(f"{'top-k':>6}{'prompt tok':>12}{'packed tok':>12}{'saved':>8}{'passages':>10}"
+          f"{'LLM ms':>9}{'packed ms':>11}")
+    for top_k in args.top_k:
+        rag.retrieval_pipeline.get_component("retriever").top_k = top_k
+        plain = IntentBasedResponseGenerator({}, llm)
+        packed = IntentBasedResponseGenerator({}, llm, ContextPacker(args.budget))
+        rows = []
+        for query in QUERIES:
+            documents = rag.retrieve(query)["documents"]
+            row = {}
+            for name, generator in (("plain", plain), ("packed", packed)):
+                messages, prompt_tokens = generator._build_messages(query, documents, "document_query", slots)
+                row[name] = prompt_tokens["after"]
+                # Prefill cost of the prompt on the stub LLM
+                llm.latency = row[name] / args.prefill_tokens_per_second
+                started = time.perf_counter()
+                asyncio.run(llm.run_async(messages=messages))
+                row[f"{name}_ms"] = (time.perf_counter() - started) * 1000
+            row["passages"] = len(packed.packer.pack(documents, "document_query").passages)
+            rows.append(row)
+
+        before = statistics.mean(row["plain"] for row in rows)
+        after = statistics.mean(row["packed"] for row in rows)
+        print(f"{top_k:>6}{before:>12.0f}{after:>12.0f}{1 - after / before:>8.0%}"
+              f"{statistics.mean(row['passages'] for row in rows):>10.1f}"
+              f"{statistics.mean(row['plain_ms'] for row in rows):>9.1f}"
+              f"{statistics.mean(row['packed_ms'] for row in rows):>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
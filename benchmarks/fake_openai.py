@@ -0,0 +1,167 @@
+"""
+Local stand-in for the OpenRouter (OpenAI-compatible) chat completions API.
+
+Answers POST /v1/chat/completions after a configurable time to first token and then produces
+completion tokens at a configurable rate, with or without `"stream": true`. Intent classification
+prompts get a JSON intent reply so the intent processor parses them as it would a real model's;
+every other prompt gets a canned answer of --completion-tokens words. Point the app at it with
+`settings.OPENROUTER_BASE_URL = "http://127.0.0.1:8081/v1"`.
+
+Usage:
+    python -m benchmarks.fake_openai --port 8081 --latency 0.3 --tokens-per-second 60
+"""
+import argparse
+import asyncio
+import json
+import re
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Tuple
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+INTENT_PROMPT_PREFIX = "You are an NLU system"
+ANSWER_WORDS = ("Bananas", "grow", "best", "in", "well", "drained", "fertile", "soil", "with", "regular",
+                "irrigation", "and", "the", "document", "describes", "yields", "varieties", "spacing")
+
+
+def _intent_reply(query: str) -> str:
+    words = re.findall(r"\w+", query.lower())
+    topic = words[-1] if words else "banana"
+    return json.dumps({"intent": "document_query", "slots": {"topic": topic}, "is_out_of_scope": False,
+                       "confidence": 0.9})
+
+
+def _answer_reply(tokens: int) -> str:
+    return " ".join(ANSWER_WORDS[i % len(ANSWER_WORDS)] for i in range(tokens)) + "."
+
+
+def create_app(latency: float = 0.3, tokens_per_second: float = 60.0, completion_tokens: int = 120) -> FastAPI:
+    """
+    Build the fake API
+
+    Args:
+        latency: Seconds before the first token
+        tokens_per_second: Completion token rate; 0 returns the whole completion at once
+        completion_tokens: Words in an answer (intent replies are one short JSON object)
+
+    Returns:
+        The FastAPI app; `app.state.calls` counts completions served
+    """
+    app = FastAPI(title="Fake OpenAI-compatible API")
+    app.state.calls = 0
+
+    def reply_for(messages: List[Dict[str, Any]]) -> Tuple[str, int]:
+        system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+        if isinstance(system, str) and system.startswith(INTENT_PROMPT_PREFIX):
+            user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+            text = _intent_reply(user if isinstance(user, str) else "")
+        else:
+            text = _answer_reply(completion_tokens)
+        return text, len(text.split())
+
+    def usage(messages: List[Dict[str, Any]], completion: int) -> Dict[str, int]:
+        prompt = sum(len(str(m.get("content") or "").split()) for m in messages)
+        return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "fake-model", "object": "model", "owned_by": "benchmarks"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.calls += 1
+        messages = body.get("messages", [])
+        model = body.get("model", "fake-model")
+        text, tokens = reply_for(messages)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        if not body.get("stream"):
+            await asyncio.sleep(latency + (tokens / tokens_per_second if tokens_per_second else 0.0))
+            return JSONResponse({
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                             "finish_reason": "stop"}],
+                "usage": usage(messages, tokens)
+            })
+
+        async def events():
+            def chunk(delta: Dict[str, Any], finish_reason=None, **extra) -> str:
+                payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                           "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                           **extra}
+                return f"data: {json.dumps(payload)}\n\n"
+
+            await asyncio.sleep(latency)
+            yield chunk({"role": "assistant", "content": ""})
+            pieces = re.findall(r"\S+\s*", text)
+            for piece in pieces:
+                yield chunk({"content": piece})
+                if tokens_per_second:
+                    await asyncio.sleep(1 / tokens_per_second)
+            yield chunk({}, "stop")
+            if (body.get("stream_options") or {}).get("include_usage"):
+                payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                           "model": model, "choices": [], "usage": usage(messages, tokens)}
+                yield f"data: {json.dumps(payload)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class ServerThread:
+    """Run an ASGI app with uvicorn on a background thread (own event loop) for the benchmarks"""
+
+    def __init__(self, app: Any, port: int = 0):
+        self.port = port or free_port()
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning",
+                                                    access_log=False, lifespan="on"))
+        self.thread = threading.Thread(target=self.server.run, name=f"server-{self.port}", daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "ServerThread":
+        self.thread.start()
+        deadline = time.monotonic() + 30
+        while not self.server.started:
+            if not self.thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError(f"Server on port {self.port} failed to start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=60.0, help="Completion token rate (0: instant)")
+    parser.add_argument("--completion-tokens", type=int, default=120, help="Words per answer")
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.latency, args.tokens_per_second, args.completion_tokens),
+                host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
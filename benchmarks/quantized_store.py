@@ -0,0 +1,114 @@
+"""
+Memory per chunk and recall loss of quantized embedding storage against the current document store.
+
+Builds Haystack's InMemoryDocumentStore (the default store) and the MatrixDocumentStore in float32, float16
+and int8, with and without exact float32 rescoring, on clustered synthetic 384-dim embeddings. "heap" is the
+Python heap growth (tracemalloc) while loading the corpus divided by the number of chunks, so it includes
+ids, Document objects or spare matrix capacity; "vectors" is the embedding storage of the live chunks alone.
+Rescoring reads from a memory-mapped file that is not counted. Recall@k is measured against an exact float32
+scan.
+
+Usage:
+    python -m benchmarks.quantized_store --sizes 10000 100000 --top-k 3
+"""
+import argparse
+import gc
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+import numpy as np
+from haystack.components.retrievers.in_memory import InMemoryEmbeddingRetriever
+from haystack.dataclasses import Document
+from haystack.document_stores.in_memory import InMemoryDocumentStore
+
+from benchmarks.ann_retrieval import latency_stats, recall, synthetic_corpus, write_in_batches
+from benchmarks.stubs import EMBEDDING_DIM
+from service.matrix_store import MatrixDocumentStore
+
+# Bytes per embedding value of each quantization
+VALUE_BYTES = {"none": 4, "float16": 2, "int8": 1}
+
+
+def measure_build(build: Callable[[], object]) -> Tuple[object, int]:
+    """Build a store and return it with the bytes it allocated"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = build()
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return store, allocated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    parser.add_argument("--haystack-max", type=int, default=100_000,
+                        help="Largest corpus loaded into InMemoryDocumentStore")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    with tempfile.TemporaryDirectory(prefix="quantized_store_") as workdir:
+        run(args, rng, Path(workdir))
+
+
+def run(args: argparse.Namespace, rng: np.random.Generator, workdir: Path):
+    """Print the table; rescoring files go to `workdir`"""
+    print(f"{'chunks':>9} {'store':<28}{'heap B/chunk':>13}{'vectors B':>10}{'recall@' + str(args.top_k):>10}"
+          f"{'p50 ms':>10}")
+    for size in args.sizes:
+        corpus = synthetic_corpus(size, clusters=max(16, size // 1000), rng=rng)
+        ids = [str(i) for i in range(size)]
+        picks = rng.integers(0, size, args.queries)
+        queries = corpus[picks] + 0.3 * rng.standard_normal((args.queries, EMBEDDING_DIM)).astype(np.float32)
+        truth = []
+        for query in queries:
+            scores = corpus @ query
+            truth.append([ids[i] for i in np.argsort(-scores)[:args.top_k]])
+
+        if size <= args.haystack_max:
+            store, allocated = measure_build(lambda: _haystack_store(ids, corpus))
+            retriever = InMemoryEmbeddingRetriever(document_store=store, top_k=args.top_k)
+            stats = latency_stats(
+                lambda q: [doc.id for doc in retriever.run(query_embedding=q.tolist())["documents"]], queries[:20]
+            )
+            print(f"{size:>9} {'InMemoryDocumentStore':<28}{allocated / size:>13.0f}{'':>10}"
+                  f"{recall(stats['results'], truth[:20]):>10.3f}{stats['p50_ms']:>10.2f}")
+            del store, retriever
+
+        for quantization in ("none", "float16", "int8"):
+            for rescore_factor in ((0,) if quantization == "none" else (0, args.rescore_factor)):
+                store, allocated = measure_build(lambda: _matrix_store(
+                    quantization, rescore_factor, workdir / f"{size}-{quantization}.f32", ids, corpus
+                ))
+                stats = latency_stats(
+                    lambda q: [doc.id for doc in store.embedding_retrieval(q, top_k=args.top_k)], queries
+                )
+                label = f"matrix {quantization}" + (f" rescore x{rescore_factor}" if rescore_factor else "")
+                # int8 rows also keep a float32 scale
+                vector_bytes = VALUE_BYTES[quantization] * EMBEDDING_DIM + (4 if quantization == "int8" else 0)
+                print(f"{size:>9} {label:<28}{allocated / size:>13.0f}{vector_bytes:>10}"
+                      f"{recall(stats['results'], truth):>10.3f}{stats['p50_ms']:>10.2f}")
+                del store
+
+
+def _haystack_store(ids: List[str], corpus: np.ndarray) -> InMemoryDocumentStore:
+    store = InMemoryDocumentStore()
+    store.write_documents([Document(id=ids[i], content="", embedding=corpus[i].tolist()) for i in range(len(ids))])
+    return store
+
+
+def _matrix_store(quantization: str, rescore_factor: int, rescore_path: Path, ids: List[str],
+                  corpus: np.ndarray) -> MatrixDocumentStore:
+    store = MatrixDocumentStore(quantization=quantization, rescore_factor=rescore_factor, rescore_path=rescore_path)
+    write_in_batches(store, ids, corpus)
+    return store
+
+
+if __name__ == "__main__":
+    main()
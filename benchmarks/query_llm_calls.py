@@ -0,0 +1,121 @@
+"""
+Compare the /api/query answer path before and after splitting retrieval from generation.
+
+The legacy path ran the full RAG pipeline (retrieval + LLM answer) and then threw the answer
+away and generated the final response with a second LLM call. The current path only retrieves.
+Both LLMs and the embedders are stubbed, so the benchmark runs offline.
+
+Usage:
+    python -m benchmarks.query_llm_calls --llm-latency 0.2 --queries 20
+"""
+import argparse
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+from benchmarks.stubs import StubChatGenerator, StubDocumentEmbedder, StubTextEmbedder
+from service.rag_service import RAGService
+from service.response_generator import ResponseGeneratorService
+from utils.config import settings
+
+QUERIES = [
+    "tell me about banana",
+    "which country holds highest banana yield",
+    "can you say AndhraPradesh production for banana",
+    "can you say more about Macro-Propagation Method",
+    "how much fertilizer does heavy soil need for banana",
+]
+
+
+class StubRAGService(RAGService):
+    """RAG service wired to offline embedders and a stub LLM"""
+
+    def __init__(self, generator: StubChatGenerator):
+        self._stub_generator = generator
+        super().__init__()
+
+    def _create_document_embedder(self) -> Any:
+        return StubDocumentEmbedder()
+
+    def _create_text_embedder(self) -> Any:
+        return StubTextEmbedder()
+
+    def _create_generator(self) -> Any:
+        return self._stub_generator
+
+
+def legacy_answer(rag: RAGService, responder: ResponseGeneratorService, query: str) -> Dict[str, Any]:
+    """Answer path used before the split: full RAG pipeline, then a second generation"""
+    qa_result = rag.get_answer(query=query)
+    return responder.generate_response(
+        query=query, documents=qa_result["documents"], intent="document_query",
+        slots={"topic": query.split()[-1]}, is_out_of_scope=False,
+        missing_required_slots=[], confidence=0.9
+    )
+
+
+def retrieval_only_answer(rag: RAGService, responder: ResponseGeneratorService, query: str) -> Dict[str, Any]:
+    """Current answer path: retrieval only, a single generation in the response generator"""
+    retrieval_result = rag.retrieve(query=query)
+    return responder.generate_response(
+        query=query, documents=retrieval_result["documents"], intent="document_query",
+        slots={"topic": query.split()[-1]}, is_out_of_scope=False,
+        missing_required_slots=[], confidence=0.9
+    )
+
+
+def measure(name: str, answer: Callable, rag: RAGService, responder: ResponseGeneratorService,
+            generator: StubChatGenerator, queries: List[str]) -> Dict[str, Any]:
+    generator.reset()
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        answer(rag, responder, query)
+        latencies.append(time.perf_counter() - start)
+    return {
+        "path": name,
+        "mean_latency_ms": statistics.mean(latencies) * 1000,
+        "llm_calls_per_query": generator.calls / len(queries),
+        "prompt_tokens_per_query": generator.prompt_tokens / len(queries),
+        "completion_tokens_per_query": generator.total_completion_tokens / len(queries),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Stub LLM latency per call in seconds")
+    parser.add_argument("--completion-tokens", type=int, default=settings.RAG_MAX_TOKENS,
+                        help="Completion tokens reported per stub LLM call")
+    parser.add_argument("--queries", type=int, default=20, help="Number of queries per path")
+    args = parser.parse_args()
+
+    generator = StubChatGenerator(latency=args.llm_latency, completion_tokens=args.completion_tokens)
+    rag = StubRAGService(generator)
+    indexed = rag.index_document(settings.BASE_DIR / "banana.txt")
+    if not indexed["success"]:
+        sys.exit(f"Indexing banana.txt failed: {indexed.get('error')}")
+
+    responder = ResponseGeneratorService(settings.SCHEMA_PATH)
+    responder.response_generator.generator = generator
+
+    queries = [QUERIES[i % len(QUERIES)] for i in range(args.queries)]
+    results = [
+        measure("legacy (rag + response generation)", legacy_answer, rag, responder, generator, queries),
+        measure("retrieval only + response generation", retrieval_only_answer, rag, responder, generator, queries),
+    ]
+
+    print(f"{'path':<40}{'latency ms':>12}{'llm calls':>11}{'prompt tok':>12}{'compl tok':>11}")
+    for row in results:
+        print(f"{row['path']:<40}{row['mean_latency_ms']:>12.1f}{row['llm_calls_per_query']:>11.1f}"
+              f"{row['prompt_tokens_per_query']:>12.0f}{row['completion_tokens_per_query']:>11.0f}")
+
+    legacy, current = results
+    print(f"\nLatency saved per query: {legacy['mean_latency_ms'] - current['mean_latency_ms']:.1f} ms")
+    legacy_tokens = legacy["prompt_tokens_per_query"] + legacy["completion_tokens_per_query"]
+    current_tokens = current["prompt_tokens_per_query"] + current["completion_tokens_per_query"]
+    print(f"Tokens saved per query: {legacy_tokens - current_tokens:.0f}")
+
+
+if __name__ == "__main__":
+    main()
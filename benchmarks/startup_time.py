@@ -0,0 +1,92 @@
+"""
+Import and startup time of the API, measured in fresh interpreters.
+
+Each run starts a new Python process and times, in order: `import app.main` (what uvicorn, and every
+`--reload` restart, pays before binding the port), the application startup hook, and building the
+services on first use (RAG pipelines, OpenAI clients; the embedding model itself loads lazily). It also
+lists the heavy libraries loaded by the import alone, which should be none. With --warm-up the embedding
+model is loaded and run once too (needs the model to be downloadable or cached).
+
+Exits with status 1 when a heavy library is loaded at import or the median import time exceeds
+--max-import-ms, so it can guard against regressions in CI.
+
+Usage:
+    python -m benchmarks.startup_time --runs 5 --max-import-ms 1500
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+HEAVY_MODULES = ["torch", "sentence_transformers", "transformers", "haystack", "openai", "nltk"]
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+heavy = [name for name in {heavy!r} if name in sys.modules]
+
+from fastapi.testclient import TestClient
+from service.providers import get_query_service, get_rag_service
+from utils.config import settings
+settings.WARMUP_ON_STARTUP = False
+with TestClient(app.main.app):
+    started_up = time.perf_counter()
+    get_query_service()
+    built = time.perf_counter()
+    if {warm_up!r}:
+        get_rag_service().warm_up()
+    warmed = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (started_up - imported) * 1000,
+    "build_services_ms": (built - started_up) * 1000,
+    "warm_up_ms": (warmed - built) * 1000,
+    "heavy_modules_at_import": heavy
+}}))
+"""
+
+
+def measure(warm_up: bool) -> Dict:
+    """Time one fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD.format(heavy=HEAVY_MODULES, warm_up=warm_up)],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warm-up", action="store_true", help="Also load the embedding model and run it once")
+    parser.add_argument("--max-import-ms", type=float, default=None,
+                        help="Fail when the median import time exceeds this")
+    args = parser.parse_args()
+
+    runs: List[Dict] = [measure(args.warm_up) for _ in range(args.runs)]
+    stages = ["import_ms", "startup_ms", "build_services_ms"] + (["warm_up_ms"] if args.warm_up else [])
+    print(f"{'stage':<20}{'median ms':>12}{'min ms':>10}{'max ms':>10}")
+    for stage in stages:
+        values = [run[stage] for run in runs]
+        print(f"{stage:<20}{statistics.median(values):>12.1f}{min(values):>10.1f}{max(values):>10.1f}")
+
+    heavy = sorted({name for run in runs for name in run["heavy_modules_at_import"]})
+    print(f"heavy modules loaded by 'import app.main': {', '.join(heavy) or 'none'}")
+
+    failed = bool(heavy)
+    median_import = statistics.median(run["import_ms"] for run in runs)
+    if args.max_import_ms is not None and median_import > args.max_import_ms:
+        print(f"median import time {median_import:.1f} ms exceeds {args.max_import_ms:.1f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
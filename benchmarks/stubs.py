@@ -0,0 +1,125 @@
+"""Offline stand-ins for the LLM and embedding components used by the benchmarks"""
+import asyncio
+import hashlib
+import re
+import threading
+import time
+from dataclasses import replace
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from haystack import component
+from haystack.dataclasses import ChatMessage, Document, StreamingCallbackT, StreamingChunk
+
+EMBEDDING_DIM = 384
+
+
+def count_tokens(text: str) -> int:
+    """Rough token estimate (whitespace words), good enough to compare prompt sizes"""
+    return len(text.split())
+
+
+def hash_embedding(text: str, dim: int = EMBEDDING_DIM) -> List[float]:
+    """Deterministic bag-of-words embedding so that similar texts get similar vectors"""
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in re.findall(r"\w+", text.lower()):
+        digest = hashlib.md5(word.encode("utf-8")).digest()
+        vector[int.from_bytes(digest[:4], "little") % dim] += 1.0
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    return vector.tolist()
+
+
+@component
+class StubChatGenerator:
+    """Chat generator that sleeps like a real LLM call and records call and token counts"""
+
+    def __init__(self, latency: float = 0.05, completion_tokens: int = 400, tokens_per_second: float = 0.0,
+                 reply: str = "stub answer"):
+        """
+        Args:
+            latency: Fixed per-call latency in seconds (time to first token)
+            completion_tokens: Number of completion tokens reported per call
+            tokens_per_second: Decode rate; 0 means completion time is not simulated
+            reply: Text of every reply
+        """
+        self.latency = latency
+        self.completion_tokens = completion_tokens
+        self.tokens_per_second = tokens_per_second
+        self.reply = reply
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Reset the recorded counters"""
+        with self._lock:
+            self.calls = 0
+            self.prompt_tokens = 0
+            self.total_completion_tokens = 0
+
+    def _call_duration(self) -> float:
+        decode = self.completion_tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+        return self.latency + decode
+
+    def _reply(self, messages: List[ChatMessage]) -> Dict[str, Any]:
+        prompt_tokens = sum(count_tokens(message.text or "") for message in messages)
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.total_completion_tokens += self.completion_tokens
+        reply = ChatMessage.from_assistant(
+            self.reply,
+            meta={"usage": {"prompt_tokens": prompt_tokens, "completion_tokens": self.completion_tokens}}
+        )
+        return {"replies": [reply]}
+
+    def _stream_pieces(self) -> List[str]:
+        """The reply split into word pieces, streamed at the decode rate"""
+        return re.findall(r"\S+\s*", self.reply) or [self.reply]
+
+    @component.output_types(replies=List[ChatMessage])
+    def run(self, messages: List[ChatMessage],
+            streaming_callback: Optional[StreamingCallbackT] = None) -> Dict[str, Any]:
+        if streaming_callback is None:
+            time.sleep(self._call_duration())
+        else:
+            time.sleep(self.latency)
+            pieces = self._stream_pieces()
+            for piece in pieces:
+                streaming_callback(StreamingChunk(content=piece))
+                time.sleep((self._call_duration() - self.latency) / len(pieces))
+        return self._reply(messages)
+
+    @component.output_types(replies=List[ChatMessage])
+    async def run_async(self, messages: List[ChatMessage],
+                        streaming_callback: Optional[StreamingCallbackT] = None
+                        ) -> Dict[str, Any]:
+        if streaming_callback is None:
+            await asyncio.sleep(self._call_duration())
+        else:
+            await asyncio.sleep(self.latency)
+            pieces = self._stream_pieces()
+            for piece in pieces:
+                await streaming_callback(StreamingChunk(content=piece))
+                await asyncio.sleep((self._call_duration() - self.latency) / len(pieces))
+        return self._reply(messages)
+
+
+@component
+class StubTextEmbedder:
+    """Text embedder producing deterministic hashing embeddings"""
+
+    @component.output_types(embedding=List[float])
+    def run(self, text: str) -> Dict[str, Any]:
+        return {"embedding": hash_embedding(text)}
+
+
+@component
+class StubDocumentEmbedder:
+    """Document embedder producing deterministic hashing embeddings"""
+
+    @component.output_types(documents=List[Document])
+    def run(self, documents: List[Document]) -> Dict[str, Any]:
+        embedded = [replace(document, embedding=hash_embedding(document.content or "")) for document in documents]
+        return {"documents": embedded}
@@ -0,0 +1,361 @@
+"""
+Offline benchmark suite: indexing, retrieval and end-to-end /api/query against a fake LLM.
+
+Starts the fake OpenAI-compatible server (benchmarks/fake_openai.py) and points OPENROUTER_BASE_URL
+at it, so the intent and answer LLM calls go over HTTP with realistic latency and token rate. Then:
+
+1. indexing: banana.txt and synthetic corpora of --corpus-docs documents (sentences of banana.txt
+   reshuffled with random numbers, so no two chunks repeat) through the bulk indexer:
+   docs/s, chunks/s and MB/s
+2. retrieval: RAGService.retrieve latency percentiles on each corpus
+3. query: /api/query p50/p95/p99 with --concurrency clients on the banana.txt index, served by
+   uvicorn on a local port (or --url for a running server)
+4. max_qps: open-loop load at increasing rates; the highest rate whose p95 stays within --slo-ms
+   with under 1% errors and at least 95% of the offered rate served
+
+Embeddings use the deterministic hashing stub by default (--embedder model loads the configured
+sentence-transformers model). The semantic answer cache is off unless --answer-cache, so repeated
+questions still exercise the LLM path. The load generator runs in the same process as the app, so the
+client competes with the server for the GIL at high rates; use --url to load a separate server.
+
+Results are written as JSON (--output, default benchmarks/results/suite-<time>.json) and can be
+compared with an earlier run: every numeric metric with its change.
+
+Usage:
+    python -m benchmarks.suite --corpus-docs 100 1000 --llm-latency 0.3 --tokens-per-second 60
+    python -m benchmarks.suite --compare benchmarks/results/suite-a.json benchmarks/results/suite-b.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.fake_openai import ServerThread, create_app
+from benchmarks.query_llm_calls import QUERIES
+from benchmarks.stubs import StubDocumentEmbedder, StubTextEmbedder
+from service.rag_service import RAGService
+from utils.config import settings
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+# Extra questions so the query mix is not five strings on repeat
+QUERY_MIX = QUERIES + [
+    "what is the spacing for banana plants",
+    "how should banana bunches be covered",
+    "which banana varieties are used for cooking",
+    "what does the document say about irrigation",
+    "how are banana suckers selected",
+]
+
+
+class OfflineRAGService(RAGService):
+    """RAG service with the hashing stub embedders; the generator is the real one (fake server)"""
+
+    def _create_document_embedder(self) -> Any:
+        return StubDocumentEmbedder()
+
+    def _create_text_embedder(self) -> Any:
+        return StubTextEmbedder()
+
+    def warm_up(self):
+        pass
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """p50/p95/p99, mean and max of latencies in seconds, as milliseconds"""
+    if not values:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None, "max_ms": None}
+    cuts = statistics.quantiles(values, n=100, method="inclusive") if len(values) > 1 else [values[0]] * 99
+    return {
+        "p50_ms": round(cuts[49] * 1000, 2),
+        "p95_ms": round(cuts[94] * 1000, 2),
+        "p99_ms": round(cuts[98] * 1000, 2),
+        "mean_ms": round(statistics.mean(values) * 1000, 2),
+        "max_ms": round(max(values) * 1000, 2)
+    }
+
+
+def create_rag(embedder: str) -> RAGService:
+    return OfflineRAGService() if embedder == "stub" else RAGService()
+
+
+def write_synthetic_corpus(directory: Path, documents: int, sentences_per_doc: int, seed: int) -> int:
+    """Write documents built from reshuffled banana.txt sentences; returns the total bytes"""
+    text = (ROOT / "banana.txt").read_text(encoding="utf-8")
+    sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+", text) if len(s.split()) > 3]
+    rng = random.Random(seed)
+    total = 0
+    for i in range(documents):
+        picked = rng.choices(sentences, k=sentences_per_doc)
+        # Random numbers make every chunk unique, so the indexer cannot skip repeats
+        body = " ".join(f"{sentence} ({rng.randint(1, 10 ** 6)})" for sentence in picked)
+        path = directory / f"doc_{i:06d}.txt"
+        path.write_text(body, encoding="utf-8")
+        total += len(body.encode("utf-8"))
+    return total
+
+
+def bench_indexing(rag: RAGService, path: Path, total_bytes: int) -> Dict[str, Any]:
+    from service.bulk_ingestion import BulkIndexer
+
+    indexer = BulkIndexer(rag, batch_size=settings.BULK_EMBED_BATCH_SIZE)
+    started = time.perf_counter()
+    indexer.add_path(path)
+    stats = indexer.finish()
+    elapsed = time.perf_counter() - started
+    return {
+        "documents": stats["documents"],
+        "chunks": stats["chunks_indexed"],
+        "bytes": total_bytes,
+        "seconds": round(elapsed, 3),
+        "documents_per_second": round(stats["documents"] / elapsed, 1),
+        "chunks_per_second": round(stats["chunks_indexed"] / elapsed, 1),
+        "mb_per_second": round(total_bytes / elapsed / 1e6, 3)
+    }
+
+
+def bench_retrieval(rag: RAGService, queries: int) -> Dict[str, Any]:
+    latencies = []
+    for i in range(queries):
+        started = time.perf_counter()
+        result = rag.retrieve(QUERY_MIX[i % len(QUERY_MIX)])
+        latencies.append(time.perf_counter() - started)
+        if not result["success"]:
+            raise RuntimeError(f"Retrieval failed: {result.get('error')}")
+    return {"queries": queries, "store_documents": rag.document_store.count_documents(), **percentiles(latencies)}
+
+
+async def _post_query(client: httpx.AsyncClient, url: str, query: str) -> Dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        response = await client.post(f"{url}/api/query", json={"query": query})
+        ok = response.status_code == 200
+        cache_hit = ok and response.json().get("cache_hit", False)
+        return {"latency": time.perf_counter() - started, "ok": ok, "status": response.status_code,
+                "cache_hit": cache_hit, "finished": time.perf_counter()}
+    except httpx.HTTPError:
+        return {"latency": time.perf_counter() - started, "ok": False, "status": None, "cache_hit": False,
+                "finished": time.perf_counter()}
+
+
+def _summarize(results: List[Dict[str, Any]], started: float) -> Dict[str, Any]:
+    ok = [result for result in results if result["ok"]]
+    elapsed = max((result["finished"] for result in results), default=started) - started
+    return {
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "error_rate": round((len(results) - len(ok)) / len(results), 4) if results else 0.0,
+        "cache_hits": sum(1 for result in ok if result["cache_hit"]),
+        "throughput_qps": round(len(ok) / elapsed, 2) if elapsed > 0 else 0.0,
+        **percentiles([result["latency"] for result in ok])
+    }
+
+
+async def bench_queries(url: str, requests: int, concurrency: int) -> Dict[str, Any]:
+    """Closed loop: `concurrency` clients each send their next query when the last one is answered"""
+    queue = list(range(requests))
+    results = []
+
+    async def client_loop(client: httpx.AsyncClient):
+        while queue:
+            i = queue.pop()
+            results.append(await _post_query(client, url, QUERY_MIX[i % len(QUERY_MIX)]))
+
+    async with httpx.AsyncClient(timeout=120, limits=httpx.Limits(max_connections=concurrency)) as client:
+        # One warm-up request builds the services and opens the LLM connections
+        await _post_query(client, url, QUERY_MIX[0])
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+    return {"concurrency": concurrency, **_summarize(results, started)}
+
+
+async def bench_max_qps(url: str, start_qps: float, max_qps: float, step_seconds: float, slo_ms: float
+                        ) -> Dict[str, Any]:
+    """Open loop: send at a fixed rate regardless of answers, raising the rate until it is not sustained"""
+    steps = []
+    sustainable = 0.0
+    rate = start_qps
+    async with httpx.AsyncClient(timeout=120, limits=httpx.Limits(max_connections=None)) as client:
+        while rate <= max_qps:
+            count = max(int(rate * step_seconds), 1)
+            started = time.perf_counter()
+            tasks = []
+            for i in range(count):
+                delay = started + i / rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(_post_query(client, url, QUERY_MIX[i % len(QUERY_MIX)])))
+            step_results = await asyncio.gather(*tasks)
+            summary = _summarize(step_results, started)
+            # Rate of answers between the first and the last one: falls behind the offered rate once a
+            # backlog builds up, without counting the latency of the last request as lost time
+            finished = sorted(result["finished"] for result in step_results if result["ok"])
+            served = (len(finished) - 1) / (finished[-1] - finished[0]) if len(finished) > 1 else 0.0
+            summary["served_qps"] = round(served, 2)
+            passed = (summary["p95_ms"] is not None and summary["p95_ms"] <= slo_ms and summary["error_rate"] < 0.01
+                      and served >= 0.95 * rate)
+            steps.append({"offered_qps": round(rate, 2), "passed": passed, **summary})
+            print(f"  {rate:8.1f} qps offered: {served:8.1f} served, "
+                  f"p95 {summary['p95_ms']} ms, {summary['errors']} errors -> {'ok' if passed else 'not sustained'}")
+            if not passed:
+                break
+            sustainable = rate
+            rate *= 1.5
+    return {"sustainable_qps": round(sustainable, 2), "slo_p95_ms": slo_ms, "steps": steps}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Numeric metrics by dotted path (lists such as the max_qps steps are left out)"""
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{path}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]):
+    """Print every numeric metric of two runs with its relative change"""
+    before = flatten({key: value for key, value in baseline.items() if key != "meta"})
+    after = flatten({key: value for key, value in current.items() if key != "meta"})
+    print(f"baseline {baseline['meta'].get('git_commit')} ({baseline['meta']['timestamp']}) vs "
+          f"current {current['meta'].get('git_commit')} ({current['meta']['timestamp']})")
+    print(f"{'metric':<52}{'baseline':>14}{'current':>14}{'change':>10}")
+    for key in sorted(set(before) | set(after)):
+        old, new = before.get(key), after.get(key)
+        change = f"{(new - old) / old:+.1%}" if old not in (None, 0) and new is not None else ""
+        print(f"{key:<52}{old if old is not None else '-':>14}{new if new is not None else '-':>14}{change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus-docs", type=int, nargs="*", default=[100, 1000],
+                        help="Synthetic corpus sizes in documents")
+    parser.add_argument("--sentences-per-doc", type=int, default=40)
+    parser.add_argument("--embedder", choices=["stub", "model"], default="stub")
+    parser.add_argument("--split-by", default="period", help="Splitter unit; 'sentence' needs the NLTK punkt data")
+    parser.add_argument("--retrieval-queries", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Fake LLM seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=60.0, help="Fake LLM completion token rate")
+    parser.add_argument("--completion-tokens", type=int, default=120, help="Fake LLM answer length in words")
+    parser.add_argument("--requests", type=int, default=200, help="Requests of the closed-loop query run")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--answer-cache", action="store_true", help="Keep the semantic answer cache on")
+    parser.add_argument("--url", default=None, help="Load a running server instead of starting one")
+    parser.add_argument("--skip-max-qps", action="store_true")
+    parser.add_argument("--start-qps", type=float, default=5.0)
+    parser.add_argument("--max-qps", type=float, default=500.0)
+    parser.add_argument("--step-seconds", type=float, default=5.0)
+    parser.add_argument("--slo-ms", type=float, default=3000.0, help="p95 latency a sustained rate must stay under")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, nargs="+", metavar="RESULTS",
+                        help="Compare with a baseline results file after the run, or compare two files and exit")
+    parser.add_argument("--verbose", action="store_true", help="Keep the application's INFO logging")
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) == 2:
+        compare(json.loads(args.compare[0].read_text()), json.loads(args.compare[1].read_text()))
+        return
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+    settings.SPLIT_BY = args.split_by
+    settings.ANSWER_CACHE_ENABLED = args.answer_cache
+    settings.WARMUP_ON_STARTUP = False
+    workdir = Path(tempfile.mkdtemp(prefix="suite-"))
+    settings.QA_LOG_FILE = workdir / "qa_log.jsonl"
+    settings.INGESTION_SPOOL_DIR = workdir / "spool"
+
+    results: Dict[str, Any] = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {key: (str(value) if isinstance(value, Path) else value) for key, value in vars(args).items()},
+            "settings": {"document_store_type": settings.DOCUMENT_STORE_TYPE, "vector_index": settings.VECTOR_INDEX,
+                         "retriever_top_k": settings.RETRIEVER_TOP_K, "split_by": settings.SPLIT_BY,
+                         "split_length": settings.SPLIT_LENGTH}
+        },
+        "indexing": {},
+        "retrieval": {}
+    }
+
+    print("indexing and retrieval")
+    for name in ["banana"] + [f"synthetic_{docs}" for docs in args.corpus_docs]:
+        rag = create_rag(args.embedder)
+        if name == "banana":
+            path = ROOT / "banana.txt"
+            total_bytes = path.stat().st_size
+        else:
+            path = workdir / name
+            path.mkdir()
+            total_bytes = write_synthetic_corpus(path, int(name.split("_")[1]), args.sentences_per_doc, args.seed)
+        results["indexing"][name] = bench_indexing(rag, path, total_bytes)
+        results["retrieval"][name] = bench_retrieval(rag, args.retrieval_queries)
+        print(f"  {name:<18} {results['indexing'][name]['chunks_per_second']:>10} chunks/s   "
+              f"retrieval p50 {results['retrieval'][name]['p50_ms']} ms, p95 {results['retrieval'][name]['p95_ms']} ms")
+        if name == "banana":
+            banana_rag = rag
+
+    with ServerThread(create_app(args.llm_latency, args.tokens_per_second, args.completion_tokens)) as llm:
+        settings.OPENROUTER_BASE_URL = f"{llm.url}/v1"
+        if args.url:
+            url, app_server = args.url, None
+        else:
+            from app.main import app
+            from service.providers import get_rag_service
+            get_rag_service.override(banana_rag)
+            app_server = ServerThread(app).__enter__()
+            url = app_server.url
+        try:
+            print(f"query: {args.requests} requests, concurrency {args.concurrency}")
+            results["query"] = asyncio.run(bench_queries(url, args.requests, args.concurrency))
+            print(f"  p50 {results['query']['p50_ms']} ms, p95 {results['query']['p95_ms']} ms, "
+                  f"p99 {results['query']['p99_ms']} ms, {results['query']['throughput_qps']} qps, "
+                  f"{results['query']['errors']} errors")
+            if not args.skip_max_qps:
+                print(f"max_qps: p95 SLO {args.slo_ms:.0f} ms")
+                results["max_qps"] = asyncio.run(bench_max_qps(url, args.start_qps, args.max_qps, args.step_seconds,
+                                                               args.slo_ms))
+                print(f"  sustainable: {results['max_qps']['sustainable_qps']} qps")
+        finally:
+            if app_server is not None:
+                app_server.__exit__(None, None, None)
+        results["meta"]["llm_calls"] = llm.server.config.app.state.calls
+
+    output = args.output or RESULTS_DIR / f"suite-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"results written to {output}")
+
+    if args.compare:
+        compare(json.loads(args.compare[0].read_text()), results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
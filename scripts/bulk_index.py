@@ -0,0 +1,100 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def index_locally(paths, batch_size):
+    """Index into the configured document store in this process (use with a persistent store)"""
+    from service.bulk_ingestion import BulkIndexer
+    from service.providers import get_rag_service
+    from utils.config import settings
+
+    if settings.DOCUMENT_STORE_TYPE not in ("persistent", "persistent_matrix"):
+        print(f"Warning: DOCUMENT_STORE_TYPE is '{settings.DOCUMENT_STORE_TYPE}', "
+              "the indexed documents are lost when this script exits")
+
+    def report(stats):
+        print(f"\r{stats['documents']} documents, {stats['chunks_indexed']} chunks, "
+              f"{stats['documents_per_second']} docs/s, {stats['chunks_per_second']} chunks/s", end="", flush=True)
+
+    indexer = BulkIndexer(get_rag_service(), batch_size=batch_size or settings.BULK_EMBED_BATCH_SIZE,
+                          on_progress=report)
+    for path in paths:
+        indexer.add_path(Path(path))
+    stats = indexer.finish()
+    print()
+    return stats
+
+
+def index_remotely(paths, url, priority):
+    """Upload the files to a running API and wait for the bulk job"""
+    import httpx
+
+    files = []
+    for path in paths:
+        path = Path(path)
+        candidates = sorted(path.rglob("*")) if path.is_dir() else [path]
+        files.extend(file for file in candidates if file.is_file())
+
+    params = {"priority": priority} if priority else {}
+    handles = [("files", (file.name, open(file, "rb"))) for file in files]
+    try:
+        response = httpx.post(f"{url}/api/upload/bulk", files=handles, params=params, timeout=None)
+    finally:
+        for _, (_, handle) in handles:
+            handle.close()
+    response.raise_for_status()
+    job_id = response.json()["job_id"]
+    print(f"Queued job {job_id} for {len(files)} files")
+
+    while True:
+        status = httpx.get(f"{url}/api/jobs/{job_id}").json()
+        print(f"\r{status['state']}: {status['documents']} documents, {status['chunks_indexed']} chunks, "
+              f"{status['documents_per_second']} docs/s, {status['chunks_per_second']} chunks/s", end="", flush=True)
+        if status["state"] in ("completed", "failed"):
+            print()
+            if status["error"]:
+                print(f"Error: {status['error']}")
+            return status
+        time.sleep(1.0)
+
+
+def main():
+    """Bulk index .txt files, directories and zip/tar archives"""
+    parser = argparse.ArgumentParser(description="Bulk index documents")
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        help=".txt files, directories or zip/tar archives"
+    )
+    parser.add_argument(
+        "--url",
+        type=str,
+        default=None,
+        help="Upload to a running API (e.g. http://localhost:8000) instead of indexing in this process"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="Chunks per embedding batch when indexing locally (default BULK_EMBED_BATCH_SIZE)"
+    )
+    parser.add_argument(
+        "--priority",
+        choices=["high", "normal", "low"],
+        default=None,
+        help="Job priority when uploading to the API"
+    )
+    args = parser.parse_args()
+
+    if args.url:
+        index_remotely(args.paths, args.url.rstrip("/"), args.priority)
+    else:
+        index_locally(args.paths, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.config import settings
+from utils.qa_log import read_legacy_qa_log
+
+
+def main():
+    """Append every entry of the text QA log to the JSON-lines log"""
+    parser = argparse.ArgumentParser(description="Convert the old text QA log to JSON-lines records")
+    parser.add_argument("source", nargs="?", default=str(settings.BASE_DIR / "qa_log.txt"),
+                        help="Text log with Question:/Answer: entries")
+    parser.add_argument("target", nargs="?", default=str(settings.QA_LOG_FILE),
+                        help="JSON-lines log to append to")
+    args = parser.parse_args()
+
+    source, target = Path(args.source), Path(args.target)
+    if not source.exists():
+        print(f"No legacy QA log at {source}")
+        return
+
+    count = 0
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with open(target, "a", encoding="utf-8") as f:
+        for entry in read_legacy_qa_log(source):
+            # The text format kept no timestamp, intent or documents
+            record = {"timestamp": None, **entry, "legacy": True}
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+    print(f"Migrated {count} QA pairs from {source} to {target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def load_events(path: Path) -> List[Dict[str, Any]]:
+    """
+    Read the requests to replay from a capture file, a JSON-lines QA log or an old text qa_log.txt
+
+    Returns:
+        Events {"ts": arrival time or None, "endpoint": ..., "queries": [...]} in arrival order
+    """
+    from utils.qa_log import read_legacy_qa_log
+
+    if path.suffix == ".txt":
+        return [{"ts": None, "endpoint": "/api/query", "queries": [entry["query"]]}
+                for entry in read_legacy_qa_log(path)]
+
+    events = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "queries" in record:
+                # Traffic capture
+                events.append({"ts": record.get("ts"), "endpoint": record.get("endpoint", "/api/query"),
+                               "queries": record["queries"]})
+            elif "query" in record:
+                # QA log; answers served from a batch were logged one by one, so replay them singly
+                events.append({"ts": record.get("timestamp"), "endpoint": "/api/query", "queries": [record["query"]]})
+    if all(event["ts"] is not None for event in events):
+        events.sort(key=lambda event: event["ts"])
+    return events
+
+
+def schedule(events: List[Dict[str, Any]], speed: float, rate: float) -> List[Optional[float]]:
+    """Send offsets in seconds: captured gaps divided by `speed`, `1 / rate` apart without timestamps, None asap"""
+    if speed <= 0:
+        return [None] * len(events)
+    if all(event["ts"] is not None for event in events):
+        first = events[0]["ts"]
+        return [(event["ts"] - first) / speed for event in events]
+    return [i / (rate * speed) for i in range(len(events))]
+
+
+async def send(client, base_url: str, event: Dict[str, Any]) -> Dict[str, Any]:
+    """Send one event and time it until the full response (or stream) has arrived"""
+    endpoint = event["endpoint"]
+    started = time.perf_counter()
+    result = {"endpoint": endpoint, "status": None, "ok": False, "cache_hits": 0, "answers": 0, "ttft": None}
+    try:
+        if endpoint == "/api/query/batch":
+            response = await client.post(f"{base_url}{endpoint}", json={"queries": event["queries"]})
+            result["status"] = response.status_code
+            if response.status_code == 200:
+                answers = response.json()["results"]
+                result["answers"] = len(answers)
+                result["cache_hits"] = sum(1 for answer in answers if answer.get("cache_hit"))
+                result["ok"] = all(answer.get("success") for answer in answers)
+        elif endpoint == "/api/query/stream":
+            async with client.stream("POST", f"{base_url}{endpoint}", json={"query": event["queries"][0]}) as response:
+                result["status"] = response.status_code
+                current_event = None
+                async for line in response.aiter_lines():
+                    if line.startswith("event: "):
+                        current_event = line[len("event: "):]
+                        if current_event == "token" and result["ttft"] is None:
+                            result["ttft"] = time.perf_counter() - started
+                    elif line.startswith("data: ") and current_event == "done":
+                        result["ok"] = True
+                        result["answers"] = 1
+                        result["cache_hits"] = int(bool(json.loads(line[len("data: "):]).get("cache_hit")))
+        else:
+            response = await client.post(f"{base_url}/api/query", json={"query": event["queries"][0]})
+            result["status"] = response.status_code
+            if response.status_code == 200:
+                result["ok"] = True
+                result["answers"] = 1
+                result["cache_hits"] = int(bool(response.json().get("cache_hit")))
+    except Exception as e:
+        result["error"] = type(e).__name__
+    result["latency"] = time.perf_counter() - started
+    return result
+
+
+async def replay(base_url: str, events: List[Dict[str, Any]], offsets: List[Optional[float]], concurrency: int,
+                 timeout: float) -> Dict[str, Any]:
+    import httpx
+
+    results: List[Dict[str, Any]] = []
+    lags: List[float] = []
+    async with httpx.AsyncClient(timeout=timeout, limits=httpx.Limits(max_connections=None)) as client:
+        started = time.perf_counter()
+        if offsets and offsets[0] is None:
+            # As fast as possible: `concurrency` clients, each sending its next request on an answer
+            pending = list(reversed(events))
+
+            async def worker():
+                while pending:
+                    results.append(await send(client, base_url, pending.pop()))
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        else:
+            # Paced: send at the scheduled times whether or not earlier requests were answered
+            tasks = []
+            for event, offset in zip(events, offsets):
+                delay = started + offset - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                lags.append(max(-delay, 0.0))
+                tasks.append(asyncio.create_task(send(client, base_url, event)))
+            results = list(await asyncio.gather(*tasks))
+        elapsed = time.perf_counter() - started
+    return {"results": results, "elapsed": elapsed, "lags": lags}
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {name: None for name in ("p50_ms", "p90_ms", "p95_ms", "p99_ms", "max_ms")}
+    cuts = statistics.quantiles(values, n=100, method="inclusive") if len(values) > 1 else [values[0]] * 99
+    return {"p50_ms": round(cuts[49] * 1000, 1), "p90_ms": round(cuts[89] * 1000, 1),
+            "p95_ms": round(cuts[94] * 1000, 1), "p99_ms": round(cuts[98] * 1000, 1),
+            "max_ms": round(max(values) * 1000, 1)}
+
+
+def summarize(results: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    ok = [result for result in results if result["ok"]]
+    errors: Dict[str, int] = {}
+    for result in results:
+        if not result["ok"]:
+            key = str(result["status"] or result.get("error", "error"))
+            errors[key] = errors.get(key, 0) + 1
+    answers = sum(result["answers"] for result in ok)
+    ttfts = [result["ttft"] for result in ok if result["ttft"] is not None]
+    return {
+        "requests": len(results),
+        "errors": sum(errors.values()),
+        "error_rate": round(sum(errors.values()) / len(results), 4) if results else 0.0,
+        "errors_by_status": errors,
+        "cache_hit_ratio": round(sum(result["cache_hits"] for result in ok) / answers, 4) if answers else 0.0,
+        "requests_per_second": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "latency": percentiles([result["latency"] for result in ok]),
+        **({"time_to_first_token": percentiles(ttfts)} if ttfts else {})
+    }
+
+
+def main():
+    """Replay captured traffic or logged questions against a running server and report latencies"""
+    from utils.config import settings
+
+    parser = argparse.ArgumentParser(description="Replay captured /api/query traffic against a running server")
+    parser.add_argument("source", nargs="?", default=str(settings.CAPTURE_FILE),
+                        help="Capture file (CAPTURE_FILE), JSON-lines QA log or old qa_log.txt")
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the server")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="1 replays at the captured pace, N is N times faster, 0 is as fast as possible")
+    parser.add_argument("--rate", type=float, default=1.0,
+                        help="Requests per second (times --speed) for sources without timestamps, e.g. qa_log.txt")
+    parser.add_argument("--concurrency", type=int, default=8, help="Clients when replaying as fast as possible")
+    parser.add_argument("--limit", type=int, default=None, help="Replay only the first N requests")
+    parser.add_argument("--endpoint", choices=["/api/query", "/api/query/stream"], default=None,
+                        help="Send every single query to this endpoint instead of the captured one")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", type=Path, default=None, help="Write the report as JSON")
+    args = parser.parse_args()
+
+    # One INFO line per request would drown the report
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    events = load_events(Path(args.source))[:args.limit]
+    if not events:
+        print(f"No requests to replay in {args.source}")
+        return
+    if args.endpoint:
+        for event in events:
+            if event["endpoint"] != "/api/query/batch":
+                event["endpoint"] = args.endpoint
+
+    offsets = schedule(events, args.speed, args.rate)
+    pace = "as fast as possible" if offsets[0] is None else f"over {offsets[-1]:.1f} s"
+    print(f"Replaying {len(events)} requests from {args.source} against {args.url} {pace}")
+    run = asyncio.run(replay(args.url, events, offsets, args.concurrency, args.timeout))
+
+    report = {"source": args.source, "speed": args.speed, "duration_seconds": round(run["elapsed"], 2),
+              "overall": summarize(run["results"], run["elapsed"])}
+    if run["lags"]:
+        report["send_lag"] = percentiles(run["lags"])
+    for endpoint in sorted({result["endpoint"] for result in run["results"]}):
+        report[endpoint] = summarize([result for result in run["results"] if result["endpoint"] == endpoint],
+                                     run["elapsed"])
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
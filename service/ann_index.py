@@ -0,0 +1,273 @@
+import threading
+from dataclasses import replace
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from haystack import component
+from haystack.dataclasses import Document
+from utils.logging import logger
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) approximate nearest-neighbour index on CPU, scored by dot product
+
+    Vectors are partitioned by a k-means coarse quantizer into `nlist` lists; a query scans only the
+    `nprobe` lists whose centroids score highest. `nprobe` is the recall/latency knob. Until enough vectors
+    are inserted to train the quantizer, and for `nprobe >= nlist`, the search is exact.
+
+    Inserts are incremental: new vectors go to the list of their nearest centroid, and the quantizer is
+    retrained once the index has grown `retrain_growth` times since the last training. Removed and replaced
+    vectors are only marked deleted; once they make up `compact_ratio` of the rows, the index is compacted.
+    """
+
+    def __init__(self, nlist: int = 0, nprobe: int = 16, min_train_size: int = 2048, retrain_growth: float = 4.0,
+                 compact_ratio: float = 0.5):
+        """
+        Initialize an empty index
+
+        Args:
+            nlist: Number of inverted lists; 0 picks about sqrt(N) at training time
+            nprobe: Number of lists scanned per query
+            min_train_size: Vectors needed before the quantizer is trained (brute force until then)
+            retrain_growth: Retrain when the index has grown by this factor since the last training
+            compact_ratio: Compact when this fraction of the rows is deleted
+        """
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.retrain_growth = retrain_growth
+        self.compact_ratio = compact_ratio
+
+        self._vectors: Optional[np.ndarray] = None
+        self._size = 0
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._deleted: Optional[np.ndarray] = None
+        self._live = 0
+
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+        self._list_arrays: List[Optional[np.ndarray]] = []
+        self._trained_size = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self._live
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray):
+        """
+        Insert (or replace) vectors
+
+        Args:
+            ids: Document ids, one per row
+            vectors: Matrix of shape (len(ids), dim)
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(ids) == 0:
+            return
+        with self._lock:
+            self.remove([doc_id for doc_id in ids if doc_id in self._positions])
+            start = self._append_vectors(vectors)
+            for offset, doc_id in enumerate(ids):
+                self._ids.append(doc_id)
+                self._positions[doc_id] = start + offset
+            self._live += len(ids)
+
+            if self._centroids is not None:
+                self._assign(np.arange(start, start + len(ids)))
+            if self._needs_training():
+                self._train()
+
+    def remove(self, ids: Sequence[str]):
+        """Remove vectors by document id (unknown ids are ignored)"""
+        with self._lock:
+            for doc_id in ids:
+                position = self._positions.pop(doc_id, None)
+                if position is not None:
+                    self._deleted[position] = True
+                    self._live -= 1
+            if self._size - self._live > self._size * self.compact_ratio:
+                self._compact()
+
+    def search(self, query: np.ndarray, top_k: int, nprobe: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Find the vectors with the highest dot product with the query
+
+        Args:
+            query: Query vector
+            top_k: Number of results
+            nprobe: Lists to scan, overrides the index default
+
+        Returns:
+            List of (document id, score) sorted by descending score
+        """
+        query = np.asarray(query, dtype=np.float32)
+        with self._lock:
+            if self._size == 0:
+                return []
+            nprobe = nprobe or self.nprobe
+            if self._centroids is None or nprobe >= len(self._centroids):
+                candidates = np.arange(self._size)
+            else:
+                centroid_scores = self._centroids @ query
+                probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+                candidates = np.concatenate([self._list_array(int(list_id)) for list_id in probe])
+
+            candidates = candidates[~self._deleted[candidates]]
+            if len(candidates) == 0:
+                return []
+            scores = self._vectors[candidates] @ query
+            k = min(top_k, len(candidates))
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+            return [(self._ids[candidates[i]], float(scores[i])) for i in best]
+
+    def _append_vectors(self, vectors: np.ndarray) -> int:
+        """Append rows to the growable vector matrix and return the first new position"""
+        needed = self._size + len(vectors)
+        if self._vectors is None:
+            self._vectors = np.empty((max(needed, 1024), vectors.shape[1]), dtype=np.float32)
+            self._deleted = np.zeros(len(self._vectors), dtype=bool)
+        elif needed > len(self._vectors):
+            capacity = max(needed, 2 * len(self._vectors))
+            grown = np.empty((capacity, self._vectors.shape[1]), dtype=np.float32)
+            grown[:self._size] = self._vectors[:self._size]
+            self._vectors = grown
+            self._deleted = np.concatenate([self._deleted, np.zeros(capacity - len(self._deleted), dtype=bool)])
+        start = self._size
+        self._vectors[start:needed] = vectors
+        self._size = needed
+        return start
+
+    def _compact(self):
+        """Drop deleted rows, renumbering the live ones in the vectors, ids and inverted lists"""
+        live_positions = np.flatnonzero(~self._deleted[:self._size])
+        new_positions = np.full(self._size, -1, dtype=np.int64)
+        new_positions[live_positions] = np.arange(len(live_positions))
+
+        capacity = max(len(live_positions), 1024)
+        vectors = np.empty((capacity, self._vectors.shape[1]), dtype=np.float32)
+        vectors[:len(live_positions)] = self._vectors[live_positions]
+        self._vectors = vectors
+        self._deleted = np.zeros(capacity, dtype=bool)
+        self._ids = [self._ids[position] for position in live_positions.tolist()]
+        self._positions = {doc_id: position for position, doc_id in enumerate(self._ids)}
+        self._size = len(live_positions)
+
+        for list_id, members in enumerate(self._lists):
+            renumbered = new_positions[np.asarray(members, dtype=np.int64)]
+            self._lists[list_id] = renumbered[renumbered >= 0].tolist()
+            self._list_arrays[list_id] = None
+        logger.debug(f"Compacted IVF index to {self._size} vectors")
+
+    def _needs_training(self) -> bool:
+        if self._live < self.min_train_size:
+            return False
+        return self._centroids is None or self._live >= self._trained_size * self.retrain_growth
+
+    def _train(self, iterations: int = 10):
+        """Train the coarse quantizer with k-means on a sample and rebuild the inverted lists"""
+        live_positions = np.flatnonzero(~self._deleted[:self._size])
+        nlist = self.nlist or max(1, int(np.sqrt(len(live_positions))))
+        nlist = min(nlist, len(live_positions))
+
+        rng = np.random.default_rng(0)
+        sample_size = min(len(live_positions), nlist * 64)
+        sample = self._vectors[rng.choice(live_positions, size=sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            for list_id in range(nlist):
+                members = sample[assignment == list_id]
+                if len(members):
+                    centroids[list_id] = members.mean(axis=0)
+
+        self._centroids = centroids
+        self._lists = [[] for _ in range(nlist)]
+        self._list_arrays = [None] * nlist
+        self._assign(live_positions)
+        self._trained_size = len(live_positions)
+        logger.info(f"Trained IVF index: {nlist} lists over {len(live_positions)} vectors")
+
+    def _assign(self, positions: np.ndarray):
+        """Append positions to the inverted list of their nearest centroid"""
+        for start in range(0, len(positions), 65536):
+            batch = positions[start:start + 65536]
+            assignment = np.argmax(self._vectors[batch] @ self._centroids.T, axis=1)
+            for position, list_id in zip(batch.tolist(), assignment.tolist()):
+                self._lists[list_id].append(position)
+                self._list_arrays[list_id] = None
+
+    def _list_array(self, list_id: int) -> np.ndarray:
+        array = self._list_arrays[list_id]
+        if array is None:
+            array = np.asarray(self._lists[list_id], dtype=np.int64)
+            self._list_arrays[list_id] = array
+        return array
+
+
+@component
+class VectorIndexUpdater:
+    """Indexing-pipeline component adding embedded documents to a vector index and passing them on"""
+
+    def __init__(self, index: IVFIndex):
+        self.index = index
+
+    @component.output_types(documents=List[Document])
+    def run(self, documents: List[Document]) -> Dict[str, Any]:
+        embedded = [doc for doc in documents if doc.embedding is not None]
+        if embedded:
+            self.index.add([doc.id for doc in embedded], np.asarray([doc.embedding for doc in embedded]))
+        return {"documents": documents}
+
+
+@component
+class ANNEmbeddingRetriever:
+    """Embedding retriever backed by an approximate nearest-neighbour index over an in-memory document store"""
+
+    def __init__(self, document_store: Any, index: IVFIndex, top_k: int = 10):
+        """
+        Initialize the retriever
+
+        Args:
+            document_store: Store holding the documents indexed in `index`
+            index: The ANN index
+            top_k: Default number of documents to return
+        """
+        self.document_store = document_store
+        self.index = index
+        self.top_k = top_k
+
+    @component.output_types(documents=List[Document])
+    def run(self, query_embedding: List[float], filters: Optional[Dict[str, Any]] = None,
+            top_k: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Retrieve the documents most similar to the query embedding
+
+        Args:
+            query_embedding: Embedding of the query
+            filters: Metadata filters; the ANN index cannot apply them, so filtered queries are exact
+            top_k: Number of documents to return
+
+        Returns:
+            Dictionary with the retrieved documents, scores set
+        """
+        top_k = top_k or self.top_k
+        if filters:
+            return {"documents": self.document_store.embedding_retrieval(
+                query_embedding=query_embedding, filters=filters, top_k=top_k
+            )}
+
+        hits = self.index.search(np.asarray(query_embedding, dtype=np.float32), top_k)
+        if hasattr(self.document_store, "get_documents_by_id"):
+            storage = {doc.id: doc for doc in self.document_store.get_documents_by_id([doc_id for doc_id, _ in hits])}
+        else:
+            storage = self.document_store.storage
+
+        documents = []
+        for doc_id, score in hits:
+            # Skip ids deleted from the store but still in the index
+            if doc_id in storage:
+                documents.append(replace(storage[doc_id], score=score))
+        return {"documents": documents}
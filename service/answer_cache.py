@@ -0,0 +1,193 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from utils.logging import logger
+
+# Rough per-entry bookkeeping overhead (dict slots, dataclass, keys) in bytes
+_ENTRY_OVERHEAD_BYTES = 512
+
+
+@dataclass
+class _CacheEntry:
+    embedding: np.ndarray
+    intent: Optional[str]
+    store_version: int
+    response: Dict[str, Any]
+    created_at: float
+    size_bytes: int
+
+
+class SemanticAnswerCache:
+    """
+    Response cache matched on query embedding similarity
+
+    An entry is reused for a new query when both were classified with the same intent against the same
+    document-store version and their embeddings have a cosine similarity above the threshold. Entries are
+    evicted least-recently-used first when the entry count or memory cap is exceeded. An expired entry is
+    never served: the TTL is checked on the matched entry, and a sweep every half TTL frees the rest.
+    """
+
+    def __init__(self, similarity_threshold: float, max_entries: int, max_bytes: int, ttl_seconds: float):
+        """
+        Initialize the cache
+
+        Args:
+            similarity_threshold: Minimum cosine similarity between query embeddings for a hit
+            max_entries: Maximum number of cached responses
+            max_bytes: Approximate memory cap for embeddings and responses
+            ttl_seconds: Time after which an entry expires
+        """
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: "OrderedDict[int, _CacheEntry]" = OrderedDict()
+        # Stacked embeddings per (intent, store version), rebuilt lazily after inserts and evictions
+        self._buckets: Dict[Tuple[Optional[str], int], Tuple[List[int], Optional[np.ndarray]]] = {}
+        self._next_id = 0
+        self._bytes = 0
+        self._next_sweep = time.monotonic() + ttl_seconds / 2
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def lookup(self, embedding: List[float], intent: Optional[str], store_version: int) -> Optional[Dict[str, Any]]:
+        """
+        Find the cached response of the most similar earlier query
+
+        Args:
+            embedding: Embedding of the query
+            intent: Intent the query was classified with
+            store_version: Current document-store version
+
+        Returns:
+            A copy of the cached response, or None on a miss
+        """
+        vector = self._normalize(embedding)
+        with self._lock:
+            now = time.monotonic()
+            if now >= self._next_sweep:
+                self._expire(now)
+            key = (intent, store_version)
+            bucket = self._bucket_matrix(key)
+            if bucket is not None:
+                entry_ids, matrix = bucket
+                scores = matrix @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.similarity_threshold:
+                    entry_id = entry_ids[best]
+                    if self._expired(entry_id, now):
+                        self._remove(entry_id)
+                        self._stats["expirations"] += 1
+                    else:
+                        self._entries.move_to_end(entry_id)
+                        self._stats["hits"] += 1
+                        return dict(self._entries[entry_id].response)
+
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, embedding: List[float], intent: Optional[str], store_version: int, response: Dict[str, Any]):
+        """
+        Cache the response of a query
+
+        Args:
+            embedding: Embedding of the query
+            intent: Intent the query was classified with
+            store_version: Document-store version the response was generated against
+            response: The response to cache
+        """
+        vector = self._normalize(embedding)
+        size_bytes = vector.nbytes + len(json.dumps(response, default=str)) + _ENTRY_OVERHEAD_BYTES
+        if self.max_entries <= 0 or size_bytes > self.max_bytes:
+            return
+
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _CacheEntry(
+                embedding=vector,
+                intent=intent,
+                store_version=store_version,
+                response=dict(response),
+                created_at=time.monotonic(),
+                size_bytes=size_bytes
+            )
+            self._bytes += size_bytes
+            self._buckets.setdefault((intent, store_version), ([], None))[0].append(entry_id)
+            self._mark_dirty((intent, store_version))
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+                self._stats["evictions"] += 1
+
+    def invalidate(self):
+        """Drop all entries, e.g. after the document store changed"""
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self._bytes = 0
+            self._stats["invalidations"] += 1
+        logger.info("Semantic answer cache invalidated")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit, miss and eviction counters and the current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+    def _bucket_matrix(self, key: Tuple[Optional[str], int]) -> Optional[Tuple[List[int], np.ndarray]]:
+        """Return the entry ids and stacked embeddings for a bucket, None if it is empty"""
+        if key not in self._buckets:
+            return None
+        entry_ids, matrix = self._buckets[key]
+        if not entry_ids:
+            return None
+        if matrix is None:
+            matrix = np.vstack([self._entries[entry_id].embedding for entry_id in entry_ids])
+            self._buckets[key] = (entry_ids, matrix)
+        return entry_ids, matrix
+
+    def _mark_dirty(self, key: Tuple[Optional[str], int]):
+        entry_ids, _ = self._buckets[key]
+        self._buckets[key] = (entry_ids, None)
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        self._bytes -= entry.size_bytes
+        key = (entry.intent, entry.store_version)
+        entry_ids, _ = self._buckets[key]
+        entry_ids.remove(entry_id)
+        if entry_ids:
+            self._mark_dirty(key)
+        else:
+            del self._buckets[key]
+
+    def _expired(self, entry_id: int, now: float) -> bool:
+        return self.ttl_seconds > 0 and self._entries[entry_id].created_at < now - self.ttl_seconds
+
+    def _expire(self, now: float):
+        """Remove all entries older than the TTL; a full scan, so only run every half TTL"""
+        self._next_sweep = now + self.ttl_seconds / 2
+        if self.ttl_seconds <= 0:
+            return
+        expired = [entry_id for entry_id in self._entries if self._expired(entry_id, now)]
+        for entry_id in expired:
+            self._remove(entry_id)
+            self._stats["expirations"] += 1
@@ -0,0 +1,184 @@
+import tarfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from haystack.dataclasses import Document
+from service.ingestion import StreamingIndexer
+from service.rag_service import RAGService
+from utils.config import settings
+from utils.logging import logger
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+
+def is_archive(name: str) -> bool:
+    return name.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def iter_text_files(path: Path, name: Optional[str] = None) -> Iterator[Tuple[str, BinaryIO]]:
+    """
+    Yield (name, binary stream) for every .txt file in a file, directory, zip or tar archive
+
+    Archive members are streamed, never extracted to disk. Each stream is only valid until the next one is
+    requested.
+
+    Args:
+        path: A .txt file, a directory (searched recursively) or an archive
+        name: Name to report instead of the path (e.g. the original name of a spooled upload)
+    """
+    path = Path(path)
+    name = name or str(path)
+    if path.is_dir():
+        for file in sorted(path.rglob("*")):
+            if file.is_file() and (file.suffix == ".txt" or is_archive(file.name)):
+                yield from iter_text_files(file)
+    elif name.lower().endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.infolist():
+                if not member.is_dir() and member.filename.endswith(".txt"):
+                    with archive.open(member) as stream:
+                        yield f"{name}/{member.filename}", stream
+    elif is_archive(name):
+        with tarfile.open(path, "r:*") as archive:
+            for member in archive:
+                if member.isfile() and member.name.endswith(".txt"):
+                    with archive.extractfile(member) as stream:
+                        yield f"{name}/{member.name}", stream
+    elif name.endswith(".txt"):
+        with open(path, "rb") as stream:
+            yield name, stream
+    else:
+        logger.warning(f"Skipping '{name}': only .txt files and zip/tar archives are supported")
+
+
+class BulkIndexer:
+    """
+    Index many documents with chunks pooled across documents into fixed-size embedding batches
+
+    Each document is streamed, cleaned and split on its own, and its new or changed chunks (unchanged ones
+    are skipped, see StreamingIndexer) go to a shared pool; whenever the pool holds `batch_size` chunks they
+    are embedded in one embedder call and written to the store in bulk. The embedder thus always sees full
+    batches (and can sort a whole batch by length to limit padding) instead of one small, uneven batch per
+    file.
+    """
+
+    def __init__(self, rag: RAGService, batch_size: int,
+                 on_progress: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        Initialize the indexer
+
+        Args:
+            rag: Service providing the preprocessing and embedding pipelines
+            batch_size: Chunks embedded and written per batch
+            on_progress: Called with the stats dict after every written batch and finished document
+        """
+        self.rag = rag
+        self.batch_size = batch_size
+        self.on_progress = on_progress
+
+        self._pending: List[Document] = []
+        # Finished files waiting for their pooled chunks to be written before they enter the catalog, with
+        # the number of chunks pooled when each finished
+        self._unrecorded: List[Tuple[int, Dict[str, Any]]] = []
+        self._pooled = 0
+        self._flushed = 0
+        self.bytes_read = 0
+        self.documents = 0
+        self.chunks_written = 0
+        self.chunks_skipped = 0
+        self.chunks_removed = 0
+        self.batches = 0
+        self._started = time.perf_counter()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Documents, chunks and batches so far with throughput"""
+        elapsed = time.perf_counter() - self._started
+        # Like StreamingIndexer, count unchanged chunks as indexed
+        chunks_indexed = self.chunks_written + self.chunks_skipped
+        return {
+            "documents": self.documents,
+            "bytes_read": self.bytes_read,
+            "chunks_indexed": chunks_indexed,
+            "chunks_skipped": self.chunks_skipped,
+            "chunks_removed": self.chunks_removed,
+            "embedding_batches": self.batches,
+            "elapsed_seconds": round(elapsed, 3),
+            "documents_per_second": round(self.documents / elapsed, 1) if elapsed else 0.0,
+            "chunks_per_second": round(chunks_indexed / elapsed, 1) if elapsed else 0.0
+        }
+
+    def add_stream(self, name: str, stream: BinaryIO):
+        """
+        Split a document read from a binary stream and pool its chunks
+
+        Args:
+            name: Name stored as the chunks' `file_path` meta
+            stream: The document's bytes
+        """
+        existing_meta = self.rag.chunk_meta_for(name)
+        indexer = StreamingIndexer(
+            self.rag.split_document,
+            self._pool,
+            source=name,
+            segment_chars=settings.UPLOAD_CHUNK_SIZE,
+            existing_ids=existing_meta,
+            delete=self.rag.delete_chunks,
+            on_finish=lambda progress: self._unrecorded.append((self._pooled, progress)),
+            existing_meta=existing_meta,
+            update_meta=self.rag.update_chunk_meta
+        )
+        while data := stream.read(settings.UPLOAD_CHUNK_SIZE):
+            indexer.feed(data)
+            self.bytes_read += len(data)
+        progress = indexer.finish()
+        self.documents += 1
+        self.chunks_skipped += progress["chunks_skipped"]
+        self.chunks_removed += progress["chunks_removed"]
+        self._report()
+
+    def add_path(self, path: Path, name: Optional[str] = None):
+        """Split every .txt file in a file, directory or archive and pool its chunks"""
+        for file_name, stream in iter_text_files(path, name):
+            self.add_stream(file_name, stream)
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        Embed and write the chunks left in the pool
+
+        Returns:
+            The final stats dict
+        """
+        while self._pending:
+            self._write_batch()
+        self._record_files()
+        stats = self.stats
+        logger.info(f"Bulk indexed {stats['documents']} documents, {stats['chunks_indexed']} chunks in "
+                    f"{stats['embedding_batches']} batches ({stats['documents_per_second']} docs/s, "
+                    f"{stats['chunks_per_second']} chunks/s)")
+        return stats
+
+    def _pool(self, chunks: List[Document]):
+        self._pending.extend(chunks)
+        self._pooled += len(chunks)
+        while len(self._pending) >= self.batch_size:
+            self._write_batch()
+
+    def _write_batch(self):
+        batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+        self.chunks_written += self.rag.write_chunks(batch)
+        self.batches += 1
+        self._flushed += len(batch)
+        self._record_files()
+        self._report()
+
+    def _record_files(self):
+        """Add the finished files whose chunks are all written to the document catalog"""
+        while self._unrecorded and self._unrecorded[0][0] <= self._flushed:
+            self.rag.record_indexed_file(self._unrecorded.pop(0)[1])
+
+    def _report(self):
+        if self.on_progress is not None:
+            self.on_progress(self.stats)
@@ -0,0 +1,181 @@
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from haystack.dataclasses import Document
+
+# Words and punctuation marks; within ~10% of BPE token counts for English prose
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+# Sentence boundaries: whitespace after ., ! or ? (optionally followed by a closing quote or bracket)
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])[\"')\]]*\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate LLM token count of a text"""
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+
+
+@dataclass
+class PackedContext:
+    """Passages to put in the prompt and what packing saved"""
+    passages: List[Document]
+    chunks: int  # Retrieved chunks packed
+    tokens_before: int  # Tokens of the retrieved chunks as they were
+    tokens_after: int  # Tokens of the packed passages
+    sentences_removed: int  # Repeated sentences dropped
+    truncated: bool  # Whether the budget cut the context short
+
+
+@dataclass
+class _Span:
+    """Text of consecutive or overlapping chunks of one file"""
+    text: str
+    end: Optional[int]
+    rank: int  # Position of the best-ranked chunk in the retrieval results
+    score: Optional[float]
+    meta: Dict[str, Any] = field(default_factory=dict)
+    chunks: int = 1
+
+
+class ContextPacker:
+    """
+    Pack retrieved chunks into prompt passages within a token budget
+
+    Chunks of the same file (and ingestion segment) that are adjacent or overlap, as found from the
+    splitter's `split_idx_start` offsets, are merged into one passage so the overlap appears once. Any
+    sentence that was already packed is then dropped, which catches repeats that offsets cannot (e.g.
+    chunks indexed without offsets, or boilerplate repeated across a file). Passages are filled in
+    retrieval order, sentence by sentence, until the intent's token budget is used up.
+    """
+
+    def __init__(self, default_budget: int, budgets: Optional[Dict[str, int]] = None):
+        """
+        Initialize the packer
+
+        Args:
+            default_budget: Context token budget for intents without their own
+            budgets: Context token budget per intent name
+        """
+        self.default_budget = default_budget
+        self.budgets = budgets or {}
+        self._lock = threading.Lock()
+        self._stats = {"packed": 0, "chunks": 0, "tokens_before": 0, "tokens_after": 0, "sentences_removed": 0,
+                       "truncated": 0}
+
+    def budget_for(self, intent: Optional[str]) -> int:
+        return self.budgets.get(intent, self.default_budget)
+
+    def pack(self, documents: List[Document], intent: Optional[str] = None) -> PackedContext:
+        """
+        Merge, de-duplicate and budget retrieved chunks
+
+        Args:
+            documents: Retrieved chunks, best first
+            intent: Intent of the query, selecting the token budget
+
+        Returns:
+            The packed passages (best first) and token counts before and after packing
+        """
+        budget = self.budget_for(intent)
+        spans = sorted(self._merge(documents), key=lambda span: span.rank)
+
+        passages = []
+        seen = set()
+        used = 0
+        removed = 0
+        truncated = False
+        for span in spans:
+            kept = []
+            for sentence in split_sentences(span.text):
+                key = " ".join(sentence.lower().split())
+                if key in seen:
+                    removed += 1
+                    continue
+                tokens = estimate_tokens(sentence)
+                # The first sentence always goes in, so a tiny budget never leaves the prompt empty
+                if used + tokens > budget and used > 0:
+                    truncated = True
+                    break
+                seen.add(key)
+                kept.append(sentence)
+                used += tokens
+            if kept:
+                passages.append(Document(content=" ".join(kept), score=span.score,
+                                         meta={**span.meta, "packed_chunks": span.chunks}))
+            if truncated:
+                break
+
+        packed = PackedContext(
+            passages=passages,
+            chunks=len(documents),
+            tokens_before=sum(estimate_tokens(doc.content or "") for doc in documents),
+            tokens_after=used,
+            sentences_removed=removed,
+            truncated=truncated
+        )
+        with self._lock:
+            self._stats["packed"] += 1
+            self._stats["chunks"] += packed.chunks
+            self._stats["tokens_before"] += packed.tokens_before
+            self._stats["tokens_after"] += packed.tokens_after
+            self._stats["sentences_removed"] += packed.sentences_removed
+            self._stats["truncated"] += int(packed.truncated)
+        return packed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Totals over all packed contexts, with the share of context tokens saved"""
+        with self._lock:
+            stats = dict(self._stats)
+        before = stats["tokens_before"]
+        stats["token_reduction"] = round(1 - stats["tokens_after"] / before, 3) if before else 0.0
+        return stats
+
+    @staticmethod
+    def _merge(documents: List[Document]) -> List[_Span]:
+        """Merge adjacent and overlapping chunks of the same file and segment into spans"""
+        groups: Dict[Tuple, List[Tuple[int, Document]]] = {}
+        for rank, doc in enumerate(documents):
+            key = (doc.meta.get("file_path"), doc.meta.get("segment"))
+            groups.setdefault(key, []).append((rank, doc))
+
+        spans = []
+        for (file_path, _), ranked in groups.items():
+            if any("split_idx_start" not in doc.meta for _, doc in ranked):
+                spans.extend(_Span(doc.content or "", None, rank, doc.score, {"file_path": file_path})
+                             for rank, doc in ranked)
+                continue
+
+            current: Optional[_Span] = None
+            for rank, doc in sorted(ranked, key=lambda item: item[1].meta["split_idx_start"]):
+                content = doc.content or ""
+                start = doc.meta["split_idx_start"]
+                end = start + len(content)
+                if current is not None and start <= current.end and ContextPacker._overlaps(current, content, start):
+                    # Append only the part past the end of the span
+                    current.text += content[current.end - start:]
+                    current.end = max(current.end, end)
+                    current.rank = min(current.rank, rank)
+                    if doc.score is not None:
+                        current.score = max(current.score if current.score is not None else doc.score, doc.score)
+                    current.chunks += 1
+                else:
+                    current = _Span(content, end, rank, doc.score, {"file_path": file_path})
+                    spans.append(current)
+        return spans
+
+    @staticmethod
+    def _overlaps(span: _Span, content: str, start: int) -> bool:
+        """
+        Whether a chunk starting at `start` repeats the text the span has at those offsets
+
+        Offsets of chunks indexed from different versions of a file (e.g. kept by content hash across a
+        re-upload that inserted text before them) do not line up, so they are only merged if they agree.
+        """
+        offset = len(span.text) - (span.end - start)
+        overlap = min(span.end - start, len(content))
+        return offset >= 0 and span.text[offset:offset + overlap] == content[:overlap]
@@ -0,0 +1,176 @@
+import bisect
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from utils.logging import logger
+
+
+class DocumentCatalog:
+    """
+    Per-file summary of the indexed documents, kept up to date at index time
+
+    Holds one entry per file (chunk count, byte size, SHA-256 of the content, index time) and the file
+    names in sorted order, so listing documents never touches the document store and a page costs
+    O(limit).
+
+    With a path, every change is appended to a JSON-lines journal that is replayed on startup and
+    rewritten once it holds more than twice as many records as there are files.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Initialize the catalog, loading the journal if there is one
+
+        Args:
+            path: Journal file; None keeps the catalog in memory only
+        """
+        self.path = Path(path) if path is not None else None
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._names: List[str] = []
+        self._total_chunks = 0
+        self._journal_records = 0
+        self._lock = threading.Lock()
+        if self.path is not None and self.path.exists():
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_chunks(self) -> int:
+        return self._total_chunks
+
+    def upsert(self, file_path: str, chunks: int, size_bytes: Optional[int], sha256: Optional[str],
+               indexed_at: Optional[float] = None):
+        """
+        Record a file as indexed
+
+        Args:
+            file_path: The file's `file_path` meta
+            chunks: Number of chunks stored for the file
+            size_bytes: Size of the file's content
+            sha256: SHA-256 hex digest of the file's content
+            indexed_at: Unix time of indexing (default now)
+        """
+        entry = {
+            "file_path": file_path,
+            "chunks": chunks,
+            "bytes": size_bytes,
+            "sha256": sha256,
+            "indexed_at": indexed_at if indexed_at is not None else time.time()
+        }
+        with self._lock:
+            self._apply(entry)
+            self._append({"op": "upsert", **entry})
+
+    def remove(self, file_path: str):
+        """Forget a file (no-op if unknown)"""
+        with self._lock:
+            if file_path in self._entries:
+                self._apply({"file_path": file_path}, remove=True)
+                self._append({"op": "remove", "file_path": file_path})
+
+    def get(self, file_path: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(file_path)
+        return dict(entry) if entry is not None else None
+
+    def page(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Entries in file name order
+
+        Args:
+            offset: Number of entries to skip
+            limit: Maximum number of entries; None returns the rest
+
+        Returns:
+            Copies of the entries
+        """
+        with self._lock:
+            names = self._names[offset:offset + limit if limit is not None else None]
+            return [dict(self._entries[name]) for name in names]
+
+    def rebuild(self, chunk_counts: Dict[str, int]):
+        """
+        Reset the chunk counts to the ones found in the document store
+
+        Entries of files still in the store keep their size, hash and index time; files only in the
+        store get entries without them.
+
+        Args:
+            chunk_counts: Number of stored chunks per file
+        """
+        with self._lock:
+            previous = self._entries
+            self._entries, self._names, self._total_chunks = {}, [], 0
+            for file_path, chunks in chunk_counts.items():
+                entry = previous.get(file_path, {"bytes": None, "sha256": None, "indexed_at": None})
+                self._apply({**entry, "file_path": file_path, "chunks": chunks})
+            self._compact()
+
+    def _apply(self, entry: Dict[str, Any], remove: bool = False):
+        file_path = entry["file_path"]
+        previous = self._entries.pop(file_path, None)
+        if previous is not None:
+            self._total_chunks -= previous["chunks"]
+        if remove:
+            del self._names[bisect.bisect_left(self._names, file_path)]
+            return
+        if previous is None:
+            bisect.insort(self._names, file_path)
+        self._entries[file_path] = entry
+        self._total_chunks += entry["chunks"]
+
+    def _append(self, record: Dict[str, Any]):
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._journal_records += 1
+        if self._journal_records > 2 * max(len(self._entries), 16):
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the journal with one record per file"""
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w") as f:
+            for name in self._names:
+                f.write(json.dumps({"op": "upsert", **self._entries[name]}, separators=(",", ":")) + "\n")
+        os.replace(tmp_path, self.path)
+        self._journal_records = len(self._entries)
+
+    def _load(self):
+        records = 0
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn last line from a crash mid-append
+                    logger.warning(f"Skipping unreadable document catalog record in {self.path}")
+                    continue
+                op = record.pop("op")
+                if op == "remove" and record["file_path"] not in self._entries:
+                    continue
+                self._apply(record, remove=op == "remove")
+                records += 1
+        self._journal_records = records
+        if records > len(self._entries):
+            self._compact()
+        logger.info(f"Loaded document catalog of {len(self._entries)} files ({self._total_chunks} chunks)")
+
+
+def count_chunks_by_file(documents: Iterable[Any]) -> Dict[str, int]:
+    """Number of chunks per `file_path` meta, for rebuilding the catalog from a document store"""
+    counts: Dict[str, int] = {}
+    for doc in documents:
+        file_path = doc.meta.get("file_path", "unknown")
+        counts[file_path] = counts.get(file_path, 0) + 1
+    return counts
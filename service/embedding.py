@@ -0,0 +1,206 @@
+import threading
+import time
+from dataclasses import replace
+from typing import Any, Dict, List, Optional
+
+from haystack import component
+from haystack.dataclasses import Document
+from utils.cache import LRUCache
+from utils.logging import logger
+
+
+class EmbeddingModel:
+    """
+    One sentence-transformers model shared by every embedder of the process
+
+    The model is loaded once, on the first `load` (or `warm_up`), under a lock so concurrent first
+    callers do not load it twice.
+    """
+
+    def __init__(self, model: str, device: Optional[str] = None, batch_size: int = 32):
+        """
+        Initialize without loading the model
+
+        Args:
+            model: Sentence-transformers model name or path
+            device: Device to load the model on; None lets sentence-transformers pick
+            batch_size: Texts encoded per forward pass
+        """
+        self.model = model
+        self.device = device
+        self.batch_size = batch_size
+        self._model = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Load the model if it is not loaded yet"""
+        if self._model is not None:
+            return
+        with self._lock:
+            if self._model is not None:
+                return
+            from sentence_transformers import SentenceTransformer
+
+            started = time.perf_counter()
+            self._model = SentenceTransformer(self.model, device=self.device)
+            logger.info(f"Loaded embedding model '{self.model}' in {time.perf_counter() - started:.2f}s")
+
+    def warm_up(self):
+        """Load the model and run a dummy inference so the first real request does not pay for either"""
+        self.load()
+        started = time.perf_counter()
+        self.embed(["warm up"])
+        logger.info(f"Embedding model warm-up inference took {time.perf_counter() - started:.2f}s")
+
+    def embed(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        """
+        Embed texts
+
+        Args:
+            texts: The texts to embed
+            batch_size: Texts per forward pass (default the model's batch size)
+
+        Returns:
+            One embedding per text
+        """
+        self.load()
+        embeddings = self._model.encode(
+            texts,
+            batch_size=batch_size or self.batch_size,
+            show_progress_bar=False,
+            convert_to_numpy=True
+        )
+        return embeddings.tolist()
+
+
+@component
+class SharedDocumentEmbedder:
+    """Document embedder backed by a shared EmbeddingModel (same outputs as SentenceTransformersDocumentEmbedder)"""
+
+    def __init__(self, embedding_model: EmbeddingModel, batch_size: Optional[int] = None):
+        self.embedding_model = embedding_model
+        self.model = embedding_model.model
+        self.batch_size = batch_size
+
+    def warm_up(self):
+        self.embedding_model.load()
+
+    @component.output_types(documents=List[Document])
+    def run(self, documents: List[Document]) -> Dict[str, Any]:
+        """
+        Embed documents by their content
+
+        Args:
+            documents: The documents to embed
+
+        Returns:
+            Dictionary with copies of the documents carrying their embedding
+        """
+        if not isinstance(documents, list) or documents and not isinstance(documents[0], Document):
+            raise TypeError("SharedDocumentEmbedder expects a list of Documents as input")
+        embeddings = self.embedding_model.embed([doc.content or "" for doc in documents], self.batch_size)
+        return {"documents": [replace(doc, embedding=emb) for doc, emb in zip(documents, embeddings)]}
+
+
+@component
+class SharedTextEmbedder:
+    """Text embedder backed by a shared EmbeddingModel (same outputs as SentenceTransformersTextEmbedder)"""
+
+    def __init__(self, embedding_model: EmbeddingModel):
+        self.embedding_model = embedding_model
+        self.model = embedding_model.model
+
+    def warm_up(self):
+        self.embedding_model.load()
+
+    @component.output_types(embedding=List[float])
+    def run(self, text: str) -> Dict[str, Any]:
+        """
+        Embed a text
+
+        Args:
+            text: The text to embed
+
+        Returns:
+            Dictionary with the embedding
+        """
+        if not isinstance(text, str):
+            raise TypeError("SharedTextEmbedder expects a string as input")
+        return {"embedding": self.embedding_model.embed([text])[0]}
+
+    def run_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed several texts in one encode call"""
+        return self.embedding_model.embed(texts)
+
+
+@component
+class CachedTextEmbedder:
+    """Text embedder wrapper that caches embeddings by (model name, text)"""
+
+    def __init__(self, embedder: Any, cache_size: int):
+        """
+        Initialize with the wrapped embedder
+
+        Args:
+            embedder: Text embedder component producing `embedding` for a `text`
+            cache_size: Maximum number of cached embeddings; 0 disables the cache
+        """
+        self.embedder = embedder
+        self.model = getattr(embedder, "model", type(embedder).__name__)
+        self.cache = LRUCache(cache_size)
+
+    def warm_up(self):
+        """Warm up the wrapped embedder"""
+        if hasattr(self.embedder, "warm_up"):
+            self.embedder.warm_up()
+
+    @component.output_types(embedding=List[float])
+    def run(self, text: str) -> Dict[str, Any]:
+        """
+        Embed a text, reusing the cached embedding of an identical text
+
+        Args:
+            text: The text to embed
+
+        Returns:
+            Dictionary with the embedding
+        """
+        key = (self.model, text)
+        embedding = self.cache.get(key)
+        if embedding is None:
+            embedding = self.embedder.run(text=text)["embedding"]
+            self.cache.put(key, embedding)
+        # Callers get their own list so a mutation cannot corrupt the cache
+        return {"embedding": list(embedding)}
+
+    def run_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several texts, computing all cache misses in one call to the wrapped embedder
+
+        Args:
+            texts: The texts to embed
+
+        Returns:
+            One embedding per text, in order
+        """
+        embeddings: Dict[str, List[float]] = {}
+        misses = []
+        for text in dict.fromkeys(texts):
+            embedding = self.cache.get((self.model, text))
+            if embedding is None:
+                misses.append(text)
+            else:
+                embeddings[text] = embedding
+        if misses:
+            if hasattr(self.embedder, "run_batch"):
+                computed = self.embedder.run_batch(misses)
+            else:
+                computed = [self.embedder.run(text=text)["embedding"] for text in misses]
+            for text, embedding in zip(misses, computed):
+                self.cache.put((self.model, text), embedding)
+                embeddings[text] = embedding
+        return [list(embeddings[text]) for text in texts]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the embedding cache counters"""
+        return self.cache.get_stats()
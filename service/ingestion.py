@@ -0,0 +1,206 @@
+import codecs
+import hashlib
+import re
+import time
+from dataclasses import replace
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from haystack.dataclasses import Document
+from utils.logging import logger
+
+# Sentence ends, used to cut a segment when there is no paragraph break
+SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s")
+# Meta that depends on where a chunk is in its file, not on its content
+POSITION_META = ("segment", "split_id", "split_idx_start", "page_number")
+
+
+def chunk_id(source: str, content_hash: str, occurrence: int) -> str:
+    """Id of the `occurrence`-th chunk with a given content hash in a file; stable across re-uploads"""
+    return hashlib.sha256(f"{source}\x00{content_hash}\x00{occurrence}".encode("utf-8")).hexdigest()
+
+
+class StreamingIndexer:
+    """
+    Incrementally (re-)index a text stream without holding it in memory
+
+    Bytes are fed in arbitrary chunks, decoded incrementally and buffered until `segment_chars` characters are
+    available. The buffer is then cut at the last paragraph break (or sentence end, or whitespace) and the
+    text before the cut is split into chunks as one segment. Memory is bounded by a segment plus one fed
+    chunk, whatever the size of the stream.
+
+    Every chunk gets a `content_hash` meta and an id derived from the file, that hash and its occurrence
+    count, so re-indexing a file yields the same ids for unchanged chunks. Only chunks whose id is not in
+    `existing_ids` are passed on to be embedded and written; unchanged chunks that moved (e.g. after text
+    was inserted above them) only get their stored meta rewritten. When the stream ends, the file's chunks
+    that did not come back are deleted.
+
+    Splitting never crosses a segment boundary, so the chunk ending a segment may be shorter than
+    SPLIT_LENGTH and does not overlap the next one.
+    """
+
+    def __init__(self, split: Callable[[Document], List[Document]], write: Callable[[List[Document]], Any],
+                 source: str, segment_chars: int, existing_ids: Iterable[str] = (),
+                 delete: Optional[Callable[[List[str]], Any]] = None, total_bytes: Optional[int] = None,
+                 encoding: str = "utf-8", on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 on_finish: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 existing_meta: Optional[Dict[str, Dict[str, Any]]] = None,
+                 update_meta: Optional[Callable[[List[Document]], Any]] = None):
+        """
+        Initialize the indexer
+
+        Args:
+            split: Cleans a segment document and splits it into chunks
+            write: Embeds and writes new chunks
+            source: Name stored as the chunks' `file_path` meta
+            segment_chars: Characters of text indexed at a time
+            existing_ids: Ids of the chunks already stored for this file
+            delete: Deletes chunks by id; called once at the end with the chunks that went away
+            total_bytes: Size of the stream if known, for progress reporting
+            encoding: Text encoding of the stream
+            on_progress: Called with the progress dict after every indexed segment
+            on_finish: Called with the final progress dict (including the content's `sha256`) once the stream
+                is indexed
+            existing_meta: Stored meta of the existing chunks by id
+            update_meta: Rewrites the meta of stored chunks without embedding them again; called with the
+                unchanged chunks whose position meta differs from `existing_meta`
+        """
+        self.split = split
+        self.write = write
+        self.delete = delete
+        self.source = source
+        self.segment_chars = segment_chars
+        self.total_bytes = total_bytes
+        self.on_progress = on_progress
+        self.on_finish = on_finish
+        self.update_meta = update_meta
+
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._hash = hashlib.sha256()
+        self.sha256: Optional[str] = None
+        self._buffer = ""
+        self._existing_ids = set(existing_ids)
+        self._existing_meta = existing_meta or {}
+        self._seen_ids = set()
+        self._occurrences: Dict[str, int] = {}
+        self.bytes_read = 0
+        self.segments = 0
+        self.chunks_indexed = 0
+        self.chunks_embedded = 0
+        self.chunks_skipped = 0
+        self.chunks_moved = 0
+        self.chunks_removed = 0
+        self._started = time.perf_counter()
+
+    @property
+    def progress(self) -> Dict[str, Any]:
+        """Bytes read, segments and chunks indexed so far"""
+        progress = {
+            "source": self.source,
+            "bytes_read": self.bytes_read,
+            "total_bytes": self.total_bytes,
+            "segments": self.segments,
+            "chunks_indexed": self.chunks_indexed,
+            "chunks_embedded": self.chunks_embedded,
+            "chunks_skipped": self.chunks_skipped,
+            "chunks_moved": self.chunks_moved,
+            "chunks_removed": self.chunks_removed,
+            "sha256": self.sha256,
+            "elapsed_seconds": round(time.perf_counter() - self._started, 3)
+        }
+        if self.total_bytes:
+            progress["percent"] = round(100.0 * self.bytes_read / self.total_bytes, 1)
+        return progress
+
+    def feed(self, data: bytes):
+        """
+        Add bytes of the stream, indexing every complete segment
+
+        Args:
+            data: The next bytes of the stream
+        """
+        self.bytes_read += len(data)
+        self._hash.update(data)
+        self._buffer += self._decoder.decode(data)
+        while len(self._buffer) >= self.segment_chars:
+            cut = self._find_cut(self._buffer, self.segment_chars)
+            segment, self._buffer = self._buffer[:cut], self._buffer[cut:]
+            self._index(segment)
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        Index the remaining buffered text and delete the file's chunks that went away
+
+        Returns:
+            The final progress dict
+        """
+        self._buffer += self._decoder.decode(b"", final=True)
+        if self._buffer.strip():
+            self._index(self._buffer)
+        self._buffer = ""
+
+        stale = list(self._existing_ids - self._seen_ids)
+        if stale and self.delete is not None:
+            self.delete(stale)
+            self.chunks_removed = len(stale)
+        self.sha256 = self._hash.hexdigest()
+        logger.info(f"Streamed '{self.source}': {self.bytes_read} bytes, {self.segments} segments, "
+                    f"{self.chunks_indexed} chunks ({self.chunks_embedded} embedded, {self.chunks_skipped} "
+                    f"unchanged of which {self.chunks_moved} moved, {self.chunks_removed} removed)")
+        progress = self.progress
+        if self.on_finish is not None:
+            self.on_finish(progress)
+        return progress
+
+    def _moved(self, chunk: Document) -> bool:
+        stored = self._existing_meta[chunk.id]
+        return any(stored.get(key) != chunk.meta.get(key) for key in POSITION_META)
+
+    @staticmethod
+    def _find_cut(text: str, limit: int) -> int:
+        """Position after the last paragraph break, sentence end or whitespace in the first `limit` characters"""
+        window = text[:limit]
+        # Prefer cuts in the second half so segments do not shrink to slivers
+        floor = limit // 2
+        paragraph = window.rfind("\n\n")
+        if paragraph >= floor:
+            return paragraph + 2
+        sentence_ends = [match.end() for match in SENTENCE_END.finditer(window, floor)]
+        if sentence_ends:
+            return sentence_ends[-1]
+        space = max(window.rfind(" "), window.rfind("\n"))
+        if space >= floor:
+            return space + 1
+        return limit
+
+    def _index(self, text: str):
+        if not text.strip():
+            return
+        document = Document(content=text, meta={"file_path": self.source, "segment": self.segments})
+        chunks = self.split(document)
+        new_chunks = []
+        moved_chunks = []
+        for chunk in chunks:
+            content_hash = hashlib.sha256((chunk.content or "").encode("utf-8")).hexdigest()
+            occurrence = self._occurrences.get(content_hash, 0)
+            self._occurrences[content_hash] = occurrence + 1
+            chunk = replace(chunk, id=chunk_id(self.source, content_hash, occurrence),
+                            meta={**chunk.meta, "content_hash": content_hash})
+            self._seen_ids.add(chunk.id)
+            if chunk.id not in self._existing_ids:
+                new_chunks.append(chunk)
+            elif chunk.id in self._existing_meta and self._moved(chunk):
+                moved_chunks.append(chunk)
+        if new_chunks:
+            self.write(new_chunks)
+        if moved_chunks and self.update_meta is not None:
+            self.update_meta(moved_chunks)
+
+        self.chunks_indexed += len(chunks)
+        self.chunks_embedded += len(new_chunks)
+        self.chunks_moved += len(moved_chunks)
+        self.chunks_skipped += len(chunks) - len(new_chunks)
+        self.segments += 1
+        logger.debug(f"Indexed segment {self.segments} of '{self.source}' ({self.bytes_read} bytes read)")
+        if self.on_progress is not None:
+            self.on_progress(self.progress)
+
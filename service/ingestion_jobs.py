@@ -0,0 +1,362 @@
+import asyncio
+import itertools
+import os
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from utils.concurrency import run_in_executor
+from utils.config import settings
+from utils.logging import logger
+from utils.metrics import INGESTED_BYTES, INGESTED_CHUNKS, INGESTION_JOBS, INGESTION_STAGE_SECONDS
+
+if TYPE_CHECKING:
+    from service.rag_service import RAGService
+
+# Lower runs first
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+
+@dataclass
+class IngestionJob:
+    id: str
+    filename: str
+    files: List[Tuple[str, Path]]  # (uploaded name, spool path); several for bulk jobs
+    total_bytes: int
+    priority: str
+    bulk: bool = False
+    state: str = "queued"  # queued, running, completed or failed
+    bytes_read: int = 0
+    documents: int = 0
+    segments: int = 0
+    embedding_batches: int = 0  # bulk jobs only
+    files_done: int = 0
+    chunks_indexed: int = 0
+    chunks_skipped: int = 0  # unchanged chunks whose stored embedding was kept
+    chunks_removed: int = 0  # chunks of a previous version that went away
+    error: Optional[str] = None
+    profile: bool = False  # Profile the indexing (the upload request was profiled)
+    queued_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def _percent(self) -> float:
+        if self.state == "completed":
+            return 100.0
+        if self.bulk:
+            # Archives expand to more text than their size on disk, so count uploaded files instead
+            return round(100.0 * self.files_done / len(self.files), 1)
+        return round(100.0 * self.bytes_read / self.total_bytes, 1) if self.total_bytes else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Status of the job with its throughput"""
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "state": self.state,
+            "priority": self.priority,
+            "total_bytes": self.total_bytes,
+            "bytes_read": self.bytes_read,
+            "percent": self._percent(),
+            "documents": self.documents,
+            "segments": self.segments,
+            "embedding_batches": self.embedding_batches,
+            "chunks_indexed": self.chunks_indexed,
+            "chunks_skipped": self.chunks_skipped,
+            "chunks_removed": self.chunks_removed,
+            "elapsed_seconds": round(elapsed, 3) if elapsed is not None else None,
+            "documents_per_second": round(self.documents / elapsed, 1) if elapsed else None,
+            "chunks_per_second": round(self.chunks_indexed / elapsed, 1) if elapsed else None,
+            "bytes_per_second": round(self.bytes_read / elapsed, 1) if elapsed else None,
+            "queued_seconds": round((self.started_at or time.time()) - self.queued_at, 3),
+            "error": self.error
+        }
+
+
+class IngestionJobQueue:
+    """
+    Priority queue of document indexing jobs served by a fixed pool of asyncio workers
+
+    Uploads are spooled to disk and indexed in the background by at most `max_workers` jobs at a time, the
+    CPU-bound work running on the shared CPU executor. Jobs with a higher priority start first; within a
+    priority they run in submission order. Jobs for the same file name run one after the other, so a
+    re-upload never diffs against chunks another job is still writing. Finished jobs are kept for status
+    queries up to `max_history`.
+    """
+
+    def __init__(self, get_rag: Callable[[], "RAGService"], max_workers: int, spool_dir: Path, small_file_bytes: int,
+                 max_history: int = 1000):
+        """
+        Initialize the queue (workers start with `start`)
+
+        Args:
+            get_rag: Returns the service indexing the documents (built on first use)
+            max_workers: Maximum number of jobs running at once
+            spool_dir: Directory for uploaded files waiting to be indexed
+            small_file_bytes: Files up to this size get high priority when none is given
+            max_history: Number of finished jobs kept for status queries
+        """
+        self.get_rag = get_rag
+        self.max_workers = max_workers
+        self.spool_dir = Path(spool_dir)
+        self.small_file_bytes = small_file_bytes
+        self.max_history = max_history
+
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers: List[asyncio.Task] = []
+        self._sequence = itertools.count()
+        # Lock and number of jobs holding or waiting for it, per file name
+        self._file_locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+
+    @property
+    def rag(self) -> "RAGService":
+        return self.get_rag()
+
+    def spool_path(self, filename: str) -> Path:
+        """A fresh spool file path for an upload"""
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        return self.spool_dir / f"{uuid.uuid4().hex}-{Path(filename).name}"
+
+    def start(self):
+        """Remove spool files left by a previous process and start the worker pool"""
+        if self.spool_dir.exists() and not self._workers:
+            for orphan in self.spool_dir.glob("*"):
+                orphan.unlink()
+        self._start_workers()
+
+    def _start_workers(self):
+        """Start the workers on the running event loop (no-op if already started)"""
+        if self._workers:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.max_workers)]
+        logger.info(f"Started {self.max_workers} ingestion workers")
+
+    async def stop(self):
+        """Cancel the workers; queued jobs are dropped"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, filename: str, spool_path: Path, priority: Optional[str] = None,
+               profile: bool = False) -> IngestionJob:
+        """
+        Queue a spooled file for indexing
+
+        Args:
+            filename: Name of the uploaded file, stored as the chunks' `file_path` meta
+            spool_path: The spooled file; deleted once the job finishes
+            priority: "high", "normal" or "low"; None picks high for small files and normal otherwise
+            profile: Write a profile of the indexing to PROFILE_DIR
+
+        Returns:
+            The queued job
+        """
+        return self._enqueue(filename, [(filename, spool_path)], priority, bulk=False, profile=profile)
+
+    def submit_bulk(self, files: List[Tuple[str, Path]], priority: Optional[str] = None,
+                    profile: bool = False) -> IngestionJob:
+        """
+        Queue spooled files and archives for bulk indexing with pooled embedding batches
+
+        Args:
+            files: (uploaded name, spool path) of each .txt file or zip/tar archive; deleted once the job finishes
+            priority: "high", "normal" or "low"; None picks high for small uploads and normal otherwise
+            profile: Write a profile of the indexing to PROFILE_DIR
+
+        Returns:
+            The queued job
+        """
+        return self._enqueue(f"{len(files)} files", files, priority, bulk=True, profile=profile)
+
+    def _enqueue(self, filename: str, files: List[Tuple[str, Path]], priority: Optional[str],
+                 bulk: bool, profile: bool = False) -> IngestionJob:
+        total_bytes = sum(spool_path.stat().st_size for _, spool_path in files)
+        if priority is None:
+            priority = "high" if total_bytes <= self.small_file_bytes else "normal"
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}', expected one of {list(PRIORITIES)}")
+
+        self._start_workers()
+        job = IngestionJob(id=uuid.uuid4().hex, filename=filename, files=files, total_bytes=total_bytes,
+                           priority=priority, bulk=bulk, profile=profile)
+        self._jobs[job.id] = job
+        self._queue.put_nowait((PRIORITIES[priority], next(self._sequence), job.id))
+        self._trim_history()
+        logger.info(f"Queued ingestion job {job.id} for '{filename}' ({total_bytes} bytes, {priority} priority)")
+        return job
+
+    async def delete_file(self, filename: str) -> Dict[str, Any]:
+        """
+        Delete a file's chunks once no job is indexing it
+
+        Takes the file's lock like a job, so the delete waits for a running re-index instead of racing it.
+        Single-file jobs for the file that have not started yet are cancelled, as they were uploaded before
+        the delete.
+
+        Args:
+            filename: The file's `file_path` meta
+
+        Returns:
+            The result of RAGService.delete_file, with the number of cancelled jobs as `jobs_cancelled`
+        """
+        cancelled = 0
+        for job in self._jobs.values():
+            if not job.bulk and job.state == "queued" and job.filename == filename:
+                job.state = "failed"
+                job.error = "Cancelled by a delete of the file"
+                job.finished_at = time.time()
+                cancelled += 1
+        async with self._files_locked([filename]):
+            result = await run_in_executor(self.rag.delete_file, filename)
+        if cancelled:
+            logger.info(f"Cancelled {cancelled} queued ingestion jobs for deleted '{filename}'")
+        return {**result, "jobs_cancelled": cancelled}
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self._jobs.get(job_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        states: Dict[str, int] = {}
+        for job in self._jobs.values():
+            states[job.state] = states.get(job.state, 0) + 1
+        return {"workers": self.max_workers, "jobs": states}
+
+    async def _worker(self, number: int):
+        while True:
+            _, _, job_id = await self._queue.get()
+            job = self._jobs[job_id]
+            try:
+                async with self._files_locked([name for name, _ in job.files]):
+                    if job.state == "queued":
+                        await self._run(job)
+                    else:
+                        # Cancelled by a delete while queued
+                        self._remove_spool_files(job)
+            except Exception as e:
+                logger.error(f"Ingestion worker {number} failed: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    @asynccontextmanager
+    async def _files_locked(self, names: List[str]) -> AsyncIterator[None]:
+        """
+        Hold the locks of the given file names
+
+        Bulk jobs lock the names they were uploaded with; files inside an archive are not locked.
+
+        Args:
+            names: File names of a job; locked in sorted order so jobs sharing several cannot deadlock
+        """
+        names = sorted(set(names))
+        for name in names:
+            lock, users = self._file_locks.get(name, (asyncio.Lock(), 0))
+            self._file_locks[name] = (lock, users + 1)
+        acquired = []
+        try:
+            for name in names:
+                await self._file_locks[name][0].acquire()
+                acquired.append(name)
+            yield
+        finally:
+            for name in acquired:
+                self._file_locks[name][0].release()
+            for name in names:
+                lock, users = self._file_locks[name]
+                if users == 1:
+                    del self._file_locks[name]
+                else:
+                    self._file_locks[name] = (lock, users - 1)
+
+    async def _run(self, job: IngestionJob):
+        job.state = "running"
+        job.started_at = time.time()
+        kind = "bulk" if job.bulk else "single"
+        INGESTION_STAGE_SECONDS.observe(job.started_at - job.queued_at, stage="queued", kind=kind)
+        profiler = None
+        if job.profile:
+            from utils.profiling import SamplingProfiler
+            profiler = SamplingProfiler(settings.PROFILE_INTERVAL)
+            profiler.start()
+
+        def on_progress(progress: Dict[str, Any]):
+            job.segments = progress["segments"]
+            job.chunks_indexed = progress["chunks_indexed"]
+            job.chunks_skipped = progress["chunks_skipped"]
+            job.chunks_removed = progress["chunks_removed"]
+
+        try:
+            if job.bulk:
+                await run_in_executor(self._run_bulk, job)
+            else:
+                name, spool_path = job.files[0]
+                # Reads the file's stored chunks, a full store scan for some stores
+                indexer = await run_in_executor(self.rag.create_stream_indexer, name, total_bytes=job.total_bytes,
+                                                on_progress=on_progress)
+                with open(spool_path, "rb") as f:
+                    while data := f.read(settings.UPLOAD_CHUNK_SIZE):
+                        await run_in_executor(indexer.feed, data)
+                        job.bytes_read = indexer.bytes_read
+                on_progress(await run_in_executor(indexer.finish))
+                job.documents = 1
+            job.state = "completed"
+            logger.info(f"Ingestion job {job.id} completed: {job.chunks_indexed} chunks from '{job.filename}'")
+        except Exception as e:
+            job.state = "failed"
+            job.error = str(e)
+            logger.error(f"Ingestion job {job.id} for '{job.filename}' failed: {str(e)}")
+        finally:
+            job.finished_at = time.time()
+            INGESTION_STAGE_SECONDS.observe(job.finished_at - job.started_at, stage="index", kind=kind)
+            INGESTION_JOBS.inc(kind=kind, state=job.state)
+            INGESTED_CHUNKS.inc(job.chunks_indexed, kind=kind)
+            INGESTED_BYTES.inc(job.bytes_read, kind=kind)
+            if profiler is not None:
+                await run_in_executor(self._write_profile, job, profiler.stop())
+            self._remove_spool_files(job)
+
+    @staticmethod
+    def _remove_spool_files(job: IngestionJob):
+        for _, spool_path in job.files:
+            if spool_path.exists():
+                os.remove(spool_path)
+
+    def _run_bulk(self, job: IngestionJob):
+        """Index all files of a bulk job in one BulkIndexer (runs on the CPU executor)"""
+        from service.bulk_ingestion import BulkIndexer
+
+        def on_progress(stats: Dict[str, Any]):
+            job.documents = stats["documents"]
+            job.chunks_indexed = stats["chunks_indexed"]
+            job.chunks_skipped = stats["chunks_skipped"]
+            job.chunks_removed = stats["chunks_removed"]
+            job.bytes_read = stats["bytes_read"]
+            job.embedding_batches = stats["embedding_batches"]
+
+        indexer = BulkIndexer(self.rag, batch_size=settings.BULK_EMBED_BATCH_SIZE, on_progress=on_progress)
+        for name, spool_path in job.files:
+            indexer.add_path(spool_path, name=name)
+            job.files_done += 1
+        on_progress(indexer.finish())
+
+    @staticmethod
+    def _write_profile(job: IngestionJob, stacks: Dict[str, int]):
+        from utils.profiling import profile_name, write_profile
+        path = write_profile(settings.PROFILE_DIR, profile_name(f"ingest {job.id}"), stacks, settings.PROFILE_MAX_FILES)
+        logger.info(f"Profiled ingestion job {job.id}: {path}")
+
+    def _trim_history(self):
+        """Forget the oldest finished jobs beyond max_history"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.state in ("completed", "failed")]
+        for job_id in finished[:max(0, len(finished) - self.max_history)]:
+            del self._jobs[job_id]
+
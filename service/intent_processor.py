@@ -1,24 +1,40 @@
+import copy
+import hashlib
 import json
 import re
-from typing import Dict, List, Any, Optional
+import threading
+from typing import Callable, Dict, List, Any, Optional
 from haystack import component
 from haystack.components.generators.chat import OpenAIChatGenerator
 from haystack.dataclasses import ChatMessage
+from haystack.utils import Secret
+from service.local_intent_classifier import LocalIntentClassifier
+from utils.cache import LRUCache
+from utils.concurrency import run_in_executor
 from utils.config import settings
 from utils.logging import logger
 
 
 class IntentProcessorService:
 
-    def __init__(self, schema_path: str):
+    def __init__(self, schema_path: str, embed_fn: Optional[Callable[[str], List[float]]] = None):
+        """
+        Initialize the intent processor service
 
+        Args:
+            schema_path: Path to the intent schema JSON file
+            embed_fn: Function embedding a text; enables the local classifier that answers
+                      confident queries without calling the LLM
+        """
         self.schema_path = schema_path
         self.schema = self._load_schema()
         self.schema_prompt = self._format_schema_for_prompt()
+        self.schema_hash = hashlib.sha256(json.dumps(self.schema, sort_keys=True).encode("utf-8")).hexdigest()
+        self.intent_cache = LRUCache(settings.INTENT_CACHE_SIZE)
 
         # Initialize OpenAI generator
         self.generator = OpenAIChatGenerator(
-            api_key=settings.OPENROUTER_API_KEY,
+            api_key=Secret.from_token(settings.OPENROUTER_API_KEY),
             api_base_url=settings.OPENROUTER_BASE_URL,
             model=settings.INTENT_MODEL,
             generation_kwargs={
@@ -28,6 +44,14 @@ class IntentProcessorService:
         )
 
         self.processor = IntentSlotProcessor(self.schema_prompt, self.generator)
+
+        # Local classifier answering confident queries without an LLM call
+        self.local_classifier = None
+        if embed_fn is not None and settings.LOCAL_INTENT_ENABLED:
+            self.local_classifier = LocalIntentClassifier(self.schema, embed_fn, settings.LOCAL_INTENT_THRESHOLD)
+        self._stats = {"local_hits": 0, "llm_fallbacks": 0}
+        self._stats_lock = threading.Lock()
+
         logger.info("Intent processor service initialized successfully")
 
     def _load_schema(self) -> Dict:
@@ -76,20 +100,99 @@ class IntentProcessorService:
         Returns:
             Dictionary with intent processing results
         """
+        cache_key = self._intent_cache_key(query)
+        cached = self.intent_cache.get(cache_key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
         try:
-            result = self.processor.run(query=query)
+            result = self._classify_locally(query)
+            if result is None:
+                result = self.processor.run(query=query)
             logger.info(f"Processed intent: {result['intent']} with confidence {result['confidence']}")
+            self._cache_intent(cache_key, result)
             return result
         except Exception as e:
             logger.error(f"Error processing intent for query '{query}': {str(e)}")
-            # Return a default fallback
-            return {
-                "intent": "document_query",
-                "slots": {"topic": self._extract_fallback_topic(query)},
-                "is_out_of_scope": False,
-                "missing_required_slots": [],
-                "confidence": 0.6
-            }
+            return self._fallback_intent(query)
+
+    async def process_intent_async(self, query: str, query_embedding: Optional[List[float]] = None) -> Dict[str, Any]:
+        """
+        Asynchronously process the user's intent and extract slots
+
+        Args:
+            query: The user's query text
+            query_embedding: Embedding of the query if already computed, saves the local classifier embedding it
+
+        Returns:
+            Dictionary with intent processing results
+        """
+        cache_key = self._intent_cache_key(query)
+        cached = self.intent_cache.get(cache_key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
+        try:
+            result = None
+            if self.local_classifier is not None:
+                # Embedding the query is CPU-bound, keep it off the event loop
+                result = await run_in_executor(self._classify_locally, query, query_embedding)
+            if result is None:
+                result = await self.processor.run_async(query=query)
+            logger.info(f"Processed intent: {result['intent']} with confidence {result['confidence']}")
+            self._cache_intent(cache_key, result)
+            return result
+        except Exception as e:
+            logger.error(f"Error processing intent for query '{query}': {str(e)}")
+            return self._fallback_intent(query)
+
+    def _intent_cache_key(self, query: str) -> tuple:
+        """Cache key: query lowercased with collapsed whitespace and no trailing punctuation, plus schema hash"""
+        normalized = " ".join(query.lower().split()).rstrip("?!. ")
+        return normalized, self.schema_hash
+
+    def _cache_intent(self, cache_key: tuple, result: Dict[str, Any]):
+        # Do not keep the fallback returned when the LLM call failed, the next attempt may succeed
+        if result != IntentSlotProcessor._fallback_result():
+            self.intent_cache.put(cache_key, copy.deepcopy(result))
+
+    def _classify_locally(self, query: str, query_embedding: Optional[List[float]] = None) -> Optional[Dict[str, Any]]:
+        """Classify the query with the local classifier; None means the LLM has to be called"""
+        if self.local_classifier is None:
+            return None
+
+        try:
+            result = self.local_classifier.classify(query, query_embedding=query_embedding)
+        except Exception as e:
+            logger.error(f"Local intent classification failed for query '{query}': {str(e)}")
+            result = None
+
+        with self._stats_lock:
+            if result is None:
+                self._stats["llm_fallbacks"] += 1
+            else:
+                self._stats["local_hits"] += 1
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get local classifier hit and LLM fallback counters"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        total = stats["local_hits"] + stats["llm_fallbacks"]
+        stats["local_hit_rate"] = round(stats["local_hits"] / total, 3) if total else 0.0
+        stats["local_enabled"] = self.local_classifier is not None
+        stats["local_threshold"] = settings.LOCAL_INTENT_THRESHOLD
+        return stats
+
+    def _fallback_intent(self, query: str) -> Dict[str, Any]:
+        """Return a default fallback when intent processing fails"""
+        return {
+            "intent": "document_query",
+            "slots": {"topic": self._extract_fallback_topic(query)},
+            "is_out_of_scope": False,
+            "missing_required_slots": [],
+            "confidence": 0.6
+        }
 
     def _extract_fallback_topic(self, query: str) -> str:
         """Extract a fallback topic from query when intent processing fails"""
@@ -133,6 +236,47 @@ class IntentSlotProcessor:
         Returns:
             Intent processing results
         """
+        logger.debug(f"IntentProcessor query: {query}")
+
+        try:
+            result = self.generator.run(messages=self._build_messages(query))
+        except Exception as e:
+            logger.error(f"Generator error in IntentSlotProcessor: {str(e)}")
+            # Fallback to document_query for safety
+            return self._fallback_result()
+
+        return self._parse_response(query, self._reply_text(result["replies"][0]))
+
+    @component.output_types(
+        intent=str,
+        slots=Dict[str, str],
+        is_out_of_scope=bool,
+        missing_required_slots=List[str],
+        confidence=float
+    )
+    async def run_async(self, query: str) -> Dict[str, Any]:
+        """
+        Asynchronously run intent processing on a query, without blocking the event loop on the LLM call
+
+        Args:
+            query: The user's query text
+
+        Returns:
+            Intent processing results
+        """
+        logger.debug(f"IntentProcessor query: {query}")
+
+        try:
+            result = await self.generator.run_async(messages=self._build_messages(query))
+        except Exception as e:
+            logger.error(f"Generator error in IntentSlotProcessor: {str(e)}")
+            # Fallback to document_query for safety
+            return self._fallback_result()
+
+        return self._parse_response(query, self._reply_text(result["replies"][0]))
+
+    def _build_messages(self, query: str) -> List[ChatMessage]:
+        """Build the chat messages sent to the LLM for a query"""
         # Enhanced system prompt with clearer instructions
         system_prompt = f"""You are an NLU system that identifies user intent and extracts slots from queries about documents.
 IMPORTANT: ALWAYS assume queries are about document content unless they are clearly about something else.
@@ -159,86 +303,85 @@ Respond in JSON format:
   "confidence": 0.95
 }}"""
 
-        messages = [
+        return [
             ChatMessage.from_system(system_prompt),
             ChatMessage.from_user(query)
         ]
 
-        logger.debug(f"IntentProcessor query: {query}")
+    @staticmethod
+    def _reply_text(reply: Any) -> str:
+        """Get the text of a generator reply (a ChatMessage in Haystack 2.x, a string in older versions)"""
+        if isinstance(reply, str):
+            return reply
+        return reply.text or ""
+
+    def _parse_response(self, query: str, response_text: str) -> Dict[str, Any]:
+        """Parse the LLM reply into intent processing results"""
+        logger.debug(f"IntentProcessor response_text: {response_text}")
 
         try:
-            result = self.generator.run(messages=messages)
-            response_text = result["replies"][0]
-
-            logger.debug(f"IntentProcessor response_text: {response_text}")
-
-            try:
-                # Extract JSON response using regex
-                json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-                if json_match:
-                    response_json = json.loads(json_match.group(0))
-                else:
-                    response_json = json.loads(response_text)
-
-                logger.debug(f"IntentProcessor parsed JSON: {response_json}")
-
-                # Default to document_query for document-related queries if confidence is low
-                intent = response_json.get("intent", "document_query")
-                if "document" in query.lower() and intent == "out_of_scope":
-                    intent = "document_query"
-                    response_json["intent"] = "document_query"
-                    response_json["is_out_of_scope"] = False
-                    response_json["confidence"] = max(0.7, response_json.get("confidence", 0.7))
-
-                # Extract slots
-                slots = response_json.get("slots", {})
-
-                # Default topic slot to query content if not specified for document_query
-                if intent == "document_query" and "topic" not in slots:
-                    # Extract topic from query or default to a general topic
-                    topic = "general"  # Default topic
-                    for word in query.lower().split():
-                        if word not in ["what", "does", "the", "document", "say", "about", "tell", "me"]:
-                            topic = word
-                            break
-                    slots["topic"] = topic
-
-                is_out_of_scope = response_json.get("is_out_of_scope", False)
-                confidence = float(response_json.get("confidence", 0.7))  # Default to reasonable confidence
-
-                # Identify missing required slots
-                missing_required_slots = []
-
-                return {
-                    "intent": intent,
-                    "slots": slots,
-                    "is_out_of_scope": is_out_of_scope,
-                    "missing_required_slots": missing_required_slots,
-                    "confidence": confidence
-                }
-
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON parsing error: {e}, response_text: {response_text}")
-                # Fallback to document_query for safety
-                return {
-                    "intent": "document_query",
-                    "slots": {"topic": "general"},
-                    "is_out_of_scope": False,
-                    "missing_required_slots": [],
-                    "confidence": 0.6
-                }
+            # Extract JSON response using regex
+            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+            if json_match:
+                response_json = json.loads(json_match.group(0))
+            else:
+                response_json = json.loads(response_text)
+
+            logger.debug(f"IntentProcessor parsed JSON: {response_json}")
+
+            # Default to document_query for document-related queries if confidence is low
+            intent = response_json.get("intent", "document_query")
+            if "document" in query.lower() and intent == "out_of_scope":
+                intent = "document_query"
+                response_json["intent"] = "document_query"
+                response_json["is_out_of_scope"] = False
+                response_json["confidence"] = max(0.7, response_json.get("confidence", 0.7))
+
+            # Extract slots
+            slots = response_json.get("slots", {})
+
+            # Default topic slot to query content if not specified for document_query
+            if intent == "document_query" and "topic" not in slots:
+                # Extract topic from query or default to a general topic
+                topic = "general"  # Default topic
+                for word in query.lower().split():
+                    if word not in ["what", "does", "the", "document", "say", "about", "tell", "me"]:
+                        topic = word
+                        break
+                slots["topic"] = topic
+
+            is_out_of_scope = response_json.get("is_out_of_scope", False)
+            confidence = float(response_json.get("confidence", 0.7))  # Default to reasonable confidence
+
+            # Identify missing required slots
+            missing_required_slots = []
 
-        except Exception as e:
-            logger.error(f"Generator error in IntentSlotProcessor: {str(e)}")
-            # Fallback to document_query for safety
             return {
-                "intent": "document_query",
-                "slots": {"topic": "general"},
-                "is_out_of_scope": False,
-                "missing_required_slots": [],
-                "confidence": 0.6
+                "intent": intent,
+                "slots": slots,
+                "is_out_of_scope": is_out_of_scope,
+                "missing_required_slots": missing_required_slots,
+                "confidence": confidence
             }
 
+        except json.JSONDecodeError as e:
+            logger.error(f"JSON parsing error: {e}, response_text: {response_text}")
+            # Fallback to document_query for safety
+            return self._fallback_result()
+
+        except Exception as e:
+            logger.error(f"Error parsing IntentSlotProcessor response: {str(e)}")
+            # Fallback to document_query for safety
+            return self._fallback_result()
+
+    @staticmethod
+    def _fallback_result() -> Dict[str, Any]:
+        """Result used when the LLM call or its parsing fails"""
+        return {
+            "intent": "document_query",
+            "slots": {"topic": "general"},
+            "is_out_of_scope": False,
+            "missing_required_slots": [],
+            "confidence": 0.6
+        }
 
-# Service instance
-intent_service = IntentProcessorService(settings.SCHEMA_PATH)
\ No newline at end of file
@@ -0,0 +1,191 @@
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from utils.logging import logger
+
+# Words that never carry the topic of a query
+STOP_WORDS = {
+    "a", "an", "the", "what", "whats", "what's", "which", "who", "whom", "when", "where", "why", "how",
+    "does", "do", "did", "is", "are", "was", "were", "be", "can", "could", "would", "should", "you", "your",
+    "i", "me", "my", "we", "us", "tell", "say", "says", "said", "about", "of", "on", "in", "to", "for",
+    "and", "or", "document", "documents", "text", "file", "this", "that", "it", "please", "give", "provide",
+    "want", "know", "information", "info", "more", "some", "any", "according", "there", "mention", "mentions",
+}
+
+METADATA_KEYWORDS = {
+    "author": ["author", "wrote", "written", "writer"],
+    "date": ["date", "published", "when", "year"],
+    "title": ["title", "called", "named"],
+}
+
+
+def _content_words(text: str) -> List[str]:
+    return [word for word in re.findall(r"[\w'-]+", text.lower()) if word not in STOP_WORDS]
+
+
+def _topic_after(pattern: str, query: str) -> Optional[str]:
+    """Return the content words following `pattern` in the query, if any"""
+    match = re.search(pattern, query, re.IGNORECASE)
+    if not match:
+        return None
+    words = _content_words(match.group(1))
+    return " ".join(words) if words else None
+
+
+def extract_slots(intent: str, query: str) -> Dict[str, str]:
+    """
+    Heuristically extract slot values for an intent from the query text
+
+    Args:
+        intent: The classified intent
+        query: The user's query text
+
+    Returns:
+        Dictionary of extracted slot values (slots that could not be found are omitted)
+    """
+    slots = {}
+    section = _topic_after(r"\bsection\s+(?:on|about|of|called)?\s*(.+)", query)
+
+    if intent == "document_query":
+        topic = (_topic_after(r"\b(?:about|regarding|on)\s+(.+)", query)
+                 or " ".join(_content_words(query)))
+        if topic:
+            slots["topic"] = topic
+        if section:
+            slots["section"] = section
+
+    elif intent == "find_definition":
+        term = (_topic_after(r"\bdefinition of\s+(.+)", query)
+                or _topic_after(r"\bdefine[sd]?\s+(.+)", query)
+                or _topic_after(r"\bterm\s+(.+?)\s+mean", query)
+                or _topic_after(r"\bdoes\s+(.+?)\s+mean", query)
+                or _topic_after(r"\bwhat (?:is|are)\s+(?:an?\s+)?(.+)", query))
+        if term:
+            slots["term"] = term
+
+    elif intent == "document_summary":
+        if section:
+            slots["section"] = section
+
+    elif intent == "document_metadata":
+        lowered = query.lower()
+        for metadata_type, keywords in METADATA_KEYWORDS.items():
+            if any(keyword in lowered for keyword in keywords):
+                slots["metadata_type"] = metadata_type
+                break
+
+    return slots
+
+
+class LocalIntentClassifier:
+    """
+    Nearest-neighbour intent classifier over the schema examples
+
+    The examples are embedded once with the retrieval embedding model. A query is assigned the intent
+    of its most similar example; the cosine similarity is the confidence.
+    """
+
+    def __init__(self, schema: Dict, embed_fn: Callable[[str], List[float]], threshold: float):
+        """
+        Initialize the classifier
+
+        Args:
+            schema: The intent schema with `examples` per intent
+            embed_fn: Function embedding a text with the shared embedding model
+            threshold: Minimum confidence for a local decision
+        """
+        self.schema = schema
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self._required_slots = {
+            intent["name"]: [slot["name"] for slot in intent.get("slots", []) if slot.get("is_required")]
+            for intent in schema["intents"]
+        }
+        self._example_matrix: Optional[np.ndarray] = None
+        self._example_intents: List[str] = []
+        self._lock = threading.Lock()
+
+    def _normalized_embedding(self, text: str) -> np.ndarray:
+        vector = np.asarray(self.embed_fn(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _ensure_examples(self):
+        """Embed the schema examples on first use"""
+        if self._example_matrix is not None:
+            return
+        with self._lock:
+            if self._example_matrix is not None:
+                return
+            intents, vectors = [], []
+            for intent in self.schema["intents"]:
+                for example in intent.get("examples", []):
+                    intents.append(intent["name"])
+                    vectors.append(self._normalized_embedding(example))
+            self._example_intents = intents
+            self._example_matrix = np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+            logger.info(f"Local intent classifier embedded {len(intents)} schema examples")
+
+    def warm_up(self):
+        """Embed the schema examples now instead of on the first query"""
+        self._ensure_examples()
+
+    def nearest_intent(self, query_embedding: List[float]) -> Optional[Tuple[str, float]]:
+        """
+        Find the intent of the schema example nearest to a query embedding
+
+        Args:
+            query_embedding: Embedding of the query (as returned by the embed function)
+
+        Returns:
+            Tuple of intent name and cosine similarity, or None if the schema has no examples
+        """
+        self._ensure_examples()
+        if not self._example_intents:
+            return None
+
+        vector = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = vector / norm
+        scores = self._example_matrix @ vector
+        best = int(np.argmax(scores))
+        return self._example_intents[best], float(scores[best])
+
+    def classify(self, query: str, query_embedding: Optional[List[float]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Classify a query locally
+
+        Args:
+            query: The user's query text
+            query_embedding: Embedding of the query, computed with the embed function when not given
+
+        Returns:
+            Intent processing results, or None when the classifier is not confident enough
+            (similarity below the threshold, or a required slot could not be extracted)
+        """
+        nearest = self.nearest_intent(query_embedding if query_embedding is not None else self.embed_fn(query))
+        if nearest is None:
+            return None
+        intent, confidence = nearest
+
+        if confidence < self.threshold:
+            return None
+
+        # Same rule as the LLM path: queries mentioning the document are never out of scope
+        if intent == "out_of_scope" and "document" in query.lower():
+            return None
+
+        slots = extract_slots(intent, query)
+        if any(slot not in slots for slot in self._required_slots.get(intent, [])):
+            return None
+
+        return {
+            "intent": intent,
+            "slots": slots,
+            "is_out_of_scope": intent == "out_of_scope",
+            "missing_required_slots": [],
+            "confidence": round(confidence, 3)
+        }
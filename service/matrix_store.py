@@ -0,0 +1,522 @@
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from haystack import component, default_from_dict, default_to_dict
+from haystack.dataclasses import Document
+from haystack.document_stores.errors import DuplicateDocumentError
+from haystack.document_stores.types import DuplicatePolicy
+from haystack.utils.filters import document_matches_filter
+from service.persistent_store import DocumentLog
+from utils.logging import logger
+
+QUANTIZATIONS = ("none", "float16", "int8")
+
+# Rows of an int8 matrix converted back to float32 at a time when scoring
+SCORE_BLOCK_ROWS = 512
+
+
+class EmbeddingFile:
+    """
+    Append-only raw float32 embedding file, read back memory-mapped
+
+    Holds the exact embeddings used for rescoring when the store has no DocumentLog. It only lives as long
+    as the process: the file is truncated when opened.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Initialize the file
+
+        Args:
+            path: Location of the file (parent directories are created)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_bytes(b"")
+        self.dim: Optional[int] = None
+        self.rows = 0
+        self._memmap: Optional[np.ndarray] = None
+
+    def append(self, vectors: np.ndarray) -> int:
+        """Append rows and return the index of the first one"""
+        start = self.rows
+        with open(self.path, "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        self.dim = vectors.shape[1]
+        self.rows += vectors.shape[0]
+        self._memmap = None
+        return start
+
+    def embeddings(self) -> np.ndarray:
+        """Memory-map the embedding rows (read-only)"""
+        if self._memmap is None:
+            if not self.rows:
+                return np.zeros((0, self.dim or 0), dtype=np.float32)
+            self._memmap = np.memmap(self.path, dtype=np.float32, mode="r", shape=(self.rows, self.dim))
+        return self._memmap
+
+    def close(self):
+        """Drop the memory map and delete the file"""
+        self._memmap = None
+        if self.path.exists():
+            os.remove(self.path)
+
+
+class MatrixDocumentStore:
+    """
+    Document store keeping all embeddings in one contiguous, pre-normalized matrix
+
+    Row i of the matrix belongs to `ids[i]`; content and meta live in parallel lists, so no Document object
+    is kept per chunk. Retrieval is one matrix product followed by `argpartition`, scored by cosine
+    similarity. Deletes move the last row into the freed slot, so the matrix never has holes.
+
+    The matrix can be stored as float32, float16 or int8 (one float32 scale per row). Quantized searches can
+    rescore their best candidates with the exact float32 embeddings, read memory-mapped from the DocumentLog
+    when the store is persistent, else from a separate EmbeddingFile.
+
+    Passing a DocumentLog makes the store persistent: every change is appended to the log, and on startup
+    the matrix is filled straight from the memory-mapped embedding file.
+    """
+
+    def __init__(self, log: Optional[DocumentLog] = None, compact_ratio: float = 0.5,
+                 quantization: str = "none", rescore_factor: int = 0, rescore_path: Optional[Path] = None):
+        """
+        Initialize the store, restoring its documents from `log` if given
+
+        Args:
+            log: Optional on-disk log persisting the store
+            compact_ratio: Compact the log when more than this fraction of its write records are obsolete
+            quantization: "none" (float32), "float16" or "int8"
+            rescore_factor: Rescore top_k * rescore_factor quantized candidates with exact float32 embeddings,
+                0 disables rescoring
+            rescore_path: File holding the exact embeddings when there is no log
+        """
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATIONS}")
+        if quantization == "float16":
+            # Scored with torch; import it now rather than on the first query
+            import torch  # noqa: F401
+        self.log = log
+        self.compact_ratio = compact_ratio
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor if quantization != "none" else 0
+
+        # The log already keeps exact embeddings; otherwise write them only if rescoring needs them
+        self._exact_file: Optional[EmbeddingFile] = None
+        if log is None and self.rescore_factor:
+            if rescore_path is None:
+                raise ValueError("rescore_path is required to rescore without a document log")
+            self._exact_file = EmbeddingFile(rescore_path)
+
+        self._matrix: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None  # int8 only: per-row dequantization factor
+        self._has_embedding: Optional[np.ndarray] = None
+        self._exact_rows: Optional[np.ndarray] = None  # row of each document in the exact embedding file
+        self._size = 0
+        self._ids: List[str] = []
+        self._contents: List[Optional[str]] = []
+        self._metas: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+        if log is not None:
+            self._restore(log)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return default_to_dict(
+            self,
+            compact_ratio=self.compact_ratio,
+            quantization=self.quantization,
+            rescore_factor=self.rescore_factor
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MatrixDocumentStore":
+        return default_from_dict(cls, data)
+
+    def count_documents(self) -> int:
+        return self._size
+
+    def memory_usage(self) -> int:
+        """Bytes held by the embedding arrays (matrix capacity included, content and meta excluded)"""
+        arrays = (self._matrix, self._scales, self._has_embedding, self._exact_rows)
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    def filter_documents(self, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """Return all documents matching the filters, with their embeddings"""
+        with self._lock:
+            rows = range(self._size)
+            if filters:
+                # Match on content and meta first so embeddings are only materialized for the results
+                rows = [row for row in rows if document_matches_filter(filters=filters, document=self._document(row))]
+            exact = self._exact_embeddings() if self._exact_rows is not None else None
+            return [self._document(row, with_embedding=True, exact=exact) for row in rows]
+
+    def get_documents_by_id(self, document_ids: List[str]) -> List[Document]:
+        """Return the documents with the given ids, in that order, skipping unknown ids"""
+        with self._lock:
+            return [self._document(self._rows[doc_id]) for doc_id in document_ids if doc_id in self._rows]
+
+    def write_documents(self, documents: List[Document], policy: DuplicatePolicy = DuplicatePolicy.NONE) -> int:
+        """
+        Write documents to the store
+
+        Args:
+            documents: Documents to write
+            policy: How to handle ids that already exist; NONE behaves like FAIL
+
+        Returns:
+            The number of documents written
+        """
+        if policy == DuplicatePolicy.NONE:
+            policy = DuplicatePolicy.FAIL
+
+        with self._lock:
+            # By id, so a batch repeating an id writes it once (the last occurrence under OVERWRITE)
+            batch: Dict[str, Document] = {}
+            for document in documents:
+                if document.id in self._rows or document.id in batch:
+                    if policy == DuplicatePolicy.FAIL:
+                        raise DuplicateDocumentError(f"ID '{document.id}' already exists.")
+                    if policy == DuplicatePolicy.SKIP:
+                        continue
+                    batch.pop(document.id, None)
+                batch[document.id] = document
+            to_write = list(batch.values())
+
+            if self.log is not None:
+                exact_rows = self.log.append_writes(to_write)
+            else:
+                exact_rows = self._append_exact(to_write)
+
+            self._remove_rows([doc.id for doc in to_write if doc.id in self._rows])
+            self._append(
+                [doc.id for doc in to_write],
+                [doc.content for doc in to_write],
+                [doc.meta for doc in to_write],
+                [doc.embedding for doc in to_write],
+                [exact_rows.get(doc.id, -1) for doc in to_write] if exact_rows is not None else None
+            )
+            if self.log is not None:
+                self._maybe_compact()
+            return len(to_write)
+
+    def delete_documents(self, document_ids: List[str]) -> None:
+        """Delete documents by id (unknown ids are ignored)"""
+        with self._lock:
+            self._remove_rows(document_ids)
+            if self.log is not None:
+                self.log.append_delete(document_ids)
+                self._maybe_compact()
+
+    def delete_all_documents(self) -> None:
+        """Delete all documents"""
+        with self._lock:
+            self._size = 0
+            self._ids, self._contents, self._metas, self._rows = [], [], [], {}
+            if self.log is not None:
+                self.log.append_clear()
+                self._maybe_compact()
+
+    def embedding_retrieval(self, query_embedding: List[float], top_k: int = 10,
+                            filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """
+        Retrieve the documents most similar to a query embedding
+
+        Args:
+            query_embedding: Embedding of the query
+            top_k: Number of documents to return
+            filters: Optional metadata filters applied before scoring
+
+        Returns:
+            Documents sorted by descending cosine similarity, scores set
+        """
+        return self.embedding_retrieval_batch([query_embedding], top_k=top_k, filters=filters)[0]
+
+    def embedding_retrieval_batch(self, query_embeddings: List[List[float]], top_k: int = 10,
+                                  filters: Optional[Dict[str, Any]] = None) -> List[List[Document]]:
+        """
+        Retrieve the most similar documents for several query embeddings with a single matrix product
+
+        Args:
+            query_embeddings: Embeddings of the queries
+            top_k: Number of documents to return per query
+            filters: Optional metadata filters applied before scoring
+
+        Returns:
+            One list of documents per query, sorted by descending cosine similarity, scores set
+        """
+        queries = self._normalize(np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1))
+
+        with self._lock:
+            candidates = np.flatnonzero(self._has_embedding[:self._size]) if self._size else np.zeros(0, dtype=int)
+            if filters:
+                candidates = np.asarray([
+                    row for row in candidates.tolist()
+                    if document_matches_filter(filters=filters, document=self._document(row))
+                ], dtype=int)
+            if len(candidates) == 0:
+                return [[] for _ in range(len(queries))]
+
+            all_rows = len(candidates) == self._size
+            scores = self._score(queries, None if all_rows else candidates)
+
+            rescore = self.rescore_factor > 0
+            k = min(top_k * self.rescore_factor if rescore else top_k, scores.shape[1])
+            top = self._top_k(scores, k)
+            rows = top if all_rows else candidates[top]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+
+            if rescore:
+                rows, top_scores = self._rescore(queries, rows, top_scores, min(top_k, k))
+
+            return [
+                [self._document(int(row), score=float(score)) for row, score in zip(query_rows, query_scores)]
+                for query_rows, query_scores in zip(rows, top_scores)
+            ]
+
+    def _score(self, queries: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Cosine similarity of every query with the given matrix rows (all rows if None)"""
+        matrix = self._matrix[:self._size] if rows is None else self._matrix[rows]
+        if self.quantization == "none":
+            return queries @ matrix.T
+
+        if self.quantization == "float16":
+            # NumPy has no fast float16 kernels, torch has; from_numpy shares the memory
+            import torch
+            scores = torch.from_numpy(queries).half() @ torch.from_numpy(np.ascontiguousarray(matrix)).T
+            return scores.float().numpy()
+
+        # int8: convert to float32 in blocks small enough to stay in cache, so the matrix is read only once
+        scores = np.empty((len(queries), len(matrix)), dtype=np.float32)
+        for start in range(0, len(matrix), SCORE_BLOCK_ROWS):
+            block = matrix[start:start + SCORE_BLOCK_ROWS].astype(np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        scores *= self._scales[:self._size] if rows is None else self._scales[rows]
+        return scores
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        """Column indices of the k best scores per row, best first"""
+        if k < scores.shape[1]:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(scores.shape[1]), (len(scores), 1))
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        return np.take_along_axis(top, order, axis=1)
+
+    def _rescore(self, queries: np.ndarray, rows: np.ndarray, scores: np.ndarray, top_k: int):
+        """Re-rank quantized candidates with their exact float32 embeddings and keep the best top_k"""
+        exact = self._exact_embeddings()
+        exact_rows = self._exact_rows[rows]
+        rescored = scores.copy()
+        valid = exact_rows >= 0
+        if valid.any():
+            vectors = self._normalize(np.asarray(exact[exact_rows[valid]], dtype=np.float32))
+            rescored[valid] = np.einsum("ij,ij->i", vectors, np.repeat(queries, valid.sum(axis=1), axis=0))
+        order = np.argsort(-rescored, axis=1)[:, :top_k]
+        return np.take_along_axis(rows, order, axis=1), np.take_along_axis(rescored, order, axis=1)
+
+    def _exact_embeddings(self) -> Optional[np.ndarray]:
+        """Memory-mapped exact float32 embeddings, None if the store keeps none"""
+        if self.log is not None:
+            return self.log.embeddings()
+        if self._exact_file is not None:
+            return self._exact_file.embeddings()
+        return None
+
+    def _document(self, row: int, score: Optional[float] = None, with_embedding: bool = False,
+                  exact: Optional[np.ndarray] = None) -> Document:
+        """Build the Document of a row; embeddings come from `exact` when given and kept for the row"""
+        embedding = None
+        if with_embedding and self._has_embedding[row]:
+            if exact is not None and self._exact_rows[row] >= 0:
+                embedding = exact[self._exact_rows[row]].tolist()
+            else:
+                vector = self._matrix[row].astype(np.float32)
+                if self.quantization == "int8":
+                    vector *= self._scales[row]
+                embedding = vector.tolist()
+        return Document(
+            id=self._ids[row],
+            content=self._contents[row],
+            meta=self._metas[row],
+            embedding=embedding,
+            score=score
+        )
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _append_exact(self, documents: List[Document]) -> Optional[Dict[str, int]]:
+        """Write exact embeddings to the rescoring file, None if the store keeps none"""
+        if self._exact_file is None:
+            return None
+        embedded = [doc for doc in documents if doc.embedding is not None]
+        if not embedded:
+            return {}
+        start = self._exact_file.append(np.asarray([doc.embedding for doc in embedded], dtype=np.float32))
+        return {doc.id: start + i for i, doc in enumerate(embedded)}
+
+    def _quantize(self, vectors: np.ndarray):
+        """Convert normalized float32 rows to the storage type; returns (rows, scales or None)"""
+        if self.quantization == "float16":
+            return vectors.astype(np.float16), None
+        if self.quantization == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+        return vectors, None
+
+    def _grow(self, capacity: int, dim: int):
+        """Reallocate the per-row arrays to `capacity` rows, keeping the live ones"""
+        dtypes = {"none": np.float32, "float16": np.float16, "int8": np.int8}
+        matrix = np.zeros((capacity, dim), dtype=dtypes[self.quantization])
+        has_embedding = np.zeros(capacity, dtype=bool)
+        exact_rows = np.full(capacity, -1, dtype=np.int64)
+        scales = np.ones(capacity, dtype=np.float32) if self.quantization == "int8" else None
+        if self._matrix is not None:
+            matrix[:self._size] = self._matrix[:self._size]
+            has_embedding[:self._size] = self._has_embedding[:self._size]
+            exact_rows[:self._size] = self._exact_rows[:self._size]
+            if scales is not None:
+                scales[:self._size] = self._scales[:self._size]
+        self._matrix, self._has_embedding, self._exact_rows, self._scales = matrix, has_embedding, exact_rows, scales
+
+    def _append(self, ids: List[str], contents: List[Optional[str]], metas: List[Dict[str, Any]],
+                embeddings: List[Optional[Any]], exact_rows: Optional[List[int]] = None):
+        """Append rows; `embeddings` may be a list (with None entries) or a 2-D array"""
+        if not ids:
+            return
+        has_embedding = np.asarray([embedding is not None for embedding in embeddings], dtype=bool)
+        if self._matrix is None:
+            if not has_embedding.any():
+                raise ValueError("MatrixDocumentStore needs at least one embedded document to learn the dimension")
+            dim = len(next(embedding for embedding in embeddings if embedding is not None))
+            self._grow(max(len(ids), 1024), dim)
+
+        needed = self._size + len(ids)
+        if needed > len(self._matrix):
+            self._grow(max(needed, 2 * len(self._matrix)), self._matrix.shape[1])
+
+        block = np.zeros((len(ids), self._matrix.shape[1]), dtype=np.float32)
+        for i, embedding in enumerate(embeddings):
+            if embedding is not None:
+                block[i] = embedding
+        quantized, scales = self._quantize(self._normalize(block))
+        self._matrix[self._size:needed] = quantized
+        if scales is not None:
+            self._scales[self._size:needed] = scales
+        self._has_embedding[self._size:needed] = has_embedding
+        self._exact_rows[self._size:needed] = exact_rows if exact_rows is not None else -1
+
+        for offset, doc_id in enumerate(ids):
+            self._rows[doc_id] = self._size + offset
+        self._ids.extend(ids)
+        self._contents.extend(contents)
+        self._metas.extend(metas)
+        self._size = needed
+
+    def _remove_rows(self, document_ids: List[str]):
+        """Remove documents by moving the last row into each freed slot"""
+        for doc_id in document_ids:
+            row = self._rows.pop(doc_id, None)
+            if row is None:
+                continue
+            last = self._size - 1
+            if row != last:
+                self._matrix[row] = self._matrix[last]
+                self._has_embedding[row] = self._has_embedding[last]
+                self._exact_rows[row] = self._exact_rows[last]
+                if self._scales is not None:
+                    self._scales[row] = self._scales[last]
+                self._ids[row] = self._ids[last]
+                self._contents[row] = self._contents[last]
+                self._metas[row] = self._metas[last]
+                self._rows[self._ids[row]] = row
+            self._ids.pop()
+            self._contents.pop()
+            self._metas.pop()
+            self._size = last
+
+    def _restore(self, log: DocumentLog):
+        """Fill the store from the log without building Document objects"""
+        records = log.load_records()
+        if not records:
+            return
+        embeddings = log.embeddings()
+        rows = [record.get("row") for record in records]
+        if any(row is None for row in rows):
+            vectors: Any = [embeddings[row] if row is not None else None for row in rows]
+        else:
+            vectors = list(np.asarray(embeddings[rows]))
+        self._append(
+            [record["id"] for record in records],
+            [record.get("content") for record in records],
+            [record.get("meta") or {} for record in records],
+            vectors,
+            [row if row is not None else -1 for row in rows]
+        )
+        logger.info(f"Restored {self._size} documents into the embedding matrix ({self.quantization})")
+
+    def _maybe_compact(self):
+        if self.log.records > 1000 and self._size < self.log.records * (1 - self.compact_ratio):
+            rows = self.log.compact(self.filter_documents())
+            self._exact_rows[:self._size] = [rows.get(doc_id, -1) for doc_id in self._ids]
+
+
+@component
+class MatrixEmbeddingRetriever:
+    """Embedding retriever for the MatrixDocumentStore"""
+
+    def __init__(self, document_store: MatrixDocumentStore, top_k: int = 10):
+        """
+        Initialize the retriever
+
+        Args:
+            document_store: The matrix document store
+            top_k: Default number of documents to return
+        """
+        self.document_store = document_store
+        self.top_k = top_k
+
+    @component.output_types(documents=List[Document])
+    def run(self, query_embedding: List[float], filters: Optional[Dict[str, Any]] = None,
+            top_k: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Retrieve the documents most similar to the query embedding
+
+        Args:
+            query_embedding: Embedding of the query
+            filters: Optional metadata filters
+            top_k: Number of documents to return
+
+        Returns:
+            Dictionary with the retrieved documents
+        """
+        return {"documents": self.document_store.embedding_retrieval(
+            query_embedding=query_embedding, top_k=top_k or self.top_k, filters=filters
+        )}
+
+    def run_batch(self, query_embeddings: List[List[float]], filters: Optional[Dict[str, Any]] = None,
+                  top_k: Optional[int] = None) -> List[List[Document]]:
+        """
+        Retrieve documents for several query embeddings at once
+
+        Args:
+            query_embeddings: Embeddings of the queries
+            filters: Optional metadata filters
+            top_k: Number of documents to return per query
+
+        Returns:
+            One list of documents per query
+        """
+        return self.document_store.embedding_retrieval_batch(
+            query_embeddings=query_embeddings, top_k=top_k or self.top_k, filters=filters
+        )
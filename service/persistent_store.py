@@ -0,0 +1,341 @@
+import json
+import os
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from haystack.dataclasses import Document
+from haystack.document_stores.in_memory import InMemoryDocumentStore
+from haystack.document_stores.types import DuplicatePolicy
+from utils.logging import logger
+
+CURRENT_FILE = "CURRENT"
+
+
+class DocumentLog:
+    """
+    Append-only on-disk log of document writes and deletes with a float32 embedding file
+
+    Files of generation N in the store directory:
+      - `documents-N.log`: one record per line, `<crc32 hex> <json>`, for write, delete and clear operations
+      - `embeddings-N.f32`: raw float32 embedding rows referenced by write records, read back memory-mapped
+      - `CURRENT`: the live generation, replaced atomically by compaction
+
+    Embeddings are appended and synced before the log records that reference them, so a crash can only
+    leave a torn last record or unreferenced embedding rows; both are truncated away on load.
+    """
+
+    def __init__(self, path: Path, fsync: bool = True):
+        """
+        Initialize the log
+
+        Args:
+            path: Directory holding the log files (created if missing)
+            fsync: Whether to fsync after every append (disable only for bulk loads you can redo)
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.fsync = fsync
+        self.generation = self._read_generation()
+        self.dim: Optional[int] = None
+        self.rows = 0
+        self.records = 0
+        self._log_file = None
+        self._embedding_file = None
+        # Memory map of the embedding file and the (generation, rows, dim) it was opened for
+        self._memmap: Optional[np.ndarray] = None
+        self._memmap_key: Optional[Tuple[int, int, Optional[int]]] = None
+
+    @property
+    def log_path(self) -> Path:
+        return self.path / f"documents-{self.generation}.log"
+
+    @property
+    def embeddings_path(self) -> Path:
+        return self.path / f"embeddings-{self.generation}.f32"
+
+    def _read_generation(self) -> int:
+        current = self.path / CURRENT_FILE
+        if current.exists():
+            return int(current.read_text().strip())
+        return 0
+
+    def load_records(self) -> List[Dict[str, Any]]:
+        """
+        Replay the log and return the write records of the live documents
+
+        Each record has `id`, `content`, `meta` and `row`, the index of its embedding in `embeddings()`
+        (None for documents without an embedding).
+
+        Returns:
+            The records in the order the documents were last written
+        """
+        self._remove_stale_generations()
+        live: Dict[str, Dict[str, Any]] = {}
+        valid_bytes = 0
+        max_row = -1
+
+        if self.log_path.exists():
+            with open(self.log_path, "rb") as f:
+                for line in f:
+                    record = self._decode(line)
+                    if record is None:
+                        logger.warning(f"Truncating document log {self.log_path} after a torn or corrupt record")
+                        break
+                    valid_bytes += len(line)
+                    self.records += 1
+                    if record["op"] == "write":
+                        if record.get("dim"):
+                            self.dim = record["dim"]
+                        live.pop(record["id"], None)
+                        live[record["id"]] = record
+                        if record.get("row") is not None:
+                            max_row = max(max_row, record["row"])
+                    elif record["op"] == "delete":
+                        for doc_id in record["ids"]:
+                            live.pop(doc_id, None)
+                    elif record["op"] == "clear":
+                        live.clear()
+            if valid_bytes < self.log_path.stat().st_size:
+                os.truncate(self.log_path, valid_bytes)
+
+        # Drop embedding rows appended before a crash but never referenced by a log record
+        self.rows = max_row + 1
+        if self.embeddings_path.exists():
+            os.truncate(self.embeddings_path, self.rows * (self.dim or 0) * 4)
+
+        logger.info(f"Loaded {len(live)} documents from {self.path} ({self.records} log records)")
+        return list(live.values())
+
+    def load(self) -> List[Document]:
+        """
+        Replay the log and return the live documents, with embeddings read from the memory-mapped file
+
+        Returns:
+            The documents in the order they were last written
+        """
+        records = self.load_records()
+        embeddings = self.embeddings()
+        return [
+            Document(
+                id=record["id"],
+                content=record.get("content"),
+                meta=record.get("meta") or {},
+                embedding=embeddings[record["row"]].tolist() if record.get("row") is not None else None
+            )
+            for record in records
+        ]
+
+    def embeddings(self) -> np.ndarray:
+        """Memory-map the embedding rows (read-only); empty array if nothing was written yet"""
+        if not self.dim or not self.rows:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        # Reopened only once rows were appended or the log was compacted
+        key = (self.generation, self.rows, self.dim)
+        if self._memmap_key != key:
+            self._memmap = np.memmap(self.embeddings_path, dtype=np.float32, mode="r", shape=(self.rows, self.dim))
+            self._memmap_key = key
+        return self._memmap
+
+    def append_writes(self, documents: Iterable[Document]) -> Dict[str, int]:
+        """
+        Append write records for documents, embeddings first
+
+        Returns:
+            Mapping of document id to embedding row for the documents with an embedding
+        """
+        documents = list(documents)
+        if not documents:
+            return {}
+
+        rows = {}
+        vectors = []
+        for document in documents:
+            if document.embedding is not None:
+                vector = np.asarray(document.embedding, dtype=np.float32)
+                if self.dim is None:
+                    self.dim = int(vector.shape[0])
+                rows[document.id] = self.rows + len(vectors)
+                vectors.append(vector)
+        if vectors:
+            self._write_embeddings(np.vstack(vectors))
+
+        self._write_records([
+            {
+                "op": "write",
+                "id": document.id,
+                "content": document.content,
+                "meta": document.meta,
+                "row": rows.get(document.id),
+                "dim": self.dim if document.id in rows else None
+            }
+            for document in documents
+        ])
+        return rows
+
+    def append_delete(self, document_ids: List[str]):
+        """Append a delete record"""
+        if document_ids:
+            self._write_records([{"op": "delete", "ids": list(document_ids)}])
+
+    def append_clear(self):
+        """Append a record deleting all documents"""
+        self._write_records([{"op": "clear"}])
+
+    def compact(self, documents: List[Document]) -> Dict[str, int]:
+        """
+        Rewrite the log with only the given live documents into a new generation
+
+        The new files are synced before CURRENT is atomically switched, so a crash during compaction
+        leaves the previous generation in place.
+
+        Returns:
+            Mapping of document id to embedding row in the new generation
+        """
+        self.close()
+        old_generation = self.generation
+        self.generation = old_generation + 1
+        self.rows = 0
+        self.records = 0
+
+        rows = self.append_writes(documents)
+        self.close()
+
+        current_tmp = self.path / f"{CURRENT_FILE}.tmp"
+        with open(current_tmp, "w") as f:
+            f.write(str(self.generation))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(current_tmp, self.path / CURRENT_FILE)
+        self._remove_stale_generations()
+        logger.info(f"Compacted document log to generation {self.generation} ({len(documents)} documents)")
+        return rows
+
+    def close(self):
+        """Close the open file handles"""
+        for handle in (self._log_file, self._embedding_file):
+            if handle is not None:
+                handle.close()
+        self._log_file = None
+        self._embedding_file = None
+
+    def _write_embeddings(self, matrix: np.ndarray):
+        if self._embedding_file is None:
+            self._embedding_file = open(self.embeddings_path, "ab")
+        self._embedding_file.write(np.ascontiguousarray(matrix, dtype=np.float32).tobytes())
+        self._sync(self._embedding_file)
+        self.rows += matrix.shape[0]
+
+    def _write_records(self, records: List[Dict[str, Any]]):
+        if self._log_file is None:
+            self._log_file = open(self.log_path, "ab")
+        self._log_file.write(b"".join(self._encode(record) for record in records))
+        self._sync(self._log_file)
+        self.records += len(records)
+
+    def _sync(self, handle):
+        handle.flush()
+        if self.fsync:
+            os.fsync(handle.fileno())
+
+    @staticmethod
+    def _encode(record: Dict[str, Any]) -> bytes:
+        body = json.dumps(record, default=str, separators=(",", ":")).encode("utf-8")
+        return f"{zlib.crc32(body):08x} ".encode("ascii") + body + b"\n"
+
+    @staticmethod
+    def _decode(line: bytes) -> Optional[Dict[str, Any]]:
+        """Decode a record line, None if it is torn (no newline) or fails the checksum"""
+        if not line.endswith(b"\n") or len(line) < 10:
+            return None
+        body = line[9:-1]
+        try:
+            if int(line[:8], 16) != zlib.crc32(body):
+                return None
+            return json.loads(body)
+        except ValueError:
+            return None
+
+    def _remove_stale_generations(self):
+        for file in self.path.glob("*-*.*"):
+            stem_generation = file.stem.rsplit("-", 1)[-1]
+            if stem_generation.isdigit() and int(stem_generation) != self.generation:
+                file.unlink()
+
+
+class PersistentDocumentStore(InMemoryDocumentStore):
+    """
+    InMemoryDocumentStore that persists every change to a DocumentLog
+
+    On startup the documents and their embeddings are restored from disk without running the embedder.
+    """
+
+    def __init__(self, path: Path, fsync: bool = True, compact_ratio: float = 0.5, **kwargs: Any):
+        """
+        Initialize the store and restore its documents from disk
+
+        Args:
+            path: Directory holding the document log
+            fsync: Whether to fsync after every write
+            compact_ratio: Compact the log when more than this fraction of its write records are obsolete
+            **kwargs: Passed to InMemoryDocumentStore
+        """
+        super().__init__(**kwargs)
+        self.log = DocumentLog(path, fsync=fsync)
+        self.compact_ratio = compact_ratio
+        self._lock = threading.RLock()
+        self._suppress_delete_log = False
+
+        documents = self.log.load()
+        if documents:
+            self._suppress_delete_log = True
+            try:
+                super().write_documents(documents, policy=DuplicatePolicy.OVERWRITE)
+            finally:
+                self._suppress_delete_log = False
+        self._maybe_compact()
+
+    def write_documents(self, documents: List[Document], policy: DuplicatePolicy = DuplicatePolicy.NONE) -> int:
+        """Write documents and append them to the log (only those actually written under the policy)"""
+        with self._lock:
+            self._suppress_delete_log = True
+            try:
+                return super().write_documents(documents, policy=policy)
+            finally:
+                self._suppress_delete_log = False
+                # Overwrites replace the stored object, skips keep the old one
+                written = [document for document in documents if self.storage.get(document.id) is document]
+                self.log.append_writes(written)
+                self._maybe_compact()
+
+    def delete_documents(self, document_ids: List[str]) -> None:
+        """Delete documents and append a delete record"""
+        with self._lock:
+            super().delete_documents(document_ids)
+            # write_documents deletes before overwriting; that overwrite is logged as a write
+            if not self._suppress_delete_log:
+                self.log.append_delete(document_ids)
+                self._maybe_compact()
+
+    def delete_all_documents(self) -> None:
+        """Delete all documents and append a clear record"""
+        with self._lock:
+            self._suppress_delete_log = True
+            try:
+                super().delete_documents(list(self.storage.keys()))
+            finally:
+                self._suppress_delete_log = False
+            self.log.append_clear()
+            self._maybe_compact()
+
+    def compact(self):
+        """Rewrite the log with only the live documents"""
+        with self._lock:
+            self.log.compact(list(self.storage.values()))
+
+    def _maybe_compact(self):
+        live = self.count_documents()
+        if self.log.records > 1000 and live < self.log.records * (1 - self.compact_ratio):
+            self.compact()
@@ -0,0 +1,58 @@
+import contextlib
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+from haystack import tracing
+from haystack.tracing import Span, Tracer
+
+from utils.metrics import PIPELINE_COMPONENT_SECONDS
+
+# Name of the pipeline whose run encloses the current component run
+_pipeline_name: ContextVar[str] = ContextVar("pipeline_name", default="none")
+
+
+class MetricsTracer(Tracer):
+    """
+    Haystack tracer that times every pipeline component run into a Prometheus histogram
+
+    Haystack opens a "haystack.pipeline.run" span around each pipeline run and a "haystack.component.run"
+    span around each component run; this tracer labels the component's duration with the `name` from
+    the pipeline's metadata and the component name. Spans are passed through to the tracer that was
+    active before (e.g. OpenTelemetry), so tracing keeps working.
+    """
+
+    def __init__(self, inner: Tracer):
+        self.inner = inner
+
+    @contextlib.contextmanager
+    def trace(self, operation_name: str, tags: Optional[Dict[str, Any]] = None,
+              parent_span: Optional[Span] = None) -> Iterator[Span]:
+        if operation_name == "haystack.pipeline.run":
+            metadata = (tags or {}).get("haystack.pipeline.metadata") or {}
+            token = _pipeline_name.set(metadata.get("name", "unnamed"))
+            try:
+                with self.inner.trace(operation_name, tags=tags, parent_span=parent_span) as span:
+                    yield span
+            finally:
+                _pipeline_name.reset(token)
+        elif operation_name == "haystack.component.run":
+            started = time.perf_counter()
+            try:
+                with self.inner.trace(operation_name, tags=tags, parent_span=parent_span) as span:
+                    yield span
+            finally:
+                PIPELINE_COMPONENT_SECONDS.observe(time.perf_counter() - started, pipeline=_pipeline_name.get(),
+                                                   component=(tags or {}).get("haystack.component.name", "unknown"))
+        else:
+            with self.inner.trace(operation_name, tags=tags, parent_span=parent_span) as span:
+                yield span
+
+    def current_span(self) -> Optional[Span]:
+        return self.inner.current_span()
+
+
+def install_pipeline_metrics():
+    """Time haystack pipeline components from now on (idempotent)"""
+    if not isinstance(tracing.tracer.actual_tracer, MetricsTracer):
+        tracing.enable_tracing(MetricsTracer(tracing.tracer.actual_tracer))
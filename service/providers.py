@@ -0,0 +1,131 @@
+import threading
+from typing import Any, Callable, Optional
+
+from utils.config import settings
+from utils.logging import logger
+
+
+class LazyProvider:
+    """
+    Build a service on first call and return the same instance afterwards
+
+    Providers are plain callables, so they work as FastAPI dependencies (`Depends(get_rag_service)`).
+    The factories import their service module themselves: importing this module, or the routes using
+    it, does not load haystack, torch or the OpenAI client.
+    """
+
+    def __init__(self, factory: Callable[[], Any], name: str):
+        """
+        Initialize without building the service
+
+        Args:
+            factory: Builds the service
+            name: Service name for logging
+        """
+        self.factory = factory
+        self.name = name
+        self._instance: Optional[Any] = None
+        # Reentrant: a factory may call other providers
+        self._lock = threading.RLock()
+
+    def __call__(self) -> Any:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    logger.info(f"Building {self.name}")
+                    self._instance = self.factory()
+        return self._instance
+
+    @property
+    def is_built(self) -> bool:
+        return self._instance is not None
+
+    def override(self, instance: Any):
+        """Replace the service, e.g. with a stub in benchmarks"""
+        with self._lock:
+            self._instance = instance
+
+
+def _create_rag_service():
+    from service.rag_service import RAGService
+    if settings.METRICS_ENABLED:
+        from service.pipeline_metrics import install_pipeline_metrics
+        install_pipeline_metrics()
+    return RAGService()
+
+
+def _create_intent_service():
+    from service.intent_processor import IntentProcessorService
+    return IntentProcessorService(settings.SCHEMA_PATH, embed_fn=get_rag_service().embed_query)
+
+
+def _create_response_generator():
+    from service.response_generator import ResponseGeneratorService
+    return ResponseGeneratorService(settings.SCHEMA_PATH)
+
+
+def _create_qa_log():
+    from utils.qa_log import QALogWriter
+    return QALogWriter(
+        settings.QA_LOG_FILE,
+        max_queue=settings.QA_LOG_QUEUE_SIZE,
+        batch_size=settings.QA_LOG_BATCH_SIZE,
+        flush_interval=settings.QA_LOG_FLUSH_INTERVAL,
+        max_bytes=settings.QA_LOG_MAX_BYTES,
+        backup_count=settings.QA_LOG_BACKUP_COUNT,
+        queue_full_policy=settings.QA_LOG_QUEUE_FULL_POLICY,
+        block_timeout=settings.QA_LOG_BLOCK_TIMEOUT
+    )
+
+
+def _create_traffic_capture():
+    from utils.capture import TrafficCapture
+    from utils.qa_log import QALogWriter
+    return TrafficCapture(
+        QALogWriter(settings.CAPTURE_FILE, max_bytes=settings.CAPTURE_MAX_BYTES),
+        sample_rate=settings.CAPTURE_SAMPLE_RATE,
+        max_query_chars=settings.CAPTURE_MAX_QUERY_CHARS
+    )
+
+
+def _create_query_service():
+    from service.answer_cache import SemanticAnswerCache
+    from service.query_service import QueryService
+    return QueryService(
+        get_intent_service(),
+        get_rag_service(),
+        get_response_generator(),
+        answer_cache=SemanticAnswerCache(
+            similarity_threshold=settings.ANSWER_CACHE_SIMILARITY,
+            max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+            max_bytes=settings.ANSWER_CACHE_MAX_BYTES,
+            ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS
+        ) if settings.ANSWER_CACHE_ENABLED else None,
+        qa_log=get_qa_log() if settings.QA_LOG_ENABLED else None
+    )
+
+
+def _create_ingestion_queue():
+    from service.ingestion_jobs import IngestionJobQueue
+    return IngestionJobQueue(
+        get_rag_service,
+        max_workers=settings.INGESTION_WORKERS,
+        spool_dir=settings.INGESTION_SPOOL_DIR,
+        small_file_bytes=settings.INGESTION_SMALL_FILE_BYTES,
+        max_history=settings.INGESTION_JOB_HISTORY
+    )
+
+
+def _create_warmup_service():
+    from service.warmup import WarmupService
+    return WarmupService()
+
+
+get_rag_service = LazyProvider(_create_rag_service, "RAG service")
+get_intent_service = LazyProvider(_create_intent_service, "intent processor service")
+get_response_generator = LazyProvider(_create_response_generator, "response generator service")
+get_qa_log = LazyProvider(_create_qa_log, "QA log writer")
+get_traffic_capture = LazyProvider(_create_traffic_capture, "traffic capture")
+get_query_service = LazyProvider(_create_query_service, "query service")
+get_ingestion_queue = LazyProvider(_create_ingestion_queue, "ingestion queue")
+get_warmup_service = LazyProvider(_create_warmup_service, "warm-up service")
@@ -0,0 +1,420 @@
+import asyncio
+import re
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from haystack.dataclasses import Document, StreamingChunk
+from service.answer_cache import SemanticAnswerCache
+from service.intent_processor import IntentProcessorService
+from service.rag_service import RAGService
+from service.response_generator import ResponseGeneratorService
+from utils.concurrency import run_in_executor
+from utils.config import settings
+from utils.logging import logger
+from utils.metrics import QUERIES, QUERY_STAGE_SECONDS
+from utils.qa_log import QALogWriter
+from utils.timing import StageTimer
+
+
+def build_retrieval_query(query: str, slots: Dict[str, str]) -> str:
+    """Enhance the retrieval query with slot values"""
+    retrieval_query = query
+    if "topic" in slots:
+        retrieval_query = f"{query} {slots['topic']}"
+    if "term" in slots:
+        retrieval_query = f"{query} {slots['term']}"
+    if "section" in slots:
+        retrieval_query = f"{query} {slots['section']}"
+    return retrieval_query
+
+
+def _adds_new_terms(query: str, retrieval_query: str) -> bool:
+    """Whether the slot-enhanced query contains words that are not already in the raw query"""
+    query_words = set(re.findall(r"\w+", query.lower()))
+    return any(word not in query_words for word in re.findall(r"\w+", retrieval_query.lower()))
+
+
+class QueryService:
+    """Orchestrates intent processing, retrieval and response generation for a query"""
+
+    def __init__(
+            self,
+            intent_processor: IntentProcessorService,
+            rag: RAGService,
+            response_generator: ResponseGeneratorService,
+            answer_cache: Optional[SemanticAnswerCache] = None,
+            qa_log: Optional[QALogWriter] = None
+    ):
+        """
+        Initialize the query service
+
+        Args:
+            intent_processor: Service classifying intents and extracting slots
+            rag: Service retrieving relevant documents
+            response_generator: Service generating the final response
+            answer_cache: Optional semantic cache of responses, invalidated on every index operation
+            qa_log: Optional background writer of one record per answered query
+        """
+        self.intent_processor = intent_processor
+        self.rag = rag
+        self.response_generator = response_generator
+        self.answer_cache = answer_cache
+        self.qa_log = qa_log
+        # Metric label values; anything else the LLM returns is counted as "other" to bound the series
+        self.metric_intents = {intent["name"] for intent in intent_processor.schema["intents"]}
+        if answer_cache is not None:
+            rag.add_index_listener(answer_cache.invalidate)
+        logger.info("Query service initialized successfully")
+
+    async def answer(self, query: str) -> Dict[str, Any]:
+        """
+        Answer a query
+
+        With PARALLEL_RETRIEVAL enabled, retrieval on the raw query starts while the intent LLM call
+        is in flight. Its result is discarded for out-of-scope queries, and retrieval only runs again
+        when the slot-enhanced query adds words that are not in the raw query.
+
+        Args:
+            query: The user's query text
+
+        Returns:
+            Dictionary with the API response fields and per-stage timings in milliseconds
+        """
+        logger.info(f"Processing query: '{query}'")
+        timer = StageTimer()
+
+        # Step 0: Look up a cached response of a similar query, skipping intent and generation calls
+        cache_key, cached_response = await self._lookup_answer_cache(query, timer)
+        if cached_response is not None:
+            return self._finish_cached(query, cached_response, timer)
+
+        # Step 1 and 2: Process intent and slots, retrieve relevant documents
+        query_embedding = cache_key[0] if cache_key is not None else None
+        intent_result, documents = await self._intent_and_retrieval(query, query_embedding, timer)
+
+        # Step 3: Generate response
+        response_result = await timer.timed("generation", self._generate(query, intent_result, documents))
+
+        # Step 4: Log, cache and return
+        return self._finish(query, intent_result, documents, response_result, cache_key, timer)
+
+    async def answer_stream(self, query: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Answer a query as a stream of events, forwarding the answer tokens as the LLM generates them
+
+        Events are dicts with an `event` name and its `data`:
+        - `context`: intent, slots, out-of-scope flag, confidence and the retrieved passages
+        - `token`: the next piece of the answer (a canned or cached answer comes as a single token)
+        - `done`: the full response as returned by `answer`, with `time_to_first_token` in the timings
+
+        Args:
+            query: The user's query text
+
+        Yields:
+            The events in order
+        """
+        logger.info(f"Processing streamed query: '{query}'")
+        timer = StageTimer()
+
+        cache_key, cached_response = await self._lookup_answer_cache(query, timer)
+        if cached_response is not None:
+            yield {"event": "context", "data": {
+                **{key: cached_response[key] for key in ("intent", "slots", "is_out_of_scope", "confidence")},
+                "documents": [{"content": content} for content in cached_response["documents_used"]]
+            }}
+            timer.mark("time_to_first_token")
+            yield {"event": "token", "data": {"text": cached_response["response"]}}
+            yield {"event": "done", "data": self._finish_cached(query, cached_response, timer)}
+            return
+
+        query_embedding = cache_key[0] if cache_key is not None else None
+        intent_result, documents = await self._intent_and_retrieval(query, query_embedding, timer)
+        yield {"event": "context", "data": {
+            **{key: intent_result[key] for key in ("intent", "slots", "is_out_of_scope", "confidence")},
+            "documents": [
+                {"content": doc.content, "score": doc.score, "file_path": doc.meta.get("file_path")}
+                for doc in documents
+            ]
+        }}
+
+        # The LLM's streaming callback feeds a queue drained here; None marks the end of generation
+        tokens: asyncio.Queue = asyncio.Queue()
+
+        async def on_chunk(chunk: StreamingChunk):
+            if chunk.content:
+                await tokens.put(chunk.content)
+
+        generation = asyncio.create_task(timer.timed("generation", self._generate(
+            query, intent_result, documents, streaming_callback=on_chunk
+        )))
+        generation.add_done_callback(lambda _: tokens.put_nowait(None))
+        streamed = False
+        try:
+            while (text := await tokens.get()) is not None:
+                if not streamed:
+                    timer.mark("time_to_first_token")
+                    streamed = True
+                yield {"event": "token", "data": {"text": text}}
+            response_result = await generation
+        finally:
+            # The client went away mid-stream: stop paying for tokens nobody reads
+            generation.cancel()
+
+        if not streamed:
+            # Canned answers (out of scope, missing slots, no documents) do not call the LLM
+            timer.mark("time_to_first_token")
+            yield {"event": "token", "data": {"text": response_result["response"]}}
+        result = self._finish(query, intent_result, documents, response_result, cache_key, timer)
+        yield {"event": "done", "data": result}
+
+    async def answer_batch(self, queries: List[str]) -> Dict[str, Any]:
+        """
+        Answer many queries at once
+
+        All queries are embedded in one batch (the embeddings serve the answer cache and the local
+        intent classifier), intent calls for the cache misses run concurrently, retrieval runs once
+        for all in-scope queries (one matrix product with a matrix store), then the answers are
+        generated concurrently. At most BATCH_QUERY_CONCURRENCY intent or generation calls are in
+        flight at a time.
+
+        Args:
+            queries: The user's query texts
+
+        Returns:
+            Dictionary with one result per query, in order (the `/api/query` fields with `success` set,
+            or `success` false and an `error`), and the batch stage timings in milliseconds
+        """
+        logger.info(f"Processing batch of {len(queries)} queries")
+        timer = StageTimer()
+        # Per-query timers share the batch start, so an item's `total` is its time since the batch started
+        item_timers = [StageTimer() for _ in queries]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+        fan_out = asyncio.Semaphore(settings.BATCH_QUERY_CONCURRENCY)
+
+        def fail(i: int, stage: str, error: BaseException):
+            logger.error(f"Batch query {i} failed during {stage}: {str(error)}")
+            results[i] = {"query": queries[i], "success": False, "error": f"Error during {stage}: {str(error)}"}
+
+        # Step 0: Embed every query in one batch and look up cached answers
+        embeddings = await timer.timed("embedding", run_in_executor(self.rag.embed_queries, queries))
+        cache_keys: List[Optional[Tuple]] = [None] * len(queries)
+        if self.answer_cache is not None:
+            with timer.stage("cache_lookup"):
+                for i, query in enumerate(queries):
+                    cache_keys[i] = self._answer_cache_key(query, embeddings[i])
+                    cached_response = self.answer_cache.lookup(*cache_keys[i])
+                    if cached_response is not None:
+                        results[i] = {**self._finish_cached(query, cached_response, item_timers[i]), "success": True}
+        pending = [i for i in range(len(queries)) if results[i] is None]
+
+        # Step 1: Intents, concurrently
+        async def process_intent(i: int) -> Dict[str, Any]:
+            async with fan_out:
+                return await item_timers[i].timed("intent", self.intent_processor.process_intent_async(
+                    query=queries[i], query_embedding=embeddings[i]
+                ))
+
+        with timer.stage("intent"):
+            outcomes = await asyncio.gather(*(process_intent(i) for i in pending), return_exceptions=True)
+        intent_results: Dict[int, Dict[str, Any]] = {}
+        for i, outcome in zip(pending, outcomes):
+            if isinstance(outcome, BaseException):
+                fail(i, "intent processing", outcome)
+            else:
+                intent_results[i] = outcome
+
+        # Step 2: Retrieval for all in-scope queries in one batch
+        documents: Dict[int, List[Document]] = {i: [] for i in intent_results}
+        in_scope = [i for i, intent_result in intent_results.items() if not intent_result["is_out_of_scope"]]
+        if in_scope:
+            retrieval_queries = [build_retrieval_query(queries[i], intent_results[i]["slots"]) for i in in_scope]
+            try:
+                with timer.stage("retrieval"):
+                    retrieved = await run_in_executor(self.rag.retrieve_batch, retrieval_queries)
+                for i, docs in zip(in_scope, retrieved):
+                    documents[i] = docs
+                    item_timers[i].timings["retrieval"] = timer.timings["retrieval"]
+            except Exception as e:
+                for i in in_scope:
+                    fail(i, "retrieval", e)
+                    del intent_results[i]
+
+        # Step 3: Answers, concurrently
+        async def generate(i: int) -> Dict[str, Any]:
+            async with fan_out:
+                response_result = await item_timers[i].timed(
+                    "generation", self._generate(queries[i], intent_results[i], documents[i])
+                )
+            result = self._finish(queries[i], intent_results[i], documents[i], response_result, cache_keys[i],
+                                  item_timers[i])
+            return {**result, "success": True}
+
+        with timer.stage("generation"):
+            outcomes = await asyncio.gather(*(generate(i) for i in intent_results), return_exceptions=True)
+        for i, outcome in zip(intent_results, outcomes):
+            if isinstance(outcome, BaseException):
+                fail(i, "generation", outcome)
+            else:
+                results[i] = outcome
+
+        timings = timer.finish()
+        errors = sum(1 for result in results if not result["success"])
+        logger.info(f"Answered batch of {len(queries)} queries ({errors} errors), timings (ms): {timings}")
+        return {"results": results, "errors": errors, "timings": timings}
+
+    async def _lookup_answer_cache(self, query: str, timer: StageTimer
+                                   ) -> Tuple[Optional[Tuple[List[float], Optional[str], int]], Optional[Dict]]:
+        """Return the answer cache key (None without a cache) and the cached response of a similar query"""
+        if self.answer_cache is None:
+            return None, None
+        cache_key = await timer.timed("cache_lookup", run_in_executor(self._answer_cache_key, query))
+        return cache_key, self.answer_cache.lookup(*cache_key)
+
+    def _finish_cached(self, query: str, cached_response: Dict[str, Any], timer: StageTimer) -> Dict[str, Any]:
+        cached_response.update(query=query, cache_hit=True, timings=timer.finish())
+        self._record_answer(cached_response)
+        logger.info(f"Answer cache hit, query timings (ms): {cached_response['timings']}")
+        return cached_response
+
+    async def _intent_and_retrieval(self, query: str, query_embedding: Optional[List[float]],
+                                    timer: StageTimer) -> Tuple[Dict[str, Any], List[Document]]:
+        if settings.PARALLEL_RETRIEVAL:
+            return await self._intent_and_retrieval_parallel(query, query_embedding, timer)
+        return await self._intent_and_retrieval_sequential(query, query_embedding, timer)
+
+    async def _generate(self, query: str, intent_result: Dict[str, Any], documents: List[Document],
+                        streaming_callback: Optional[Callable[[StreamingChunk], Awaitable[None]]] = None
+                        ) -> Dict[str, Any]:
+        return await self.response_generator.generate_response_async(
+            query=query,
+            documents=documents,
+            intent=intent_result["intent"],
+            slots=intent_result["slots"],
+            is_out_of_scope=intent_result["is_out_of_scope"],
+            missing_required_slots=intent_result["missing_required_slots"],
+            confidence=intent_result["confidence"],
+            streaming_callback=streaming_callback
+        )
+
+    def _finish(self, query: str, intent_result: Dict[str, Any], documents: List[Document],
+                response_result: Dict[str, Any], cache_key: Optional[Tuple], timer: StageTimer) -> Dict[str, Any]:
+        """Cache the answer, build the response with its timings and log the question and full answer"""
+        result = {
+            "query": query,
+            "intent": intent_result["intent"],
+            "slots": intent_result["slots"],
+            "is_out_of_scope": intent_result["is_out_of_scope"],
+            "response": response_result["response"],
+            "confidence": intent_result["confidence"],
+            "documents_used": [doc.content for doc in documents],
+            "document_ids": [doc.id for doc in documents],
+            "prompt_tokens": response_result.get("prompt_tokens"),
+            "cache_hit": False
+        }
+
+        # Cache generated answers and out-of-scope replies, but not error or missing-information fallbacks
+        if cache_key is not None and (not response_result.get("is_fallback") or intent_result["is_out_of_scope"]):
+            self.answer_cache.put(*cache_key, result)
+
+        result["timings"] = timer.finish()
+        self._record_answer(result)
+        logger.info(f"Query timings (ms): {result['timings']}")
+        return result
+
+    def _record_answer(self, result: Dict[str, Any]):
+        """Record the stage timings of an answered query in the metrics and queue its QA log record"""
+        intent = result["intent"] if result["intent"] in self.metric_intents else "other"
+        labels = {"intent": intent, "cache_hit": "true" if result["cache_hit"] else "false"}
+        QUERIES.inc(**labels)
+        for stage, milliseconds in result["timings"].items():
+            QUERY_STAGE_SECONDS.observe(milliseconds / 1000, stage=stage, **labels)
+
+        if self.qa_log is None:
+            return
+        self.qa_log.write({
+            "timestamp": time.time(),
+            "query": result["query"],
+            "response": result["response"],
+            "intent": result["intent"],
+            "slots": result["slots"],
+            "confidence": result["confidence"],
+            "is_out_of_scope": result["is_out_of_scope"],
+            "cache_hit": result["cache_hit"],
+            "latency_ms": result["timings"].get("total"),
+            "timings": result["timings"],
+            "document_ids": result.get("document_ids", []),
+            "prompt_tokens": result.get("prompt_tokens")
+        })
+
+    def _answer_cache_key(self, query: str, embedding: Optional[List[float]] = None
+                          ) -> Tuple[List[float], Optional[str], int]:
+        """Compute the query embedding, the locally predicted intent and the store version for the answer cache"""
+        store_version = self.rag.store_version
+        if embedding is None:
+            embedding = self.rag.embed_query(query)
+        intent = None
+        classifier = self.intent_processor.local_classifier
+        if classifier is not None:
+            nearest = classifier.nearest_intent(embedding)
+            intent = nearest[0] if nearest else None
+        return embedding, intent, store_version
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get counters of the components on the query path"""
+        stats = {
+            "intent": self.intent_processor.get_stats(),
+            "intent_cache": self.intent_processor.intent_cache.get_stats(),
+            "embedding_cache": self.rag.text_embedder.get_stats(),
+            **self.response_generator.get_stats()
+        }
+        if self.answer_cache is not None:
+            stats["answer_cache"] = self.answer_cache.get_stats()
+        if self.qa_log is not None:
+            stats["qa_log"] = self.qa_log.get_stats()
+        return stats
+
+    async def _retrieve(self, query: str, retrieval_query: str) -> List[Document]:
+        retrieval_result = await self.rag.retrieve_async(query=query, enhanced_query=retrieval_query)
+        return retrieval_result["documents"] if retrieval_result["success"] else []
+
+    async def _intent_and_retrieval_sequential(self, query: str, query_embedding: Optional[List[float]],
+                                               timer: StageTimer):
+        intent_result = await timer.timed("intent", self.intent_processor.process_intent_async(
+            query=query, query_embedding=query_embedding
+        ))
+
+        documents = []
+        if not intent_result["is_out_of_scope"]:
+            retrieval_query = build_retrieval_query(query, intent_result["slots"])
+            documents = await timer.timed("retrieval", self._retrieve(query, retrieval_query))
+
+        return intent_result, documents
+
+    async def _intent_and_retrieval_parallel(self, query: str, query_embedding: Optional[List[float]],
+                                             timer: StageTimer):
+        # Start retrieval on the raw query while the intent LLM call is in flight
+        retrieval_task = asyncio.create_task(timer.timed("retrieval", self._retrieve(query, query)))
+        try:
+            intent_result = await timer.timed("intent", self.intent_processor.process_intent_async(
+                query=query, query_embedding=query_embedding
+            ))
+        except BaseException:
+            retrieval_task.cancel()
+            raise
+
+        if intent_result["is_out_of_scope"]:
+            # Documents are not used for out-of-scope queries: discard the speculative retrieval
+            retrieval_task.cancel()
+            return intent_result, []
+
+        documents = await retrieval_task
+
+        retrieval_query = build_retrieval_query(query, intent_result["slots"])
+        if _adds_new_terms(query, retrieval_query):
+            enhanced_documents = await timer.timed("retrieval_enhanced", self._retrieve(query, retrieval_query))
+            topk_changed = [doc.id for doc in enhanced_documents] != [doc.id for doc in documents]
+            logger.debug(f"Slot-enhanced retrieval changed top-k: {topk_changed}")
+            documents = enhanced_documents
+
+        return intent_result, documents
+
@@ -1,15 +1,25 @@
+from dataclasses import replace
 from pathlib import Path
-from typing import List, Dict, Optional
-from haystack import Pipeline, component
+from typing import Any, Callable, List, Dict, Optional, Set
+
+import numpy as np
+from haystack import AsyncPipeline, Pipeline, component
 from haystack.components.generators.chat import OpenAIChatGenerator
 from haystack.document_stores.in_memory import InMemoryDocumentStore
-from haystack.components.converters import TextFileToDocument
 from haystack.components.preprocessors import DocumentCleaner, DocumentSplitter
 from haystack.components.writers import DocumentWriter
-from haystack.components.embedders import SentenceTransformersDocumentEmbedder, SentenceTransformersTextEmbedder
 from haystack.components.retrievers.in_memory import InMemoryEmbeddingRetriever
 from haystack.components.builders import PromptBuilder
 from haystack.dataclasses import ChatMessage, Document
+from haystack.utils import Secret
+from haystack.document_stores.types import DuplicatePolicy
+from service.ann_index import ANNEmbeddingRetriever, IVFIndex, VectorIndexUpdater
+from service.document_catalog import DocumentCatalog, count_chunks_by_file
+from service.embedding import CachedTextEmbedder, EmbeddingModel, SharedDocumentEmbedder, SharedTextEmbedder
+from service.ingestion import StreamingIndexer
+from service.matrix_store import MatrixDocumentStore, MatrixEmbeddingRetriever
+from service.persistent_store import DocumentLog, PersistentDocumentStore
+from utils.concurrency import run_in_executor
 from utils.config import settings
 from utils.logging import logger
 
@@ -27,8 +37,21 @@ class RAGService:
 
     def __init__(self):
         """Initialize RAG components and pipelines"""
+        # One embedding model instance shared by the indexing and retrieval pipelines
+        self.embedding_model = EmbeddingModel(settings.EMBEDDING_MODEL)
+
         # Initialize document store
-        self.document_store = InMemoryDocumentStore()
+        self.document_store = self._create_document_store()
+
+        # Per-file chunk counts, sizes and hashes, so listing documents never scans the store
+        self.catalog = self._create_catalog()
+
+        # Optional approximate nearest-neighbour index, rebuilt from documents restored from disk
+        self.vector_index = self._create_vector_index()
+
+        # Incremented on every index operation; caches key their entries on it
+        self.store_version = 0
+        self._index_listeners: List[Callable[[], None]] = []
 
         # Define prompt template with required variables
         self.prompt_template = """
@@ -43,72 +66,328 @@ class RAGService:
         Answer:
         """
 
-        # Create indexing and QA pipelines
-        self.indexing_pipeline = self._create_indexing_pipeline()
-        self.qa_pipeline = self._create_qa_pipeline()
+        # Create indexing (preprocessing, then embedding and writing), retrieval and generation pipelines
+        self.preprocessing_pipeline = self._create_preprocessing_pipeline()
+        self.embedding_pipeline = self._create_embedding_pipeline()
+        self.retrieval_pipeline = self._create_retrieval_pipeline()
+        self.generation_pipeline = self._create_generation_pipeline()
 
         logger.info("RAG service initialized successfully")
 
-    def _create_indexing_pipeline(self) -> Pipeline:
-        """Create the document indexing pipeline"""
-        indexing_pipeline = Pipeline()
-        indexing_pipeline.add_component("cleaner", DocumentCleaner())
-        indexing_pipeline.add_component("splitter", DocumentSplitter(
+    def _create_preprocessing_pipeline(self) -> Pipeline:
+        """Create the pipeline cleaning and splitting documents into chunks"""
+        preprocessing_pipeline = Pipeline(metadata={"name": "preprocessing"})
+        preprocessing_pipeline.add_component("cleaner", DocumentCleaner())
+        preprocessing_pipeline.add_component("splitter", DocumentSplitter(
             split_by=settings.SPLIT_BY,
             split_length=settings.SPLIT_LENGTH,
             split_overlap=settings.SPLIT_OVERLAP
         ))
-        indexing_pipeline.add_component("embedder", SentenceTransformersDocumentEmbedder(
-            model=settings.EMBEDDING_MODEL
-        ))
-        indexing_pipeline.add_component("writer", DocumentWriter(document_store=self.document_store))
 
         # Connect components
-        indexing_pipeline.connect("cleaner", "splitter")
-        indexing_pipeline.connect("splitter", "embedder")
-        indexing_pipeline.connect("embedder", "writer")
+        preprocessing_pipeline.connect("cleaner", "splitter")
 
-        return indexing_pipeline
+        return preprocessing_pipeline
 
-    def _create_qa_pipeline(self) -> Pipeline:
-        """Create the question-answering pipeline"""
-        qa_pipeline = Pipeline()
-        qa_pipeline.add_component("text_embedder", SentenceTransformersTextEmbedder(
-            model=settings.EMBEDDING_MODEL
-        ))
-        qa_pipeline.add_component("retriever", InMemoryEmbeddingRetriever(
+    def _create_embedding_pipeline(self) -> Pipeline:
+        """Create the pipeline embedding chunks and writing them to the document store"""
+        embedding_pipeline = Pipeline(metadata={"name": "embedding"})
+        embedding_pipeline.add_component("embedder", self._create_document_embedder())
+        # Chunk ids are content hashes, so a rewrite of the same id carries the same chunk
+        embedding_pipeline.add_component("writer", DocumentWriter(
             document_store=self.document_store,
-            top_k=settings.RETRIEVER_TOP_K
-        ))
-        qa_pipeline.add_component("prompt_builder", PromptBuilder(
-            template=self.prompt_template,
-            required_variables=["documents", "question"]
+            policy=DuplicatePolicy.OVERWRITE
         ))
-        qa_pipeline.add_component("message_converter", ChatMessageConverter())
-        qa_pipeline.add_component("generator", OpenAIChatGenerator(
-            api_key=settings.OPENROUTER_API_KEY,
+
+        # Connect components
+        if self.vector_index is not None:
+            embedding_pipeline.add_component("index_updater", VectorIndexUpdater(self.vector_index))
+            embedding_pipeline.connect("embedder", "index_updater")
+            embedding_pipeline.connect("index_updater", "writer")
+        else:
+            embedding_pipeline.connect("embedder", "writer")
+
+        return embedding_pipeline
+
+    def _create_document_store(self) -> Any:
+        """Create the document store selected by DOCUMENT_STORE_TYPE"""
+        if settings.DOCUMENT_STORE_TYPE in ("matrix", "persistent_matrix"):
+            log = None
+            if settings.DOCUMENT_STORE_TYPE == "persistent_matrix":
+                log = DocumentLog(settings.DOCUMENT_STORE_PATH, fsync=settings.DOCUMENT_STORE_FSYNC)
+            return MatrixDocumentStore(
+                log,
+                compact_ratio=settings.DOCUMENT_STORE_COMPACT_RATIO,
+                quantization=settings.EMBEDDING_QUANTIZATION,
+                rescore_factor=settings.RESCORE_FACTOR,
+                rescore_path=settings.RESCORE_EMBEDDINGS_PATH
+            )
+        if settings.DOCUMENT_STORE_TYPE == "persistent":
+            return PersistentDocumentStore(
+                settings.DOCUMENT_STORE_PATH,
+                fsync=settings.DOCUMENT_STORE_FSYNC,
+                compact_ratio=settings.DOCUMENT_STORE_COMPACT_RATIO
+            )
+        return InMemoryDocumentStore()
+
+    def _create_catalog(self) -> DocumentCatalog:
+        """Create the document catalog, persisted alongside persistent stores and checked against the store"""
+        persistent = settings.DOCUMENT_STORE_TYPE in ("persistent", "persistent_matrix")
+        catalog = DocumentCatalog(settings.DOCUMENT_CATALOG_PATH if persistent else None)
+        stored = self.document_store.count_documents()
+        if catalog.total_chunks != stored:
+            # Missing or out of date (e.g. a crash between a store write and its catalog record)
+            logger.warning(f"Document catalog lists {catalog.total_chunks} chunks but the store holds {stored}, "
+                           f"rebuilding it from the store")
+            catalog.rebuild(count_chunks_by_file(self.document_store.filter_documents()))
+        return catalog
+
+    def _create_vector_index(self) -> Optional[IVFIndex]:
+        """Create the ANN index selected by VECTOR_INDEX, None for exact retrieval"""
+        if settings.VECTOR_INDEX != "ivf":
+            return None
+
+        index = IVFIndex(nlist=settings.ANN_NLIST, nprobe=settings.ANN_NPROBE)
+        documents = [doc for doc in self.document_store.filter_documents() if doc.embedding is not None]
+        if documents:
+            index.add([doc.id for doc in documents], np.asarray([doc.embedding for doc in documents]))
+            logger.info(f"Built ANN index over {len(documents)} stored documents")
+        return index
+
+    def _create_document_embedder(self) -> Any:
+        """Create the embedder used by the indexing pipeline"""
+        return SharedDocumentEmbedder(self.embedding_model)
+
+    def _create_text_embedder(self) -> Any:
+        """Create the embedder used to embed retrieval queries"""
+        return SharedTextEmbedder(self.embedding_model)
+
+    def _create_generator(self) -> Any:
+        """Create the chat generator used to answer questions from retrieved documents"""
+        return OpenAIChatGenerator(
+            api_key=Secret.from_token(settings.OPENROUTER_API_KEY),
             api_base_url=settings.OPENROUTER_BASE_URL,
             model=settings.RAG_MODEL,
             generation_kwargs={
                 "max_tokens": settings.RAG_MAX_TOKENS,
                 "temperature": settings.RAG_TEMPERATURE
             }
+        )
+
+    def _create_retrieval_pipeline(self) -> Pipeline:
+        """Create the retrieval pipeline (query embedding and document retrieval, no LLM call)"""
+        retrieval_pipeline = Pipeline(metadata={"name": "retrieval"})
+        self.text_embedder = CachedTextEmbedder(self._create_text_embedder(), settings.EMBEDDING_CACHE_SIZE)
+        retrieval_pipeline.add_component("text_embedder", self.text_embedder)
+        if self.vector_index is not None:
+            retriever = ANNEmbeddingRetriever(
+                document_store=self.document_store,
+                index=self.vector_index,
+                top_k=settings.RETRIEVER_TOP_K
+            )
+        elif isinstance(self.document_store, MatrixDocumentStore):
+            retriever = MatrixEmbeddingRetriever(
+                document_store=self.document_store,
+                top_k=settings.RETRIEVER_TOP_K
+            )
+        else:
+            retriever = InMemoryEmbeddingRetriever(
+                document_store=self.document_store,
+                top_k=settings.RETRIEVER_TOP_K
+            )
+        retrieval_pipeline.add_component("retriever", retriever)
+
+        # Connect components
+        retrieval_pipeline.connect("text_embedder.embedding", "retriever.query_embedding")
+
+        return retrieval_pipeline
+
+    def _create_generation_pipeline(self) -> AsyncPipeline:
+        """
+        Create the answer generation pipeline that runs on already retrieved documents
+
+        It is an AsyncPipeline so the LLM call can be awaited; its `run` method still works from sync code.
+        """
+        generation_pipeline = AsyncPipeline(metadata={"name": "generation"})
+        generation_pipeline.add_component("prompt_builder", PromptBuilder(
+            template=self.prompt_template,
+            required_variables=["documents", "question"]
         ))
+        generation_pipeline.add_component("message_converter", ChatMessageConverter())
+        generation_pipeline.add_component("generator", self._create_generator())
 
         # Connect components
-        qa_pipeline.connect("text_embedder.embedding", "retriever.query_embedding")
-        qa_pipeline.connect("retriever.documents", "prompt_builder.documents")
-        qa_pipeline.connect("prompt_builder.prompt", "message_converter.prompt")
-        qa_pipeline.connect("message_converter.messages", "generator.messages")
+        generation_pipeline.connect("prompt_builder.prompt", "message_converter.prompt")
+        generation_pipeline.connect("message_converter.messages", "generator.messages")
+
+        return generation_pipeline
+
+    def add_index_listener(self, callback: Callable[[], None]):
+        """Register a callback invoked after every index operation (e.g. to invalidate caches)"""
+        self._index_listeners.append(callback)
+
+    def _notify_index_listeners(self):
+        self.store_version += 1
+        for callback in self._index_listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Error in index listener: {str(e)}")
+
+    def split_document(self, document: Document) -> List[Document]:
+        """
+        Clean a document and split it into chunks
 
-        return qa_pipeline
+        Args:
+            document: The document to split
+
+        Returns:
+            The chunks, not yet embedded
+        """
+        return self.preprocessing_pipeline.run({"cleaner": {"documents": [document]}})["splitter"]["documents"]
+
+    def write_chunks(self, chunks: List[Document]) -> int:
+        """
+        Embed chunks and write them to the document store (and the ANN index)
+
+        Args:
+            chunks: The chunks to write
+
+        Returns:
+            The number of chunks written
+        """
+        if not chunks:
+            return 0
+        try:
+            result = self.embedding_pipeline.run({"embedder": {"documents": chunks}})
+        finally:
+            # Even a failed run may have written some chunks
+            self._notify_index_listeners()
+        return result["writer"]["documents_written"]
+
+    def chunk_ids_for(self, file_path: str) -> Set[str]:
+        """Ids of the stored chunks of a file"""
+        return set(self.chunk_meta_for(file_path))
+
+    def chunk_meta_for(self, file_path: str) -> Dict[str, Dict[str, Any]]:
+        """Meta of the stored chunks of a file by id"""
+        documents = self.document_store.filter_documents(
+            filters={"field": "meta.file_path", "operator": "==", "value": file_path}
+        )
+        return {doc.id: doc.meta for doc in documents}
+
+    def update_chunk_meta(self, chunks: List[Document]):
+        """
+        Replace the meta of stored chunks, keeping their embeddings
+
+        Args:
+            chunks: Chunks with the new meta, by id of the stored chunk
+        """
+        if not chunks:
+            return
+        meta = {chunk.id: chunk.meta for chunk in chunks}
+        stored = self.document_store.filter_documents(
+            filters={"field": "id", "operator": "in", "value": list(meta)}
+        )
+        try:
+            self.document_store.write_documents([replace(doc, meta=meta[doc.id]) for doc in stored],
+                                                policy=DuplicatePolicy.OVERWRITE)
+        finally:
+            self._notify_index_listeners()
+
+    def delete_chunks(self, chunk_ids: List[str]):
+        """
+        Delete chunks from the document store and the ANN index
+
+        Args:
+            chunk_ids: Ids of the chunks to delete
+        """
+        if not chunk_ids:
+            return
+        try:
+            if self.vector_index is not None:
+                self.vector_index.remove(chunk_ids)
+            self.document_store.delete_documents(chunk_ids)
+        finally:
+            self._notify_index_listeners()
+
+    def create_stream_indexer(self, source: str, total_bytes: Optional[int] = None,
+                              on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> StreamingIndexer:
+        """
+        Create an indexer that (re-)indexes a file segment by segment as its bytes are fed
+
+        Chunks already stored for `source` with unchanged content are not embedded again (only their
+        position meta is rewritten if they moved), and its chunks that are gone from the new content are
+        deleted when the indexer finishes.
+
+        Args:
+            source: Name of the document, stored as the chunks' `file_path` meta
+            total_bytes: Size of the stream if known, for progress reporting
+            on_progress: Called with the progress dict after every indexed segment
+
+        Returns:
+            A StreamingIndexer; call `feed` with each chunk of bytes and `finish` at the end
+        """
+        existing_meta = self.chunk_meta_for(source)
+        return StreamingIndexer(
+            self.split_document,
+            self.write_chunks,
+            source=source,
+            segment_chars=settings.UPLOAD_CHUNK_SIZE,
+            existing_ids=existing_meta,
+            delete=self.delete_chunks,
+            total_bytes=total_bytes,
+            on_progress=on_progress,
+            on_finish=self.record_indexed_file,
+            existing_meta=existing_meta,
+            update_meta=self.update_chunk_meta
+        )
+
+    def record_indexed_file(self, progress: Dict[str, Any]):
+        """
+        Update the document catalog for a file whose chunks are all written
+
+        Args:
+            progress: Final progress dict of the file's StreamingIndexer
+        """
+        self.catalog.upsert(progress["source"], chunks=progress["chunks_indexed"], size_bytes=progress["bytes_read"],
+                            sha256=progress["sha256"])
+
+    def delete_file(self, file_path: str) -> Dict:
+        """
+        Delete all chunks of a file
+
+        Args:
+            file_path: The file's `file_path` meta (the uploaded file name)
+
+        Returns:
+            Dictionary with success flag and the number of chunks removed
+        """
+        try:
+            chunk_ids = list(self.chunk_ids_for(file_path))
+            self.delete_chunks(chunk_ids)
+            self.catalog.remove(file_path)
+            logger.info(f"Deleted {len(chunk_ids)} chunks of '{file_path}'")
+            return {
+                "success": True,
+                "chunks_removed": len(chunk_ids),
+                "document_count": self.document_store.count_documents()
+            }
+        except Exception as e:
+            logger.error(f"Error deleting document '{file_path}': {str(e)}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
 
     def index_document(self, file_path: Path) -> Dict:
-        """Index a document from a file path"""
+        """Index a document from a file path, reading it in UPLOAD_CHUNK_SIZE chunks"""
         try:
-            converter = TextFileToDocument()
-            docs = converter.run(sources=[file_path])
-            self.indexing_pipeline.run({"cleaner": {"documents": docs["documents"]}})
+            indexer = self.create_stream_indexer(str(file_path), total_bytes=file_path.stat().st_size)
+            with open(file_path, "rb") as f:
+                while data := f.read(settings.UPLOAD_CHUNK_SIZE):
+                    indexer.feed(data)
+            progress = indexer.finish()
 
             doc_count = self.document_store.count_documents()
             logger.info(f"Document '{file_path}' indexed successfully. Total documents: {doc_count}")
@@ -116,6 +395,9 @@ class RAGService:
             return {
                 "success": True,
                 "document_count": doc_count,
+                "chunks_indexed": progress["chunks_indexed"],
+                "chunks_skipped": progress["chunks_skipped"],
+                "chunks_removed": progress["chunks_removed"],
                 "message": f"Document '{file_path.name}' indexed successfully"
             }
         except Exception as e:
@@ -133,42 +415,203 @@ class RAGService:
             logger.error(f"Error retrieving documents: {str(e)}")
             return []
 
-    def get_answer(self, query: str, enhanced_query: Optional[str] = None) -> Dict:
-        """Get answer for a query using the QA pipeline"""
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a text with the retrieval pipeline's query embedder
+
+        Args:
+            text: The text to embed
+
+        Returns:
+            The embedding vector
+        """
+        self.text_embedder.warm_up()
+        return self.text_embedder.run(text=text)["embedding"]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several texts with the query embedder in one batch
+
+        Args:
+            texts: The texts to embed
+
+        Returns:
+            One embedding vector per text
+        """
+        self.text_embedder.warm_up()
+        return self.text_embedder.run_batch(texts)
+
+    def retrieve_batch(self, retrieval_queries: List[str]) -> List[List[Document]]:
+        """
+        Retrieve the documents relevant to several queries at once
+
+        The queries are embedded in one batch; with a matrix store all of them are scored in one
+        matrix product, other retrievers run once per query.
+
+        Args:
+            retrieval_queries: The (slot-enhanced) queries used for retrieval
+
+        Returns:
+            One list of documents per query, in order
+        """
+        embeddings = self.embed_queries(retrieval_queries)
+        retriever = self.retrieval_pipeline.get_component("retriever")
+        if hasattr(retriever, "run_batch"):
+            return retriever.run_batch(query_embeddings=embeddings)
+        return [retriever.run(query_embedding=embedding)["documents"] for embedding in embeddings]
+
+    def warm_up(self):
+        """
+        Load the embedding model and run a dummy inference through both embedders
+
+        The dummy query bypasses the embedding cache so it is not cached as a real one.
+        """
+        document_embedder = self.embedding_pipeline.get_component("embedder")
+        for embedder in (self.text_embedder.embedder, document_embedder):
+            if hasattr(embedder, "warm_up"):
+                embedder.warm_up()
+        self.text_embedder.embedder.run(text="warm up")
+        document_embedder.run(documents=[Document(content="warm up")])
+
+    def retrieve(self, query: str, enhanced_query: Optional[str] = None) -> Dict:
+        """
+        Retrieve the documents relevant to a query without calling the LLM
+
+        Args:
+            query: The user's query text
+            enhanced_query: Optional slot-enhanced query used for retrieval instead of the raw query
+
+        Returns:
+            Dictionary with success flag and retrieved documents
+        """
         try:
             # Use enhanced query if provided
             retrieval_query = enhanced_query if enhanced_query else query
 
-            # Run QA pipeline
-            result = self.qa_pipeline.run(
-                {
-                    "text_embedder": {"text": retrieval_query},
-                    "prompt_builder": {"question": query}
-                },
-                include_outputs_from=["retriever", "generator"]
-            )
+            result = self.retrieval_pipeline.run({"text_embedder": {"text": retrieval_query}})
+
+            return {
+                "success": True,
+                "documents": result["retriever"]["documents"]
+            }
+        except Exception as e:
+            logger.error(f"Error retrieving documents for query '{query}': {str(e)}")
+            return {
+                "success": False,
+                "error": str(e),
+                "documents": []
+            }
+
+    async def retrieve_async(self, query: str, enhanced_query: Optional[str] = None) -> Dict:
+        """
+        Retrieve the documents relevant to a query on the CPU executor, without blocking the event loop
+
+        Args:
+            query: The user's query text
+            enhanced_query: Optional slot-enhanced query used for retrieval instead of the raw query
+
+        Returns:
+            Dictionary with success flag and retrieved documents
+        """
+        return await run_in_executor(self.retrieve, query=query, enhanced_query=enhanced_query)
+
+    def generate_answer(self, query: str, documents: List[Document]) -> Dict:
+        """
+        Generate an answer for a query from already retrieved documents
+
+        Args:
+            query: The user's query text
+            documents: Documents returned by `retrieve`
+
+        Returns:
+            Dictionary with success flag and generated answer
+        """
+        try:
+            result = self.generation_pipeline.run({
+                "prompt_builder": {"question": query, "documents": documents}
+            })
 
             return {
                 "success": True,
-                "documents": result["retriever"]["documents"],
                 "answer": result["generator"]["replies"][0]
             }
         except Exception as e:
-            logger.error(f"Error getting answer for query '{query}': {str(e)}")
+            logger.error(f"Error generating answer for query '{query}': {str(e)}")
             return {
                 "success": False,
                 "error": str(e),
+                "answer": "An error occurred while generating the answer. Please try again."
+            }
+
+    async def generate_answer_async(self, query: str, documents: List[Document]) -> Dict:
+        """
+        Asynchronously generate an answer for a query from already retrieved documents
+
+        Args:
+            query: The user's query text
+            documents: Documents returned by `retrieve`
+
+        Returns:
+            Dictionary with success flag and generated answer
+        """
+        try:
+            result = await self.generation_pipeline.run_async({
+                "prompt_builder": {"question": query, "documents": documents}
+            })
+
+            return {
+                "success": True,
+                "answer": result["generator"]["replies"][0]
+            }
+        except Exception as e:
+            logger.error(f"Error generating answer for query '{query}': {str(e)}")
+            return {
+                "success": False,
+                "error": str(e),
+                "answer": "An error occurred while generating the answer. Please try again."
+            }
+
+    def get_answer(self, query: str, enhanced_query: Optional[str] = None) -> Dict:
+        """Get answer for a query by running retrieval followed by generation"""
+        retrieval_result = self.retrieve(query=query, enhanced_query=enhanced_query)
+        if not retrieval_result["success"]:
+            return {
+                "success": False,
+                "error": retrieval_result["error"],
                 "documents": [],
                 "answer": "An error occurred while generating the answer. Please try again."
             }
 
-    def get_document_info(self) -> Dict:
-        """Get information about indexed documents"""
+        answer_result = self.generate_answer(query=query, documents=retrieval_result["documents"])
+        result = {
+            "success": answer_result["success"],
+            "documents": retrieval_result["documents"],
+            "answer": answer_result["answer"]
+        }
+        if not answer_result["success"]:
+            result["error"] = answer_result["error"]
+        return result
+
+    def get_document_info(self, offset: int = 0, limit: Optional[int] = None) -> Dict:
+        """
+        Get information about indexed documents from the document catalog
+
+        Args:
+            offset: Number of files to skip, in file name order
+            limit: Maximum number of files to list; None lists the rest
+
+        Returns:
+            Dictionary with the chunk and file counts and the page of files
+        """
         try:
-            docs = self.document_store.filter_documents()
+            files = self.catalog.page(offset, limit)
             return {
                 "document_count": self.document_store.count_documents(),
-                "document_names": list(set(doc.meta.get("file_path", "unknown") for doc in docs))
+                "file_count": len(self.catalog),
+                "document_names": [entry["file_path"] for entry in files],
+                "files": files,
+                "offset": offset,
+                "limit": limit
             }
         except Exception as e:
             logger.error(f"Error getting document info: {str(e)}")
@@ -178,6 +621,3 @@ class RAGService:
                 "error": str(e)
             }
 
-
-# Singleton instance
-rag_service = RAGService()
\ No newline at end of file
@@ -1,8 +1,10 @@
 import json
-from typing import Dict, List, Any, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from haystack import component
 from haystack.components.generators.chat import OpenAIChatGenerator
-from haystack.dataclasses import Document, ChatMessage
+from haystack.dataclasses import ChatMessage, Document, StreamingCallbackT
+from haystack.utils import Secret
+from service.context_packer import ContextPacker, estimate_tokens
 from utils.config import settings
 from utils.logging import logger
 
@@ -22,7 +24,7 @@ class ResponseGeneratorService:
 
         # Initialize OpenAI generator
         self.generator = OpenAIChatGenerator(
-            api_key=settings.OPENROUTER_API_KEY,
+            api_key=Secret.from_token(settings.OPENROUTER_API_KEY),
             api_base_url=settings.OPENROUTER_BASE_URL,
             model=settings.RAG_MODEL,
             generation_kwargs={
@@ -31,9 +33,18 @@ class ResponseGeneratorService:
             }
         )
 
-        self.response_generator = IntentBasedResponseGenerator(self.responses, self.generator)
+        # Packs retrieved chunks into a de-duplicated context within a per-intent token budget
+        self.context_packer = ContextPacker(
+            settings.CONTEXT_TOKEN_BUDGET, settings.CONTEXT_TOKEN_BUDGETS
+        ) if settings.CONTEXT_PACKING_ENABLED else None
+
+        self.response_generator = IntentBasedResponseGenerator(self.responses, self.generator, self.context_packer)
         logger.info("Response generator service initialized successfully")
 
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the context packing counters"""
+        return {"context_packing": self.context_packer.get_stats()} if self.context_packer is not None else {}
+
     def _load_responses(self) -> Dict:
         """Load the response templates from schema file"""
         try:
@@ -58,7 +69,8 @@ class ResponseGeneratorService:
             slots: Dict[str, str],
             is_out_of_scope: bool,
             missing_required_slots: List[str],
-            confidence: float
+            confidence: float,
+            streaming_callback: Optional[StreamingCallbackT] = None
     ) -> Dict[str, Any]:
         """
         Generate a response based on intent classification and retrieved documents
@@ -71,6 +83,7 @@ class ResponseGeneratorService:
             is_out_of_scope: Whether the query is out of scope
             missing_required_slots: List of required slots that are missing
             confidence: Intent classification confidence
+            streaming_callback: Called with every chunk of the answer as the LLM generates it
 
         Returns:
             Dictionary with response text and status
@@ -83,7 +96,56 @@ class ResponseGeneratorService:
                 slots=slots,
                 is_out_of_scope=is_out_of_scope,
                 missing_required_slots=missing_required_slots,
-                confidence=confidence
+                confidence=confidence,
+                streaming_callback=streaming_callback
+            )
+
+            logger.info(f"Generated response for intent '{intent}' (is_fallback: {result.get('is_fallback', False)})")
+            return result
+        except Exception as e:
+            logger.error(f"Error generating response: {str(e)}")
+            return {
+                "response": "I encountered an error while generating a response. Please try your question again.",
+                "is_fallback": True
+            }
+
+    async def generate_response_async(
+            self,
+            query: str,
+            documents: List[Document],
+            intent: str,
+            slots: Dict[str, str],
+            is_out_of_scope: bool,
+            missing_required_slots: List[str],
+            confidence: float,
+            streaming_callback: Optional[StreamingCallbackT] = None
+    ) -> Dict[str, Any]:
+        """
+        Asynchronously generate a response based on intent classification and retrieved documents
+
+        Args:
+            query: User's query text
+            documents: Retrieved relevant documents
+            intent: Classified intent
+            slots: Extracted slot values
+            is_out_of_scope: Whether the query is out of scope
+            missing_required_slots: List of required slots that are missing
+            confidence: Intent classification confidence
+            streaming_callback: Called with every chunk of the answer as the LLM generates it
+
+        Returns:
+            Dictionary with response text and status
+        """
+        try:
+            result = await self.response_generator.run_async(
+                query=query,
+                documents=documents,
+                intent=intent,
+                slots=slots,
+                is_out_of_scope=is_out_of_scope,
+                missing_required_slots=missing_required_slots,
+                confidence=confidence,
+                streaming_callback=streaming_callback
             )
 
             logger.info(f"Generated response for intent '{intent}' (is_fallback: {result.get('is_fallback', False)})")
@@ -100,18 +162,20 @@ class ResponseGeneratorService:
 class IntentBasedResponseGenerator:
     """Component to generate responses based on detected intent and retrieved documents"""
 
-    def __init__(self, responses: Dict[str, str], generator_component: Any):
+    def __init__(self, responses: Dict[str, str], generator_component: Any, packer: Optional[ContextPacker] = None):
         """
         Initialize with responses and generator component
 
         Args:
             responses: Dictionary of response templates
             generator_component: The LLM generator component
+            packer: Packs the retrieved documents into the prompt; None puts every document in as is
         """
         self.generator = generator_component
         self.responses = responses
+        self.packer = packer
 
-    @component.output_types(response=str, is_fallback=bool)
+    @component.output_types(response=str, is_fallback=bool, prompt_tokens=Dict[str, int])
     def run(
             self,
             query: str,
@@ -120,7 +184,8 @@ class IntentBasedResponseGenerator:
             slots: Dict[str, str],
             is_out_of_scope: bool,
             missing_required_slots: List[str],
-            confidence: float
+            confidence: float,
+            streaming_callback: Optional[StreamingCallbackT] = None
     ) -> Dict[str, Any]:
         """
         Generate a response based on intent, slots, and documents
@@ -133,10 +198,88 @@ class IntentBasedResponseGenerator:
             is_out_of_scope: Whether the query is out of scope
             missing_required_slots: List of required slots that are missing
             confidence: Intent classification confidence
+            streaming_callback: Called with every chunk of the answer as the LLM generates it
+
+        Returns:
+            Dictionary with response text, fallback flag and, when the LLM was called, the prompt tokens
+            before and after context packing
+        """
+        fallback = self._fallback_response(documents, intent, slots, is_out_of_scope, missing_required_slots)
+        if fallback is not None:
+            return fallback
+
+        try:
+            messages, prompt_tokens = self._build_messages(query, documents, intent, slots)
+            result = self.generator.run(messages=messages, streaming_callback=streaming_callback)
+            return {
+                "response": self._extract_response_text(result["replies"][0]),
+                "is_fallback": False,
+                "prompt_tokens": prompt_tokens
+            }
+
+        except Exception as e:
+            return {
+                "response": "An error occurred while generating the response. Please try again.",
+                "is_fallback": True
+            }
+
+    @component.output_types(response=str, is_fallback=bool, prompt_tokens=Dict[str, int])
+    async def run_async(
+            self,
+            query: str,
+            documents: List[Document],
+            intent: str,
+            slots: Dict[str, str],
+            is_out_of_scope: bool,
+            missing_required_slots: List[str],
+            confidence: float,
+            streaming_callback: Optional[StreamingCallbackT] = None
+    ) -> Dict[str, Any]:
+        """
+        Asynchronously generate a response, without blocking the event loop on the LLM call
+
+        Args:
+            query: User's query text
+            documents: Retrieved relevant documents
+            intent: Classified intent
+            slots: Extracted slot values
+            is_out_of_scope: Whether the query is out of scope
+            missing_required_slots: List of required slots that are missing
+            confidence: Intent classification confidence
+            streaming_callback: Called with every chunk of the answer as the LLM generates it
 
         Returns:
-            Dictionary with response text and fallback flag
+            Dictionary with response text, fallback flag and, when the LLM was called, the prompt tokens
+            before and after context packing
         """
+        fallback = self._fallback_response(documents, intent, slots, is_out_of_scope, missing_required_slots)
+        if fallback is not None:
+            return fallback
+
+        try:
+            messages, prompt_tokens = self._build_messages(query, documents, intent, slots)
+            result = await self.generator.run_async(messages=messages, streaming_callback=streaming_callback)
+            return {
+                "response": self._extract_response_text(result["replies"][0]),
+                "is_fallback": False,
+                "prompt_tokens": prompt_tokens
+            }
+
+        except Exception as e:
+            return {
+                "response": "An error occurred while generating the response. Please try again.",
+                "is_fallback": True
+            }
+
+    def _fallback_response(
+            self,
+            documents: List[Document],
+            intent: str,
+            slots: Dict[str, str],
+            is_out_of_scope: bool,
+            missing_required_slots: List[str]
+    ) -> Optional[Dict[str, Any]]:
+        """Return a canned response when the LLM should not be called, None otherwise"""
         # Handle out-of-scope queries
         if is_out_of_scope:
             return {
@@ -179,41 +322,55 @@ class IntentBasedResponseGenerator:
                     "is_fallback": True
                 }
 
+        return None
+
+    def _build_messages(
+            self,
+            query: str,
+            documents: List[Document],
+            intent: str,
+            slots: Dict[str, str]
+    ) -> Tuple[List[ChatMessage], Dict[str, int]]:
+        """
+        Build the chat messages for the generator from an intent-specific prompt
+
+        Returns:
+            The messages, and the prompt tokens with the retrieved documents as they are (`before`) and
+            packed (`after`)
+        """
         # Build intent-specific prompt
         prompt = self._build_intent_prompt(query, documents, intent, slots)
+        tokens_before = estimate_tokens(prompt) + estimate_tokens(query)
+        tokens_after = tokens_before
+        if self.packer is not None:
+            packed = self.packer.pack(documents, intent)
+            prompt = self._build_intent_prompt(query, packed.passages, intent, slots)
+            tokens_after = estimate_tokens(prompt) + estimate_tokens(query)
+            logger.debug(f"Packed {packed.chunks} chunks into {len(packed.passages)} passages, prompt tokens "
+                         f"{tokens_before} -> {tokens_after}")
 
-        # Generate response
         messages = [
             ChatMessage.from_system(prompt),
             ChatMessage.from_user(query)
         ]
-
-        try:
-            result = self.generator.run(messages=messages)
-            response_message = result["replies"][0]
-
-            # Handle different possible response formats
-            if isinstance(response_message, str):
-                response_text = response_message
-            elif hasattr(response_message, 'content') and isinstance(response_message.content, str):
-                response_text = response_message.content
-            elif hasattr(response_message, 'content') and isinstance(response_message.content, list):
-                # Handle content as list of TextContent objects
-                response_text = ' '.join([item.text for item in response_message.content if hasattr(item, 'text')])
-            elif hasattr(response_message, '_content') and isinstance(response_message._content, list):
-                # Handle _content as list of TextContent objects
-                response_text = ' '.join([item.text for item in response_message._content if hasattr(item, 'text')])
-            else:
-                # Fallback to string representation
-                response_text = str(response_message)
-
-            return {"response": response_text, "is_fallback": False}
-
-        except Exception as e:
-            return {
-                "response": "An error occurred while generating the response. Please try again.",
-                "is_fallback": True
-            }
+        return messages, {"before": tokens_before, "after": tokens_after}
+
+    @staticmethod
+    def _extract_response_text(response_message: Any) -> str:
+        """Extract the reply text from the different possible response formats"""
+        if isinstance(response_message, str):
+            return response_message
+        elif hasattr(response_message, 'content') and isinstance(response_message.content, str):
+            return response_message.content
+        elif hasattr(response_message, 'content') and isinstance(response_message.content, list):
+            # Handle content as list of TextContent objects
+            return ' '.join([item.text for item in response_message.content if hasattr(item, 'text')])
+        elif hasattr(response_message, '_content') and isinstance(response_message._content, list):
+            # Handle _content as list of TextContent objects
+            return ' '.join([item.text for item in response_message._content if hasattr(item, 'text')])
+        else:
+            # Fallback to string representation
+            return str(response_message)
 
     def _build_intent_prompt(
             self,
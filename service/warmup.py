@@ -0,0 +1,44 @@
+import time
+from typing import Any, Dict, Optional
+
+from service.providers import get_intent_service, get_query_service, get_rag_service
+from utils.concurrency import run_in_executor
+from utils.logging import logger
+
+
+class WarmupService:
+    """Build the services and warm up the models at startup, and report readiness"""
+
+    def __init__(self):
+        self.ready = False
+        self.error: Optional[str] = None
+        self.duration: Optional[float] = None
+
+    def _warm_up(self):
+        # Services are built lazily; build them here rather than on the first request
+        get_query_service()
+        # Embedding model load plus a dummy inference through both embedders
+        get_rag_service().warm_up()
+        # Schema examples of the local intent classifier, otherwise embedded on the first query
+        intent_service = get_intent_service()
+        if intent_service.local_classifier is not None:
+            intent_service.local_classifier.warm_up()
+
+    async def run(self):
+        """Warm up on the CPU executor; the service is ready once this returns without error"""
+        started = time.perf_counter()
+        try:
+            await run_in_executor(self._warm_up)
+            self.duration = time.perf_counter() - started
+            self.ready = True
+            logger.info(f"Warm-up finished in {self.duration:.2f}s, service is ready")
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Warm-up failed: {str(e)}")
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "warmup_seconds": round(self.duration, 3) if self.duration is not None else None,
+            "error": self.error
+        }
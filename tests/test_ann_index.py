@@ -0,0 +1,67 @@
+import numpy as np
+
+from service.ann_index import IVFIndex
+
+DIM = 32
+
+
+def clustered_vectors(size: int, rng: np.random.Generator) -> np.ndarray:
+    centers = rng.standard_normal((64, DIM))
+    vectors = centers[rng.integers(0, 64, size)] + 0.5 * rng.standard_normal((size, DIM))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def recall_at_10(index: IVFIndex, ids, vectors: np.ndarray, queries: np.ndarray) -> float:
+    hits = 0
+    for query in queries:
+        scores = vectors @ query
+        truth = {ids[i] for i in np.argsort(-scores)[:10]}
+        hits += len(truth & {doc_id for doc_id, _ in index.search(query, 10)})
+    return hits / (10 * len(queries))
+
+
+def test_search_is_exact_before_training():
+    rng = np.random.default_rng(0)
+    vectors = clustered_vectors(100, rng)
+    ids = [str(i) for i in range(100)]
+    index = IVFIndex(min_train_size=1000)
+    index.add(ids, vectors)
+
+    assert recall_at_10(index, ids, vectors, vectors[:10]) == 1.0
+    assert index.search(vectors[3], 1)[0][0] == "3"
+
+
+def test_removed_ids_are_not_returned():
+    rng = np.random.default_rng(1)
+    vectors = clustered_vectors(50, rng)
+    index = IVFIndex()
+    index.add([str(i) for i in range(50)], vectors)
+    index.remove(["7", "unknown"])
+
+    assert len(index) == 49
+    assert "7" not in {doc_id for doc_id, _ in index.search(vectors[7], 10)}
+
+
+def test_readding_same_ids_keeps_size_bounded_and_recall_stable():
+    rng = np.random.default_rng(2)
+    size = 3000
+    vectors = clustered_vectors(size, rng)
+    ids = [str(i) for i in range(size)]
+    queries = vectors[rng.integers(0, size, 50)] + 0.1 * rng.standard_normal((50, DIM)).astype(np.float32)
+    index = IVFIndex(nprobe=8, min_train_size=2048)
+    index.add(ids, vectors)
+    assert index._centroids is not None
+    initial_recall = recall_at_10(index, ids, vectors, queries)
+
+    for round_number in range(20):
+        # Re-index a different third of the corpus each round, as re-uploads of unchanged files would
+        batch = np.arange(round_number % 3, size, 3)
+        index.add([ids[i] for i in batch], vectors[batch])
+
+        assert len(index) == size
+        assert index._size <= 2 * size
+        assert len(index._vectors) <= 4 * size
+        assert sum(len(members) for members in index._lists) == index._size
+
+    assert recall_at_10(index, ids, vectors, queries) >= initial_recall - 0.02
+    assert {doc_id for doc_id, _ in index.search(vectors[11], 1)} == {"11"}
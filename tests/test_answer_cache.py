@@ -0,0 +1,69 @@
+from typing import Tuple
+
+from service import answer_cache
+from service.answer_cache import SemanticAnswerCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+def make_cache(monkeypatch, ttl_seconds: float = 60.0, max_entries: int = 100) -> Tuple[SemanticAnswerCache, Clock]:
+    clock = Clock()
+    monkeypatch.setattr(answer_cache.time, "monotonic", clock.monotonic)
+    return SemanticAnswerCache(0.9, max_entries, 10_000_000, ttl_seconds), clock
+
+
+def test_similar_query_hits_and_other_intent_misses(monkeypatch):
+    cache, _ = make_cache(monkeypatch)
+    cache.put([1.0, 0.0], "document_query", 0, {"response": "a"})
+
+    assert cache.lookup([0.99, 0.05], "document_query", 0) == {"response": "a"}
+    assert cache.lookup([0.99, 0.05], "greeting", 0) is None
+    assert cache.lookup([0.99, 0.05], "document_query", 1) is None
+    assert cache.lookup([0.0, 1.0], "document_query", 0) is None
+
+
+def test_expired_match_is_not_served(monkeypatch):
+    cache, clock = make_cache(monkeypatch, ttl_seconds=60)
+    cache.put([1.0, 0.0], None, 0, {"response": "old"})
+    clock.now += 20
+    cache.put([0.0, 1.0], None, 0, {"response": "new"})
+    clock.now += 45
+
+    assert cache.lookup([1.0, 0.0], None, 0) is None
+    assert cache.lookup([0.0, 1.0], None, 0) == {"response": "new"}
+    assert cache.get_stats()["expirations"] == 1
+
+
+def test_sweep_frees_expired_entries_every_half_ttl(monkeypatch):
+    cache, clock = make_cache(monkeypatch, ttl_seconds=60)
+    for i in range(10):
+        cache.put([1.0, float(i)], None, 0, {"response": str(i)})
+    clock.now += 35
+    cache.lookup([0.0, -1.0], None, 0)  # sweeps, nothing expired yet; the next sweep is due at +65
+    assert cache.get_stats()["entries"] == 10
+
+    clock.now += 29
+    cache.lookup([0.0, -1.0], None, 0)
+    assert cache.get_stats()["entries"] == 10  # expired, but the sweep is not due yet
+    clock.now += 2
+    cache.lookup([0.0, -1.0], None, 0)
+    assert cache.get_stats()["entries"] == 0
+    assert cache.get_stats()["expirations"] == 10
+
+
+def test_least_recently_used_entry_is_evicted(monkeypatch):
+    cache, _ = make_cache(monkeypatch, max_entries=2)
+    cache.put([1.0, 0.0], None, 0, {"response": "a"})
+    cache.put([0.0, 1.0], None, 0, {"response": "b"})
+    cache.lookup([1.0, 0.0], None, 0)
+    cache.put([-1.0, 0.0], None, 0, {"response": "c"})
+
+    assert cache.lookup([1.0, 0.0], None, 0) == {"response": "a"}
+    assert cache.lookup([0.0, 1.0], None, 0) is None
+    assert cache.get_stats()["evictions"] == 1
@@ -0,0 +1,109 @@
+import json
+
+import pytest
+
+from scripts.replay import load_events, schedule
+from utils.capture import TrafficCapture, sanitize_query
+from utils.qa_log import LEGACY_SEPARATOR, QALogWriter
+
+
+def write_jsonl(path, records):
+    path.write_text("".join(json.dumps(record) + "\n" for record in records), encoding="utf-8")
+
+
+@pytest.mark.parametrize("text, sanitized", [
+    ("Mail jane.doe+news@example.co.uk today", "Mail <email> today"),
+    ("See https://example.com/a?b=c for details", "See <url> for details"),
+    ("Call +1 555-123-4567 now", "Call <number> now"),
+    ("Card 4111 1111 1111 1111 expired", "Card <number> expired"),
+    ("Top 10 yields of 2023, order 12345678", "Top 10 yields of 2023, order 12345678"),
+])
+def test_sanitize_redacts_personal_data_and_keeps_short_numbers(text, sanitized):
+    assert sanitize_query(text, 2000) == sanitized
+
+
+def test_sanitize_truncates_after_redacting():
+    assert sanitize_query("a" * 50, 10) == "a" * 10
+    # A cut through the address must not leave part of it behind
+    assert sanitize_query("Contact jane@example.com please", 12) == "Contact <ema"
+
+
+def test_capture_writes_sanitized_queries(tmp_path):
+    capture = TrafficCapture(QALogWriter(tmp_path / "capture.jsonl"), max_query_chars=20)
+
+    capture.record("/api/query/batch", ["mail me at a@b.com", "x" * 30])
+    capture.close()
+
+    [record] = [json.loads(line) for line in (tmp_path / "capture.jsonl").read_text().splitlines()]
+    assert record["endpoint"] == "/api/query/batch"
+    assert record["queries"] == ["mail me at <email>", "x" * 20]
+    assert isinstance(record["ts"], float)
+
+
+def test_capture_events_are_loaded_in_timestamp_order(tmp_path):
+    path = tmp_path / "capture.jsonl"
+    write_jsonl(path, [
+        {"ts": 20.0, "endpoint": "/api/query/batch", "queries": ["b1", "b2"]},
+        {"ts": 10.0, "endpoint": "/api/query/stream", "queries": ["a"]},
+        {"ts": 30.0, "queries": ["c"]},
+    ])
+
+    events = load_events(path)
+
+    assert events == [
+        {"ts": 10.0, "endpoint": "/api/query/stream", "queries": ["a"]},
+        {"ts": 20.0, "endpoint": "/api/query/batch", "queries": ["b1", "b2"]},
+        {"ts": 30.0, "endpoint": "/api/query", "queries": ["c"]},
+    ]
+
+
+def test_qa_log_records_are_replayed_singly_in_timestamp_order(tmp_path):
+    path = tmp_path / "qa_log.jsonl"
+    write_jsonl(path, [
+        {"timestamp": 5.0, "query": "later", "response": "..."},
+        {"timestamp": 1.0, "query": "earlier", "response": "..."},
+    ])
+    # Blank lines are skipped
+    path.write_text(path.read_text() + "\n", encoding="utf-8")
+
+    events = load_events(path)
+
+    assert [(event["ts"], event["queries"]) for event in events] == [(1.0, ["earlier"]), (5.0, ["later"])]
+    assert {event["endpoint"] for event in events} == {"/api/query"}
+
+
+def test_records_without_timestamps_keep_file_order(tmp_path):
+    path = tmp_path / "qa_log.jsonl"
+    write_jsonl(path, [
+        {"timestamp": 5.0, "query": "logged"},
+        {"timestamp": None, "query": "migrated", "legacy": True},
+    ])
+
+    assert [event["queries"] for event in load_events(path)] == [["logged"], ["migrated"]]
+
+
+def test_legacy_text_log_is_loaded_in_file_order(tmp_path):
+    path = tmp_path / "qa_log.txt"
+    path.write_text(
+        f"Question: first\nAnswer: one\n{LEGACY_SEPARATOR}\n"
+        f"Question: second\nAnswer: two\nand more\n{LEGACY_SEPARATOR}\n",
+        encoding="utf-8",
+    )
+
+    events = load_events(path)
+
+    assert events == [
+        {"ts": None, "endpoint": "/api/query", "queries": ["first"]},
+        {"ts": None, "endpoint": "/api/query", "queries": ["second"]},
+    ]
+
+
+def test_schedule_scales_captured_gaps_or_paces_at_the_rate():
+    timed = [{"ts": 100.0}, {"ts": 101.0}, {"ts": 104.0}]
+    untimed = [{"ts": None}] * 3
+
+    assert schedule(timed, speed=1.0, rate=1.0) == [0.0, 1.0, 4.0]
+    assert schedule(timed, speed=2.0, rate=1.0) == [0.0, 0.5, 2.0]
+    assert schedule(untimed, speed=1.0, rate=4.0) == [0.0, 0.25, 0.5]
+    assert schedule(untimed, speed=2.0, rate=4.0) == [0.0, 0.125, 0.25]
+    assert schedule(timed, speed=0, rate=1.0) == [None, None, None]
@@ -0,0 +1,124 @@
+from typing import Dict, List
+
+from haystack.components.preprocessors import DocumentSplitter
+from haystack.dataclasses import Document
+
+from service.context_packer import ContextPacker, estimate_tokens
+from service.ingestion import StreamingIndexer
+
+SENTENCES = [f"Sentence number {i} talks about banana farming topic {i}." for i in range(40)]
+
+
+def chunk(content: str, start: int, file_path: str = "a.txt", segment: int = 0, score: float = 0.5) -> Document:
+    return Document(content=content, score=score,
+                    meta={"file_path": file_path, "segment": segment, "split_idx_start": start})
+
+
+def words(text: str) -> List[str]:
+    return text.split()
+
+
+def test_overlapping_chunks_are_merged_once():
+    text = "One fish. Two fish. Red fish. Blue fish."
+    first, second = chunk(text[:19], 0), chunk(text[10:], 10)
+
+    packed = ContextPacker(default_budget=1000).pack([second, first])
+
+    assert len(packed.passages) == 1
+    assert packed.passages[0].content == text
+    assert packed.passages[0].meta["packed_chunks"] == 2
+
+
+def test_adjacent_chunks_are_merged():
+    text = "One fish. Two fish. Red fish."
+    packed = ContextPacker(default_budget=1000).pack([chunk(text[:10], 0), chunk(text[10:], 10)])
+
+    assert [passage.content for passage in packed.passages] == [text]
+
+
+def test_chunks_of_other_files_and_segments_are_not_merged():
+    documents = [chunk("Alpha one.", 0), chunk("Beta two.", 0, file_path="b.txt"), chunk("Gamma three.", 0, segment=1)]
+
+    packed = ContextPacker(default_budget=1000).pack(documents)
+
+    assert [passage.content for passage in packed.passages] == ["Alpha one.", "Beta two.", "Gamma three."]
+
+
+def test_overlap_with_different_text_is_not_spliced():
+    # Offsets overlap but the text does not agree, e.g. chunks from two versions of a file
+    documents = [chunk("Old start here. Shared end.", 0), chunk("New words entirely. More.", 16)]
+
+    packed = ContextPacker(default_budget=1000).pack(documents)
+
+    assert [passage.content for passage in packed.passages] == ["Old start here. Shared end.",
+                                                                "New words entirely. More."]
+
+
+def test_chunk_contained_in_span_is_merged():
+    text = "One fish. Two fish. Red fish. Blue fish."
+    packed = ContextPacker(default_budget=1000).pack([chunk(text, 0), chunk(text[10:19], 10)])
+
+    assert [passage.content for passage in packed.passages] == [text]
+
+
+def test_repeated_sentences_are_dropped():
+    documents = [Document(content="Same boilerplate. First fact.", meta={"file_path": "a.txt"}),
+                 Document(content="Same boilerplate. Second fact.", meta={"file_path": "b.txt"})]
+
+    packed = ContextPacker(default_budget=1000).pack(documents)
+
+    assert [passage.content for passage in packed.passages] == ["Same boilerplate. First fact.", "Second fact."]
+    assert packed.sentences_removed == 1
+
+
+def test_budget_truncates_in_retrieval_order():
+    documents = [Document(content=" ".join(SENTENCES[:3]), meta={"file_path": "a.txt"}),
+                 Document(content=" ".join(SENTENCES[3:6]), meta={"file_path": "b.txt"})]
+    budget = estimate_tokens(" ".join(SENTENCES[:4]))
+
+    packed = ContextPacker(default_budget=budget).pack(documents)
+
+    assert packed.truncated
+    assert packed.tokens_after <= budget
+    assert [passage.content for passage in packed.passages] == [" ".join(SENTENCES[:3]), SENTENCES[3]]
+
+
+def test_budget_per_intent_and_first_sentence_always_kept():
+    packer = ContextPacker(default_budget=1000, budgets={"greeting": 1})
+
+    packed = packer.pack([Document(content=" ".join(SENTENCES[:3]), meta={"file_path": "a.txt"})], intent="greeting")
+
+    assert [passage.content for passage in packed.passages] == [SENTENCES[0]]
+    assert packed.truncated
+
+
+def test_reupload_with_text_inserted_near_start():
+    splitter = DocumentSplitter(split_by="period", split_length=3, split_overlap=1)
+    splitter.warm_up()
+    store: Dict[str, Document] = {}
+
+    def upload(text: str):
+        indexer = StreamingIndexer(lambda document: splitter.run([document])["documents"],
+                                   lambda chunks: store.update({chunk.id: chunk for chunk in chunks}),
+                                   source="a.txt", segment_chars=1_000_000, existing_ids=list(store),
+                                   delete=lambda ids: [store.pop(chunk_id) for chunk_id in ids])
+        indexer.feed(text.encode("utf-8"))
+        return indexer.finish()
+
+    original = " ".join(SENTENCES)
+    upload(original)
+    # Two sentences, one splitter step, so the chunks after them come back unchanged at new offsets
+    inserted = "An inserted sentence shifts the offsets. So does a second one."
+    updated = " ".join([SENTENCES[0], inserted] + SENTENCES[1:])
+    progress = upload(updated)
+    assert progress["chunks_skipped"] > 0
+
+    # Retrieve every stored chunk: new ones near the start, kept ones further on
+    documents = sorted(store.values(), key=lambda document: document.meta["split_idx_start"])
+    packed = ContextPacker(default_budget=100_000).pack(documents)
+
+    joined = " ".join(words(updated))
+    for passage in packed.passages:
+        assert " ".join(words(passage.content)) in joined
+    packed_words = [word for passage in packed.passages for word in words(passage.content)]
+    assert sorted(packed_words) == sorted(words(updated))
@@ -0,0 +1,87 @@
+import json
+import random
+
+from service.document_catalog import DocumentCatalog, count_chunks_by_file
+
+
+def apply_random_changes(catalog: DocumentCatalog, operations: int, seed: int = 0):
+    rng = random.Random(seed)
+    for i in range(operations):
+        name = f"file{rng.randrange(40):02d}.txt"
+        if rng.random() < 0.25:
+            catalog.remove(name)
+        else:
+            catalog.upsert(name, chunks=rng.randrange(1, 50), size_bytes=rng.randrange(10_000),
+                           sha256=f"{i:064x}", indexed_at=float(i))
+
+
+def test_replayed_journal_equals_the_live_catalog(tmp_path):
+    path = tmp_path / "catalog.jsonl"
+    catalog = DocumentCatalog(path)
+    apply_random_changes(catalog, 500)
+
+    replayed = DocumentCatalog(path)
+
+    assert replayed.page() == catalog.page()
+    assert replayed.total_chunks == catalog.total_chunks
+    # The journal was compacted along the way rather than growing with every change
+    assert len(path.read_text().splitlines()) <= 2 * max(len(catalog), 16) + 1
+
+
+def test_replay_equals_rebuild_from_the_store(tmp_path):
+    path = tmp_path / "catalog.jsonl"
+    catalog = DocumentCatalog(path)
+    apply_random_changes(catalog, 300, seed=1)
+    stored_chunks = {entry["file_path"]: entry["chunks"] for entry in catalog.page()}
+
+    rebuilt = DocumentCatalog()
+    rebuilt.rebuild(stored_chunks)
+    replayed = DocumentCatalog(path)
+
+    assert [(e["file_path"], e["chunks"]) for e in replayed.page()] == \
+           [(e["file_path"], e["chunks"]) for e in rebuilt.page()]
+    assert replayed.total_chunks == rebuilt.total_chunks == sum(stored_chunks.values())
+
+
+def test_rebuild_keeps_known_hashes_and_adds_unknown_files(tmp_path):
+    catalog = DocumentCatalog(tmp_path / "catalog.jsonl")
+    catalog.upsert("a.txt", chunks=3, size_bytes=100, sha256="aa", indexed_at=1.0)
+    catalog.upsert("gone.txt", chunks=2, size_bytes=50, sha256="bb", indexed_at=2.0)
+
+    catalog.rebuild({"a.txt": 4, "new.txt": 1})
+
+    assert catalog.page() == [
+        {"file_path": "a.txt", "chunks": 4, "bytes": 100, "sha256": "aa", "indexed_at": 1.0},
+        {"file_path": "new.txt", "chunks": 1, "bytes": None, "sha256": None, "indexed_at": None},
+    ]
+    assert DocumentCatalog(tmp_path / "catalog.jsonl").page() == catalog.page()
+
+
+def test_torn_last_record_is_skipped(tmp_path):
+    path = tmp_path / "catalog.jsonl"
+    catalog = DocumentCatalog(path)
+    catalog.upsert("a.txt", chunks=3, size_bytes=100, sha256="aa", indexed_at=1.0)
+    with open(path, "a") as f:
+        f.write(json.dumps({"op": "upsert", "file_path": "b.txt", "chunks": 1})[:20])
+
+    assert DocumentCatalog(path).page() == catalog.page()
+
+
+def test_pages_are_in_name_order():
+    catalog = DocumentCatalog()
+    for name in ("c.txt", "a.txt", "b.txt", "d.txt"):
+        catalog.upsert(name, chunks=1, size_bytes=None, sha256=None)
+    catalog.remove("b.txt")
+
+    assert [entry["file_path"] for entry in catalog.page(offset=1, limit=2)] == ["c.txt", "d.txt"]
+    assert len(catalog) == 3
+
+
+def test_count_chunks_by_file():
+    class Chunk:
+        def __init__(self, meta):
+            self.meta = meta
+
+    chunks = [Chunk({"file_path": "a.txt"}), Chunk({"file_path": "a.txt"}), Chunk({})]
+
+    assert count_chunks_by_file(chunks) == {"a.txt": 2, "unknown": 1}
@@ -0,0 +1,73 @@
+from typing import Dict
+
+from haystack.components.preprocessors import DocumentSplitter
+from haystack.dataclasses import Document
+
+from service.ingestion import StreamingIndexer
+
+TEXT = " ".join(f"Sentence {i} is about growing bananas." for i in range(30))
+
+
+class ChunkStore:
+    """Dict of chunks by id standing in for the document store"""
+
+    def __init__(self):
+        self.chunks: Dict[str, Document] = {}
+        self.embedded = 0
+        self.splitter = DocumentSplitter(split_by="period", split_length=3, split_overlap=1)
+        self.splitter.warm_up()
+
+    def write(self, chunks):
+        self.embedded += len(chunks)
+        self.chunks.update({chunk.id: chunk for chunk in chunks})
+
+    def update_meta(self, chunks):
+        for chunk in chunks:
+            self.chunks[chunk.id] = Document(id=chunk.id, content=self.chunks[chunk.id].content, meta=chunk.meta)
+
+    def delete(self, ids):
+        for chunk_id in ids:
+            del self.chunks[chunk_id]
+
+    def upload(self, text: str, segment_chars: int = 1_000_000):
+        existing_meta = {chunk_id: chunk.meta for chunk_id, chunk in self.chunks.items()}
+        indexer = StreamingIndexer(lambda document: self.splitter.run([document])["documents"], self.write,
+                                   source="a.txt", segment_chars=segment_chars, existing_ids=existing_meta,
+                                   delete=self.delete, existing_meta=existing_meta, update_meta=self.update_meta)
+        indexer.feed(text.encode("utf-8"))
+        return indexer.finish()
+
+
+def test_reupload_of_same_text_embeds_nothing():
+    store = ChunkStore()
+    first = store.upload(TEXT)
+    second = store.upload(TEXT)
+
+    assert second["chunks_skipped"] == first["chunks_indexed"]
+    assert second["chunks_moved"] == 0
+    assert store.embedded == first["chunks_indexed"]
+
+
+def test_unchanged_chunks_that_moved_get_new_offsets_without_embedding():
+    store = ChunkStore()
+    store.upload(TEXT)
+    embedded = store.embedded
+    # Two sentences, one splitter step, so the later chunks are unchanged but shifted
+    updated = "A new first sentence. And a second one. " + TEXT
+    progress = store.upload(updated)
+
+    assert progress["chunks_moved"] > 0
+    assert store.embedded - embedded == progress["chunks_indexed"] - progress["chunks_skipped"]
+    for chunk in store.chunks.values():
+        start = chunk.meta["split_idx_start"]
+        assert updated[start:start + len(chunk.content)] == chunk.content
+
+
+def test_chunk_ids_are_stable_and_carry_content_hash():
+    store = ChunkStore()
+    store.upload(TEXT)
+    ids = set(store.chunks)
+    store.upload(TEXT, segment_chars=1_000_000)
+
+    assert set(store.chunks) == ids
+    assert all("content_hash" in chunk.meta for chunk in store.chunks.values())
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+from pathlib import Path
+
+from service.ingestion_jobs import IngestionJobQueue
+
+
+class SlowIndexer:
+    def __init__(self, rag, source):
+        self.rag, self.source = rag, source
+        self.bytes_read = 0
+
+    def feed(self, data: bytes):
+        self.bytes_read += len(data)
+        time.sleep(0.05)
+
+    def finish(self):
+        with self.rag.lock:
+            self.rag.running[self.source] -= 1
+        return {"segments": 1, "chunks_indexed": 1, "chunks_skipped": 0, "chunks_removed": 0}
+
+
+class RecordingRAG:
+    """Counts indexers running per file and the most seen at once"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = {}
+        self.most_concurrent = {}
+        self.threads = set()
+        self.events = []
+
+    def delete_file(self, file_path):
+        with self.lock:
+            self.events.append(("delete", file_path, self.running.get(file_path, 0)))
+        return {"success": True, "chunks_removed": 1, "document_count": 0}
+
+    def create_stream_indexer(self, source, total_bytes=None, on_progress=None):
+        self.threads.add(threading.current_thread().name)
+        with self.lock:
+            self.running[source] = self.running.get(source, 0) + 1
+            self.most_concurrent[source] = max(self.most_concurrent.get(source, 0), self.running[source])
+        with self.lock:
+            self.events.append(("index", source))
+        return SlowIndexer(self, source)
+
+
+def spool(tmp_path: Path, name: str, queue: IngestionJobQueue) -> Path:
+    path = queue.spool_path(name)
+    path.write_bytes(b"Bananas grow in the tropics. " * 10)
+    return path
+
+
+def test_jobs_for_the_same_file_run_one_at_a_time(tmp_path):
+    rag = RecordingRAG()
+
+    async def main():
+        queue = IngestionJobQueue(lambda: rag, max_workers=4, spool_dir=tmp_path, small_file_bytes=1024)
+        jobs = [queue.submit(name, spool(tmp_path, name, queue)) for name in ("a.txt", "a.txt", "a.txt", "b.txt")]
+        while any(job.state not in ("completed", "failed") for job in jobs):
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return jobs, queue
+
+    jobs, queue = asyncio.run(main())
+
+    assert [job.state for job in jobs] == ["completed"] * 4
+    assert rag.most_concurrent == {"a.txt": 1, "b.txt": 1}
+    assert queue._file_locks == {}
+    assert threading.main_thread().name not in rag.threads
+
+
+async def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.005)
+
+
+def test_delete_waits_for_a_running_upload_of_the_same_file(tmp_path):
+    rag = RecordingRAG()
+
+    async def main():
+        queue = IngestionJobQueue(lambda: rag, max_workers=2, spool_dir=tmp_path, small_file_bytes=1024)
+        job = queue.submit("a.txt", spool(tmp_path, "a.txt", queue))
+        await wait_for(lambda: job.state == "running")
+        result = await queue.delete_file("a.txt")
+        state_at_delete = job.state
+        await queue.stop()
+        return job, result, state_at_delete
+
+    job, result, state_at_delete = asyncio.run(main())
+
+    assert state_at_delete == "completed"
+    assert rag.events == [("index", "a.txt"), ("delete", "a.txt", 0)]
+    assert result["jobs_cancelled"] == 0
+
+
+def test_delete_cancels_queued_uploads_of_the_file(tmp_path):
+    rag = RecordingRAG()
+
+    async def main():
+        queue = IngestionJobQueue(lambda: rag, max_workers=1, spool_dir=tmp_path, small_file_bytes=1024)
+        busy = queue.submit("b.txt", spool(tmp_path, "b.txt", queue))
+        await wait_for(lambda: busy.state == "running")
+        queued = queue.submit("a.txt", spool(tmp_path, "a.txt", queue))
+        result = await queue.delete_file("a.txt")
+        await wait_for(lambda: busy.state == "completed")
+        await queue._queue.join()
+        await queue.stop()
+        return queued, result
+
+    queued, result = asyncio.run(main())
+
+    assert result["jobs_cancelled"] == 1
+    assert queued.state == "failed" and "delete" in queued.error
+    assert ("index", "a.txt") not in rag.events
+    assert not queued.files[0][1].exists()
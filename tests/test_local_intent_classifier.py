@@ -0,0 +1,123 @@
+import json
+
+import pytest
+
+from benchmarks.stubs import StubChatGenerator
+from service.intent_processor import IntentProcessorService
+from service.local_intent_classifier import LocalIntentClassifier, extract_slots
+
+SCHEMA = {
+    "intents": [
+        {
+            "name": "document_query",
+            "description": "Questions about document content",
+            "slots": [{"name": "topic", "is_required": True, "description": "The topic to query about"}],
+            "examples": ["What does the document say about bananas?"],
+        },
+        {
+            "name": "find_definition",
+            "description": "Definitions of terms used in the document",
+            "slots": [{"name": "term", "is_required": True, "description": "The term to define"}],
+            "examples": ["What is photosynthesis?"],
+        },
+        {
+            "name": "out_of_scope",
+            "description": "Queries unrelated to the document",
+            "slots": [],
+            "examples": ["What's the weather like today?"],
+        },
+    ]
+}
+
+# Stub embeddings: one axis per intent, queries placed near or between the examples
+VECTORS = {
+    "What does the document say about bananas?": [1.0, 0.0, 0.0],
+    "What is photosynthesis?": [0.0, 1.0, 0.0],
+    "What's the weather like today?": [0.0, 0.0, 1.0],
+    "Tell me about banana yield": [0.9, 0.1, 0.0],
+    "What is": [0.1, 0.9, 0.0],
+    "Hmm, something or other": [1.0, 1.0, 1.0],
+}
+
+LLM_REPLY = json.dumps({"intent": "document_query", "slots": {"topic": "llm topic"}, "confidence": 0.9})
+
+
+def embed(text):
+    return VECTORS[text]
+
+
+def make_service(tmp_path, reply=LLM_REPLY):
+    schema_path = tmp_path / "schema.json"
+    schema_path.write_text(json.dumps(SCHEMA), encoding="utf-8")
+    service = IntentProcessorService(str(schema_path), embed_fn=embed)
+    generator = StubChatGenerator(latency=0.0, reply=reply)
+    service.processor.generator = generator
+    return service, generator
+
+
+def test_confident_query_is_classified_locally():
+    classifier = LocalIntentClassifier(SCHEMA, embed, threshold=0.75)
+
+    result = classifier.classify("Tell me about banana yield")
+
+    assert result["intent"] == "document_query"
+    assert result["slots"] == {"topic": "banana yield"}
+    assert result["is_out_of_scope"] is False
+    assert result["confidence"] == pytest.approx(0.994, abs=1e-3)
+
+
+def test_query_below_the_threshold_falls_back():
+    classifier = LocalIntentClassifier(SCHEMA, embed, threshold=0.75)
+
+    assert classifier.nearest_intent(embed("Hmm, something or other"))[1] < 0.75
+    assert classifier.classify("Hmm, something or other") is None
+
+
+def test_missing_required_slot_falls_back():
+    classifier = LocalIntentClassifier(SCHEMA, embed, threshold=0.75)
+
+    assert classifier.nearest_intent(embed("What is"))[0] == "find_definition"
+    assert classifier.classify("What is") is None
+
+
+@pytest.mark.parametrize("intent, query, slots", [
+    ("document_query", "What does the document say about banana yield?", {"topic": "banana yield"}),
+    ("document_query", "Tell me about the section on harvesting",
+     {"topic": "section harvesting", "section": "harvesting"}),
+    ("find_definition", "What is the definition of photosynthesis?", {"term": "photosynthesis"}),
+    ("find_definition", "What does chlorophyll mean?", {"term": "chlorophyll"}),
+    ("document_summary", "Summarize the section about pests", {"section": "pests"}),
+    ("document_summary", "Summarize everything", {}),
+    ("document_metadata", "Who is the author?", {"metadata_type": "author"}),
+    ("document_metadata", "When was it published?", {"metadata_type": "date"}),
+])
+def test_extract_slots(intent, query, slots):
+    assert extract_slots(intent, query) == slots
+
+
+def test_counters_split_local_hits_and_llm_fallbacks(tmp_path):
+    service, generator = make_service(tmp_path)
+
+    local = service.process_intent("Tell me about banana yield")
+    remote = service.process_intent("Hmm, something or other")
+    service.process_intent("Tell me about banana yield")
+
+    assert local["slots"] == {"topic": "banana yield"}
+    assert remote["slots"] == {"topic": "llm topic"}
+    assert generator.calls == 1
+    stats = service.get_stats()
+    # The repeated query is answered from the intent cache and counted neither way
+    assert (stats["local_hits"], stats["llm_fallbacks"]) == (1, 1)
+    assert stats["local_hit_rate"] == 0.5
+
+
+def test_llm_fallback_result_is_not_cached(tmp_path):
+    service, generator = make_service(tmp_path, reply="not json")
+
+    first = service.process_intent("Hmm, something or other")
+    generator.reply = LLM_REPLY
+    second = service.process_intent("Hmm, something or other")
+
+    assert first["slots"] == {"topic": "general"}
+    assert second["slots"] == {"topic": "llm topic"}
+    assert generator.calls == 2
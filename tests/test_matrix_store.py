@@ -0,0 +1,277 @@
+from typing import List
+
+import numpy as np
+import pytest
+from haystack.dataclasses import Document
+from haystack.document_stores.errors import DuplicateDocumentError
+from haystack.document_stores.types import DuplicatePolicy
+
+from service.matrix_store import MatrixDocumentStore, MatrixEmbeddingRetriever
+from service.persistent_store import DocumentLog
+
+DIM = 16
+
+
+def vectors(count: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+
+
+def documents(embeddings: np.ndarray, prefix: str = "doc", start: int = 0) -> List[Document]:
+    return [Document(id=f"{prefix}{start + i}", content=f"{prefix} {start + i}", meta={"n": start + i},
+                     embedding=embedding.tolist()) for i, embedding in enumerate(embeddings)]
+
+
+def brute_force(embeddings: np.ndarray, ids: List[str], query: np.ndarray, top_k: int) -> List[str]:
+    scores = embeddings @ query / (np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query))
+    return [ids[i] for i in np.argsort(-scores)[:top_k]]
+
+
+def assert_consistent(store: MatrixDocumentStore):
+    """Every id maps to the row holding it and the row count matches"""
+    assert len(store._ids) == len(store._contents) == len(store._metas) == store.count_documents()
+    assert len(store._rows) == store.count_documents()
+    for doc_id, row in store._rows.items():
+        assert store._ids[row] == doc_id
+
+
+def test_ranking_matches_brute_force_cosine():
+    embeddings = vectors(300)
+    docs = documents(embeddings)
+    store = MatrixDocumentStore()
+    store.write_documents(docs)
+    queries = vectors(20, seed=1)
+
+    for query in queries:
+        result = store.embedding_retrieval(query.tolist(), top_k=5)
+        assert [doc.id for doc in result] == brute_force(embeddings, [doc.id for doc in docs], query, 5)
+        assert all(a.score >= b.score for a, b in zip(result, result[1:]))
+
+    batched = store.embedding_retrieval_batch(queries.tolist(), top_k=5)
+    assert [[doc.id for doc in result] for result in batched] == \
+           [[doc.id for doc in store.embedding_retrieval(query.tolist(), top_k=5)] for query in queries]
+
+
+def test_top_k_larger_than_store_returns_everything_sorted():
+    embeddings = vectors(4)
+    store = MatrixDocumentStore()
+    store.write_documents(documents(embeddings))
+
+    result = store.embedding_retrieval(embeddings[2].tolist(), top_k=10)
+
+    assert len(result) == 4
+    assert result[0].id == "doc2"
+    assert result[0].score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_filters_restrict_candidates():
+    embeddings = vectors(50)
+    store = MatrixDocumentStore()
+    store.write_documents(documents(embeddings))
+
+    result = store.embedding_retrieval(embeddings[3].tolist(), top_k=5,
+                                       filters={"field": "meta.n", "operator": ">=", "value": 40})
+
+    assert {doc.id for doc in result} <= {f"doc{i}" for i in range(40, 50)}
+    assert len(result) == 5
+
+
+def test_delete_moves_last_row_and_keeps_rows_consistent():
+    embeddings = vectors(10)
+    store = MatrixDocumentStore()
+    store.write_documents(documents(embeddings))
+
+    store.delete_documents(["doc0", "doc5", "doc9", "unknown"])
+
+    assert_consistent(store)
+    assert store.count_documents() == 7
+    assert sorted(doc.id for doc in store.filter_documents()) == sorted(f"doc{i}" for i in (1, 2, 3, 4, 6, 7, 8))
+    for i in (1, 8):
+        assert store.embedding_retrieval(embeddings[i].tolist(), top_k=1)[0].id == f"doc{i}"
+
+
+def test_overwrite_replaces_the_stored_row():
+    embeddings = vectors(5)
+    store = MatrixDocumentStore()
+    store.write_documents(documents(embeddings))
+    replacement = vectors(1, seed=7)[0]
+
+    written = store.write_documents([Document(id="doc2", content="new", embedding=replacement.tolist())],
+                                    policy=DuplicatePolicy.OVERWRITE)
+
+    assert written == 1
+    assert_consistent(store)
+    assert store.count_documents() == 5
+    best = store.embedding_retrieval(replacement.tolist(), top_k=1)[0]
+    assert (best.id, best.content) == ("doc2", "new")
+
+
+def test_duplicate_ids_in_one_overwrite_batch_are_written_once():
+    first, second = vectors(2)
+    store = MatrixDocumentStore()
+
+    written = store.write_documents([Document(id="a", content="first", embedding=first.tolist()),
+                                     Document(id="a", content="second", embedding=second.tolist())],
+                                    policy=DuplicatePolicy.OVERWRITE)
+
+    assert written == 1
+    assert store.count_documents() == 1
+    assert_consistent(store)
+    assert [doc.content for doc in store.embedding_retrieval(first.tolist(), top_k=10)] == ["second"]
+
+
+def test_duplicate_policies():
+    embeddings = vectors(3)
+    store = MatrixDocumentStore()
+    store.write_documents(documents(embeddings))
+    duplicate = Document(id="doc1", content="duplicate", embedding=embeddings[0].tolist())
+
+    with pytest.raises(DuplicateDocumentError):
+        store.write_documents([duplicate], policy=DuplicatePolicy.FAIL)
+    with pytest.raises(DuplicateDocumentError):
+        store.write_documents([duplicate])  # NONE behaves like FAIL
+    assert store.write_documents([duplicate], policy=DuplicatePolicy.SKIP) == 0
+    assert store.get_documents_by_id(["doc1"])[0].content == "doc 1"
+
+    new = Document(id="new", content="new", embedding=embeddings[2].tolist())
+    assert store.write_documents([new, new], policy=DuplicatePolicy.SKIP) == 1
+    assert store.write_documents([duplicate], policy=DuplicatePolicy.OVERWRITE) == 1
+    assert store.get_documents_by_id(["doc1"])[0].content == "duplicate"
+    assert_consistent(store)
+    assert store.count_documents() == 4
+
+
+def test_documents_without_embedding_are_stored_but_not_retrieved():
+    embeddings = vectors(3)
+    store = MatrixDocumentStore()
+    store.write_documents(documents(embeddings) + [Document(id="plain", content="no embedding")])
+
+    assert store.count_documents() == 4
+    assert "plain" not in {doc.id for doc in store.embedding_retrieval(embeddings[0].tolist(), top_k=10)}
+    assert store.get_documents_by_id(["plain"])[0].content == "no embedding"
+
+
+def test_reload_from_document_log(tmp_path):
+    embeddings = vectors(40)
+    store = MatrixDocumentStore(DocumentLog(tmp_path, fsync=False))
+    store.write_documents(documents(embeddings))
+    store.delete_documents(["doc3", "doc17"])
+    store.write_documents([Document(id="doc5", content="rewritten", embedding=embeddings[5].tolist())],
+                          policy=DuplicatePolicy.OVERWRITE)
+    store.log.close()
+
+    restored = MatrixDocumentStore(DocumentLog(tmp_path, fsync=False))
+
+    assert_consistent(restored)
+    assert restored.count_documents() == 38
+    assert sorted(doc.id for doc in restored.filter_documents()) == sorted(doc.id for doc in store.filter_documents())
+    assert restored.get_documents_by_id(["doc5"])[0].content == "rewritten"
+    for doc in restored.filter_documents():
+        i = int(doc.id[3:])
+        np.testing.assert_allclose(doc.embedding, embeddings[i], rtol=1e-6)
+    query = embeddings[21].tolist()
+    assert [doc.id for doc in restored.embedding_retrieval(query, top_k=3)] == \
+           [doc.id for doc in store.embedding_retrieval(query, top_k=3)]
+
+
+def test_retriever_runs_single_and_batched():
+    embeddings = vectors(30)
+    store = MatrixDocumentStore()
+    store.write_documents(documents(embeddings))
+    retriever = MatrixEmbeddingRetriever(document_store=store, top_k=2)
+
+    single = retriever.run(query_embedding=embeddings[4].tolist())["documents"]
+    batched = retriever.run_batch([embeddings[4].tolist(), embeddings[9].tolist()], top_k=1)
+
+    assert len(single) == 2 and single[0].id == "doc4"
+    assert [[doc.id for doc in result] for result in batched] == [["doc4"], ["doc9"]]
+
+
+def test_int8_quantization_round_trips_within_one_step():
+    embeddings = vectors(50)
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    store = MatrixDocumentStore(quantization="int8")
+
+    quantized, scales = store._quantize(normalized)
+
+    assert quantized.dtype == np.int8 and scales.dtype == np.float32
+    assert np.abs(quantized).max(axis=1).tolist() == [127] * 50
+    np.testing.assert_allclose(quantized * scales[:, None], normalized, atol=scales.max() / 2 + 1e-7)
+
+
+@pytest.mark.parametrize("quantization", ["float16", "int8"])
+def test_stored_embeddings_dequantize_close_to_the_originals(quantization):
+    embeddings = vectors(20)
+    store = MatrixDocumentStore(quantization=quantization)
+    store.write_documents(documents(embeddings))
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    for doc in store.filter_documents():
+        np.testing.assert_allclose(doc.embedding, normalized[int(doc.id[3:])], atol=0.01)
+
+
+@pytest.mark.parametrize("quantization", ["float16", "int8"])
+@pytest.mark.parametrize("with_log", [False, True])
+def test_rescoring_returns_the_float32_top_k(tmp_path, quantization, with_log):
+    embeddings = vectors(2000)
+    docs = documents(embeddings)
+    exact = MatrixDocumentStore()
+    exact.write_documents(docs)
+    if with_log:
+        store = MatrixDocumentStore(DocumentLog(tmp_path, fsync=False), quantization=quantization, rescore_factor=4)
+    else:
+        store = MatrixDocumentStore(quantization=quantization, rescore_factor=4, rescore_path=tmp_path / "exact.f32")
+    store.write_documents(docs)
+    queries = embeddings[:50] + 0.8 * vectors(50, seed=3)
+
+    for query in queries:
+        expected = exact.embedding_retrieval(query.tolist(), top_k=5)
+        result = store.embedding_retrieval(query.tolist(), top_k=5)
+        assert [doc.id for doc in result] == [doc.id for doc in expected]
+        np.testing.assert_allclose([doc.score for doc in result], [doc.score for doc in expected], atol=1e-5)
+    # Exact embeddings are returned, not the quantized ones
+    stored = store.filter_documents(filters={"field": "id", "operator": "==", "value": "doc0"})[0]
+    np.testing.assert_allclose(stored.embedding, embeddings[0], rtol=1e-6)
+
+
+def test_rescoring_requires_a_path_without_log():
+    with pytest.raises(ValueError):
+        MatrixDocumentStore(quantization="int8", rescore_factor=4)
+    with pytest.raises(ValueError):
+        MatrixDocumentStore(quantization="int4")
+
+
+def test_embedding_file_memmap_is_reopened_after_appends(tmp_path):
+    store = MatrixDocumentStore(quantization="int8", rescore_factor=2, rescore_path=tmp_path / "exact.f32")
+    store.write_documents(documents(vectors(10)))
+    first = store._exact_embeddings()
+    assert store._exact_embeddings() is first
+
+    more = vectors(5, seed=4)
+    store.write_documents(documents(more, start=10))
+    reopened = store._exact_embeddings()
+
+    assert reopened is not first
+    assert reopened.shape == (15, DIM)
+    np.testing.assert_allclose(reopened[10:], more)
+
+
+def test_document_log_memmap_is_reopened_after_appends_and_compaction(tmp_path):
+    embeddings = vectors(1200)
+    store = MatrixDocumentStore(DocumentLog(tmp_path, fsync=False), quantization="int8", rescore_factor=4)
+    store.write_documents(documents(embeddings[:600]))
+    first = store._exact_embeddings()
+    assert store._exact_embeddings() is first
+
+    store.write_documents(documents(embeddings[600:], start=600))
+    appended = store._exact_embeddings()
+    assert appended is not first and appended.shape == (1200, DIM)
+
+    # Deleting most documents compacts the log into a new generation with fewer rows
+    store.delete_documents([f"doc{i}" for i in range(1000)])
+    assert store.log.generation == 1
+    compacted = store._exact_embeddings()
+    assert compacted is not appended and compacted.shape == (200, DIM)
+    for doc in store.filter_documents():
+        np.testing.assert_allclose(doc.embedding, embeddings[int(doc.id[3:])], rtol=1e-6)
+    query = embeddings[1100].tolist()
+    assert store.embedding_retrieval(query, top_k=1)[0].id == "doc1100"
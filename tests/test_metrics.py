@@ -0,0 +1,86 @@
+from typing import Any, Dict
+
+import pytest
+from fastapi.testclient import TestClient
+from haystack import Pipeline, component, tracing
+
+from app.main import app
+from service.pipeline_metrics import MetricsTracer, install_pipeline_metrics
+from utils.metrics import CONTENT_TYPE, PIPELINE_COMPONENT_SECONDS, MetricsRegistry
+
+
+@component
+class Echo:
+    @component.output_types(text=str)
+    def run(self, text: str) -> Dict[str, Any]:
+        return {"text": text}
+
+
+@pytest.fixture
+def metrics_tracer():
+    previous = tracing.tracer.actual_tracer
+    install_pipeline_metrics()
+    yield tracing.tracer.actual_tracer
+    tracing.tracer.actual_tracer = previous
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ["path"])
+
+    requests.inc(path='say "hi"\\now\nplease')
+
+    assert 'requests_total{path="say \\"hi\\"\\\\now\\nplease"} 1' in registry.render().splitlines()
+
+
+def test_histogram_buckets_are_cumulative_with_sum_and_count():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", ["stage"], buckets=(0.1, 1.0))
+
+    for value in (0.05, 0.5, 1.0, 5):
+        latency.observe(value, stage="total")
+
+    assert registry.render().splitlines() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{stage="total",le="0.1"} 1',
+        'latency_seconds_bucket{stage="total",le="1"} 3',
+        'latency_seconds_bucket{stage="total",le="+Inf"} 4',
+        'latency_seconds_sum{stage="total"} 6.55',
+        'latency_seconds_count{stage="total"} 4',
+    ]
+
+
+def test_wrong_labels_and_duplicate_names_are_rejected():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ["path"])
+
+    with pytest.raises(ValueError):
+        requests.inc(route="/")
+    with pytest.raises(ValueError):
+        registry.histogram("requests_total", "Requests again")
+
+
+def test_tracer_labels_component_runs_with_pipeline_and_component(metrics_tracer):
+    pipeline = Pipeline(metadata={"name": "metrics_test"})
+    pipeline.add_component("echo", Echo())
+    before = PIPELINE_COMPONENT_SECONDS.get_count(pipeline="metrics_test", component="echo")
+
+    pipeline.run({"echo": {"text": "hello"}})
+    pipeline.run({"echo": {"text": "again"}})
+    install_pipeline_metrics()
+
+    assert isinstance(metrics_tracer, MetricsTracer)
+    # Installing again does not wrap the tracer twice, which would count every run twice
+    assert tracing.tracer.actual_tracer is metrics_tracer
+    assert PIPELINE_COMPONENT_SECONDS.get_count(pipeline="metrics_test", component="echo") == before + 2
+
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == CONTENT_TYPE
+    lines = response.text.splitlines()
+    labels = 'pipeline="metrics_test",component="echo"'
+    assert f"chatbot_pipeline_component_duration_seconds_bucket{{{labels},le=\"+Inf\"}} {before + 2}" in lines
+    assert f"chatbot_pipeline_component_duration_seconds_count{{{labels}}} {before + 2}" in lines
+    assert any(line.startswith(f"chatbot_pipeline_component_duration_seconds_sum{{{labels}}} ") for line in lines)
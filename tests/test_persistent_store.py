@@ -0,0 +1,125 @@
+import os
+from typing import Any, Dict, List
+
+import numpy as np
+import pytest
+from haystack.dataclasses import Document
+from haystack.document_stores.types import DuplicatePolicy
+
+from service import persistent_store
+from service.matrix_store import MatrixDocumentStore
+from service.persistent_store import DocumentLog, PersistentDocumentStore
+
+
+def documents(start: int, stop: int, version: str = "") -> List[Document]:
+    rng = np.random.default_rng(start)
+    return [Document(id=f"doc{i}", content=f"chunk {i}{version}", meta={"file_path": f"file{i % 3}.txt"},
+                     embedding=rng.standard_normal(8).astype(np.float32).tolist())
+            for i in range(start, stop)]
+
+
+def snapshot(store) -> Dict[str, Any]:
+    return {doc.id: (doc.content, doc.meta, np.round(doc.embedding, 5).tolist())
+            for doc in store.filter_documents()}
+
+
+def test_writes_and_deletes_survive_a_restart(tmp_path):
+    store = PersistentDocumentStore(tmp_path, fsync=False)
+    store.write_documents(documents(0, 10))
+    store.write_documents(documents(0, 3, version=" v2"), policy=DuplicatePolicy.OVERWRITE)
+    store.delete_documents(["doc5", "doc6"])
+    expected = snapshot(store)
+
+    restored = PersistentDocumentStore(tmp_path, fsync=False)
+
+    assert snapshot(restored) == expected
+    assert restored.count_documents() == 8
+    [restored_doc] = restored.filter_documents(filters={"field": "id", "operator": "==", "value": "doc1"})
+    assert restored_doc.content == "chunk 1 v2"
+
+
+def test_torn_tail_is_truncated(tmp_path):
+    store = PersistentDocumentStore(tmp_path, fsync=False)
+    store.write_documents(documents(0, 5))
+    expected = snapshot(store)
+    log = store.log
+    log.close()
+    # A crash mid-append: embeddings of a write whose log record was torn
+    with open(log.embeddings_path, "ab") as f:
+        f.write(np.zeros((2, 8), dtype=np.float32).tobytes())
+    with open(log.log_path, "ab") as f:
+        f.write(b'0badc0de {"op":"write","id":"doc9"')
+    log_size = log.log_path.stat().st_size
+
+    restored = PersistentDocumentStore(tmp_path, fsync=False)
+
+    assert snapshot(restored) == expected
+    assert restored.log.log_path.stat().st_size < log_size
+    assert restored.log.embeddings_path.stat().st_size == 5 * 8 * 4
+    # Appends after the recovery are readable again
+    restored.write_documents(documents(5, 7))
+    assert PersistentDocumentStore(tmp_path, fsync=False).count_documents() == 7
+
+
+def test_corrupt_record_stops_replay(tmp_path):
+    store = PersistentDocumentStore(tmp_path, fsync=False)
+    store.write_documents(documents(0, 3))
+    store.log.close()
+    with open(store.log.log_path, "ab") as f:
+        f.write(b'00000000 {"op":"clear"}\n')
+
+    assert PersistentDocumentStore(tmp_path, fsync=False).count_documents() == 3
+
+
+def test_crash_between_compaction_and_current_switch_keeps_old_generation(tmp_path, monkeypatch):
+    store = PersistentDocumentStore(tmp_path, fsync=False)
+    store.write_documents(documents(0, 6))
+    store.delete_documents(["doc0"])
+    expected = snapshot(store)
+
+    def crash(*args, **kwargs):
+        raise OSError("simulated crash")
+
+    monkeypatch.setattr(persistent_store.os, "replace", crash)
+    with pytest.raises(OSError):
+        store.compact()
+    monkeypatch.undo()
+    # The new generation's files were written but CURRENT still names the old one
+    assert (tmp_path / "documents-1.log").exists()
+    assert not (tmp_path / persistent_store.CURRENT_FILE).exists()
+
+    restored = PersistentDocumentStore(tmp_path, fsync=False)
+
+    assert restored.log.generation == 0
+    assert snapshot(restored) == expected
+    assert not (tmp_path / "documents-1.log").exists()
+    restored.compact()
+    assert restored.log.generation == 1
+    assert snapshot(PersistentDocumentStore(tmp_path, fsync=False)) == expected
+
+
+def test_matrix_store_restores_from_log_after_compaction(tmp_path):
+    store = MatrixDocumentStore(DocumentLog(tmp_path, fsync=False), compact_ratio=0.5)
+    store.write_documents(documents(0, 1200))
+    # Deleting most documents compacts the log once it holds over 1000 records
+    store.delete_documents([f"doc{i}" for i in range(0, 1200, 3)] + [f"doc{i}" for i in range(1, 1200, 3)])
+    assert store.log.generation == 1
+    store.write_documents(documents(1200, 1210))
+    expected = snapshot(store)
+
+    restored = MatrixDocumentStore(DocumentLog(tmp_path, fsync=False))
+
+    assert snapshot(restored) == expected
+    assert restored.count_documents() == 410
+    query = expected["doc1205"][2]
+    assert restored.embedding_retrieval(query, top_k=1)[0].id == "doc1205"
+
+
+def test_stale_generation_files_are_removed(tmp_path):
+    PersistentDocumentStore(tmp_path, fsync=False).write_documents(documents(0, 2))
+    (tmp_path / "documents-7.log").write_bytes(b"")
+    (tmp_path / "embeddings-7.f32").write_bytes(b"")
+
+    PersistentDocumentStore(tmp_path, fsync=False)
+
+    assert sorted(os.listdir(tmp_path)) == ["documents-0.log", "embeddings-0.f32"]
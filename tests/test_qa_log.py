@@ -0,0 +1,87 @@
+import json
+import threading
+
+from utils.qa_log import LEGACY_SEPARATOR, QALogWriter, read_legacy_qa_log
+
+
+def read_records(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_flushed_records_are_readable_in_write_order(tmp_path):
+    writer = QALogWriter(tmp_path / "qa_log.jsonl", batch_size=3, flush_interval=60)
+
+    for i in range(7):
+        writer.write({"query": f"q{i}"})
+    assert writer.flush(timeout=5)
+
+    assert [r["query"] for r in read_records(writer.path)] == [f"q{i}" for i in range(7)]
+    writer.close()
+
+
+def test_rotation_names_backups_like_rotating_file_handler(tmp_path):
+    path = tmp_path / "qa_log.jsonl"
+    line_size = len(json.dumps({"query": "q0"}) + "\n")
+    writer = QALogWriter(path, batch_size=1, max_bytes=2 * line_size, backup_count=2)
+
+    for i in range(8):
+        writer.write({"query": f"q{i}"})
+        assert writer.flush(timeout=5)
+    writer.close()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["qa_log.jsonl", "qa_log.jsonl.1", "qa_log.jsonl.2"]
+    assert [r["query"] for r in read_records(path)] == ["q6", "q7"]
+    assert [r["query"] for r in read_records(tmp_path / "qa_log.jsonl.1")] == ["q4", "q5"]
+    assert [r["query"] for r in read_records(tmp_path / "qa_log.jsonl.2")] == ["q2", "q3"]
+    assert writer.get_stats()["rotations"] == 3
+
+
+def test_full_queue_drops_and_counts_records(tmp_path):
+    entered, release = threading.Event(), threading.Event()
+
+    def prepare(record):
+        # Hold the writer thread on the first record so the queue fills up behind it
+        entered.set()
+        release.wait(5)
+        return record
+
+    writer = QALogWriter(tmp_path / "qa_log.jsonl", max_queue=2, prepare=prepare)
+    assert writer.write({"query": "held"})
+    assert entered.wait(5)
+
+    accepted = [writer.write({"query": f"q{i}"}) for i in range(5)]
+    release.set()
+    assert writer.flush(timeout=5)
+    writer.close()
+
+    assert accepted == [True, True, False, False, False]
+    assert writer.get_stats()["dropped"] == 3
+    assert [r["query"] for r in read_records(writer.path)] == ["held", "q0", "q1"]
+
+
+def test_legacy_log_keeps_multi_line_answers_and_an_unterminated_entry(tmp_path):
+    path = tmp_path / "qa_log.txt"
+    path.write_text(
+        "Question: What is RAG?\n"
+        "Answer: Retrieval first.\n"
+        "Then generation.\n"
+        f"{LEGACY_SEPARATOR}\n"
+        "Question: Which model?\n"
+        "Answer: Whichever is configured\n",
+        encoding="utf-8",
+    )
+
+    entries = list(read_legacy_qa_log(path))
+
+    assert entries == [
+        {"query": "What is RAG?", "response": "Retrieval first.\nThen generation."},
+        {"query": "Which model?", "response": "Whichever is configured"},
+    ]
+
+
+def test_legacy_log_joins_a_multi_line_question(tmp_path):
+    path = tmp_path / "qa_log.txt"
+    path.write_text(f"Question: First line\nsecond line\nAnswer: Yes\n{LEGACY_SEPARATOR}\n", encoding="utf-8")
+
+    assert list(read_legacy_qa_log(path)) == [{"query": "First line\nsecond line", "response": "Yes"}]
@@ -0,0 +1,162 @@
+import asyncio
+import json
+
+import pytest
+
+from benchmarks.query_llm_calls import StubRAGService
+from benchmarks.stubs import StubChatGenerator, StubTextEmbedder, hash_embedding
+from service.answer_cache import SemanticAnswerCache
+from service.embedding import CachedTextEmbedder
+from service.intent_processor import IntentProcessorService
+from service.query_service import QueryService
+from service.response_generator import ResponseGeneratorService
+from utils.config import settings
+
+QUERIES = [
+    "Which country grows the most bananas?",
+    "How are bananas ripened?",
+    "What pests attack banana plants?",
+]
+INTENT_REPLY = json.dumps({"intent": "document_query", "slots": {"topic": "bananas"}, "confidence": 0.9})
+
+
+class CountingEmbedder(StubTextEmbedder):
+    """Stub embedder recording the texts of every call"""
+
+    def __init__(self):
+        self.calls = []
+
+    def run(self, text):
+        self.calls.append([text])
+        return super().run(text=text)
+
+
+class BatchCountingEmbedder(CountingEmbedder):
+    def run_batch(self, texts):
+        self.calls.append(list(texts))
+        return [hash_embedding(text) for text in texts]
+
+
+@pytest.fixture(scope="module")
+def rag():
+    split_by = settings.SPLIT_BY
+    settings.SPLIT_BY = "period"
+    try:
+        rag = StubRAGService(StubChatGenerator(latency=0.0))
+    finally:
+        settings.SPLIT_BY = split_by
+    assert rag.index_document(settings.BASE_DIR / "banana.txt")["success"]
+    return rag
+
+
+def make_service(rag):
+    intent_processor = IntentProcessorService(settings.SCHEMA_PATH, embed_fn=rag.embed_query)
+    intent_processor.processor.generator = StubChatGenerator(latency=0.0, reply=INTENT_REPLY)
+    response_generator = ResponseGeneratorService(settings.SCHEMA_PATH)
+    generator = StubChatGenerator(latency=0.0, reply="stub answer")
+    response_generator.response_generator.generator = generator
+    answer_cache = SemanticAnswerCache(settings.ANSWER_CACHE_SIMILARITY, 100, 10_000_000, 60)
+    return QueryService(intent_processor, rag, response_generator, answer_cache=answer_cache), generator
+
+
+def test_batch_results_keep_query_order(rag):
+    service, generator = make_service(rag)
+    original = service.response_generator.generate_response_async
+    delays = {query: 0.03 * (len(QUERIES) - i) for i, query in enumerate(QUERIES)}
+    finished = []
+
+    async def generate_in_reverse(query, **kwargs):
+        # The first query's answer is generated last
+        await asyncio.sleep(delays[query])
+        finished.append(query)
+        return await original(query=query, **kwargs)
+
+    service.response_generator.generate_response_async = generate_in_reverse
+
+    batch = asyncio.run(service.answer_batch(QUERIES))
+
+    assert finished == QUERIES[::-1]
+    assert [result["query"] for result in batch["results"]] == QUERIES
+    assert all(result["success"] and result["response"] == "stub answer" for result in batch["results"])
+    assert batch["errors"] == 0
+    assert generator.calls == len(QUERIES)
+
+
+def test_batch_serves_cached_answers_and_generates_the_rest(rag):
+    service, generator = make_service(rag)
+
+    async def main():
+        await service.answer(QUERIES[1])
+        return await service.answer_batch(QUERIES)
+
+    batch = asyncio.run(main())
+
+    assert [result["cache_hit"] for result in batch["results"]] == [False, True, False]
+    assert [result["query"] for result in batch["results"]] == QUERIES
+    # One call for the single query, two for the batch misses
+    assert generator.calls == 3
+
+
+def test_failed_query_does_not_fail_the_batch(rag):
+    service, generator = make_service(rag)
+    original = service.intent_processor.process_intent_async
+
+    async def fail_second(query, query_embedding=None):
+        if query == QUERIES[1]:
+            raise RuntimeError("intent service down")
+        return await original(query, query_embedding)
+
+    service.intent_processor.process_intent_async = fail_second
+
+    batch = asyncio.run(service.answer_batch(QUERIES))
+
+    first, second, third = batch["results"]
+    assert first["success"] and third["success"]
+    assert second == {"query": QUERIES[1], "success": False,
+                      "error": "Error during intent processing: intent service down"}
+    assert batch["errors"] == 1
+    assert generator.calls == 2
+
+
+def test_failed_generation_only_fails_its_query(rag):
+    service, _ = make_service(rag)
+    original = service.response_generator.generate_response_async
+
+    async def fail_third(query, **kwargs):
+        if query == QUERIES[2]:
+            raise RuntimeError("LLM timeout")
+        return await original(query=query, **kwargs)
+
+    service.response_generator.generate_response_async = fail_third
+
+    batch = asyncio.run(service.answer_batch(QUERIES))
+
+    assert [result["success"] for result in batch["results"]] == [True, True, False]
+    assert batch["results"][2]["error"] == "Error during generation: LLM timeout"
+
+
+@pytest.mark.parametrize("embedder_class", [CountingEmbedder, BatchCountingEmbedder])
+def test_run_batch_embeds_only_the_misses_once(embedder_class):
+    embedder = embedder_class()
+    cached = CachedTextEmbedder(embedder, cache_size=100)
+    cached.run(text="a")
+    embedder.calls.clear()
+
+    embeddings = cached.run_batch(["b", "a", "b", "c"])
+
+    assert embeddings == [hash_embedding(text) for text in ["b", "a", "b", "c"]]
+    expected_calls = [["b", "c"]] if embedder_class is BatchCountingEmbedder else [["b"], ["c"]]
+    assert embedder.calls == expected_calls
+    # Everything is cached now
+    assert cached.run_batch(["c", "a"]) == [hash_embedding("c"), hash_embedding("a")]
+    assert embedder.calls == expected_calls
+
+
+def test_run_batch_returns_copies_of_cached_embeddings():
+    cached = CachedTextEmbedder(BatchCountingEmbedder(), cache_size=100)
+
+    first = cached.run_batch(["a", "a"])
+    first[0][0] = 42.0
+
+    assert first[1] is not first[0]
+    assert cached.run_batch(["a"]) == [hash_embedding("a")]
@@ -0,0 +1,152 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import routes
+from app.main import app
+from service.providers import get_query_service
+from utils import concurrency
+from utils.config import settings
+from utils.metrics import QUERY_ERRORS
+
+DONE = {"response": "Hello world", "intent": "document_query", "timings": {"time_to_first_token": 0.01}}
+
+
+class TrackedSlot:
+    """Query slot recording when the route acquires and releases it"""
+
+    def __init__(self, log):
+        self.log = log
+        self.slot = concurrency.query_slot()
+
+    async def __aenter__(self):
+        await self.slot.__aenter__()
+        self.log.append("acquired")
+
+    async def __aexit__(self, *exc_info):
+        # Only an explicit release is recorded, not the loop finalizing an abandoned generator
+        self.log.append("released")
+        return await self.slot.__aexit__(*exc_info)
+
+
+class StubQueryService:
+    """Streams a fixed sequence of events, optionally failing or hanging after the first token"""
+
+    def __init__(self, log, fail: bool = False, hang: bool = False):
+        self.log = log
+        self.fail = fail
+        self.hang = hang
+
+    async def answer_stream(self, query):
+        self.log.append("streaming")
+        yield {"event": "context", "data": {"intent": "document_query", "documents": []}}
+        yield {"event": "token", "data": {"text": "Hello "}}
+        if self.fail:
+            raise RuntimeError("LLM went away")
+        if self.hang:
+            await asyncio.Event().wait()
+        yield {"event": "token", "data": {"text": "world"}}
+        yield {"event": "done", "data": DONE}
+
+
+@pytest.fixture
+def slot_log(monkeypatch):
+    log = []
+    # A fresh semaphore per test: each TestClient request runs on its own event loop
+    monkeypatch.setattr(concurrency, "_query_semaphore", None)
+    monkeypatch.setattr(settings, "QUERY_QUEUE_TIMEOUT", 0.05)
+    monkeypatch.setattr(routes, "query_slot", lambda: TrackedSlot(log))
+    yield log
+    app.dependency_overrides.pop(get_query_service, None)
+
+
+def use_service(service):
+    app.dependency_overrides[get_query_service] = lambda: service
+
+
+def parse_sse(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        name, data = block.split("\n")
+        assert name.startswith("event: ") and data.startswith("data: ")
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_stream_frames_tokens_then_done(slot_log):
+    use_service(StubQueryService(slot_log))
+
+    response = TestClient(app).post("/api/query/stream", json={"query": "hello?"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(response.text)
+    assert [name for name, _ in events] == ["context", "token", "token", "done"]
+    assert "".join(data["text"] for name, data in events if name == "token") == "Hello world"
+    assert events[-1][1] == DONE
+    assert slot_log == ["acquired", "streaming", "released"]
+
+
+def test_stream_failure_ends_with_an_error_event(slot_log):
+    use_service(StubQueryService(slot_log, fail=True))
+    errors_before = QUERY_ERRORS.get(endpoint="stream", reason="error")
+
+    response = TestClient(app).post("/api/query/stream", json={"query": "hello?"})
+
+    assert response.status_code == 200
+    events = parse_sse(response.text)
+    assert [name for name, _ in events] == ["context", "token", "error"]
+    assert events[-1][1] == {"detail": "Error processing query: LLM went away"}
+    assert QUERY_ERRORS.get(endpoint="stream", reason="error") == errors_before + 1
+    assert slot_log == ["acquired", "streaming", "released"]
+
+
+def test_stream_without_a_free_slot_is_a_plain_503(slot_log, monkeypatch):
+    use_service(StubQueryService(slot_log))
+    monkeypatch.setattr(settings, "MAX_CONCURRENT_QUERIES", 0)
+
+    response = TestClient(app).post("/api/query/stream", json={"query": "hello?"})
+
+    assert response.status_code == 503
+    assert response.headers["content-type"] == "application/json"
+    assert slot_log == []
+
+
+def test_client_disconnect_stops_the_stream_and_frees_the_slot(slot_log):
+    use_service(StubQueryService(slot_log, hang=True))
+    body = json.dumps({"query": "hello?"}).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/api/query/stream", "raw_path": b"/api/query/stream", "query_string": b"",
+        "root_path": "", "headers": [(b"content-type", b"application/json"), (b"host", b"test")],
+        "client": ("test", 1), "server": ("test", 80),
+    }
+
+    async def main():
+        first_token = asyncio.Event()
+        request_sent = False
+        chunks = []
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # The client hangs up once the first token has arrived
+            await first_token.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body" and b"event: token" in message.get("body", b""):
+                chunks.append(message["body"])
+                first_token.set()
+
+        await asyncio.wait_for(app(scope, receive, send), timeout=5)
+        return chunks
+
+    chunks = asyncio.run(main())
+
+    assert len(chunks) == 1
+    assert slot_log == ["acquired", "streaming", "released"]
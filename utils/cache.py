@@ -0,0 +1,61 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """Thread-safe, bounded least-recently-used cache with hit, miss and eviction counters"""
+
+    def __init__(self, max_size: int):
+        """
+        Initialize the cache
+
+        Args:
+            max_size: Maximum number of entries; 0 or less disables the cache
+        """
+        self.max_size = max_size
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for `key`, or None on a miss"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self._stats["hits"] += 1
+                return self._data[key]
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key: Hashable, value: Any):
+        """Cache `value` under `key`, evicting the least recently used entry when full"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._data.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit, miss and eviction counters and the current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._data)
+        stats["max_size"] = self.max_size
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
@@ -0,0 +1,68 @@
+import random
+import re
+import time
+from typing import Any, Dict, List
+
+from utils.qa_log import QALogWriter
+
+# Personal data removed from captured queries before they are written
+REDACTIONS = [
+    (re.compile(r"[\w.+-]+@[\w-]+(\.[\w-]+)+"), "<email>"),
+    (re.compile(r"https?://\S+"), "<url>"),
+    # Phone, card and account numbers: 9+ digits, optionally separated by spaces, dots or dashes
+    (re.compile(r"\+?\d(?:[\s.-]?\d){8,}"), "<number>"),
+]
+
+
+def sanitize_query(text: str, max_chars: int) -> str:
+    """Redact e-mail addresses, URLs and long numbers and truncate to `max_chars`"""
+    for pattern, replacement in REDACTIONS:
+        text = pattern.sub(replacement, text)
+    return text[:max_chars]
+
+
+class TrafficCapture:
+    """
+    Record the queries sent to the query endpoints with their arrival times, for scripts/replay.py
+
+    Each request becomes one JSON line `{"ts": ..., "endpoint": ..., "queries": [...]}` with sanitized
+    queries; nothing else about the client is kept. Records go through a QALogWriter whose thread also
+    does the redaction, so the request only pays for a queue put.
+    """
+
+    def __init__(self, writer: QALogWriter, sample_rate: float = 1.0, max_query_chars: int = 2000):
+        """
+        Initialize the capture
+
+        Args:
+            writer: Background JSON-lines writer of the capture file; its `prepare` hook is set to the redaction
+            sample_rate: Fraction of requests recorded
+            max_query_chars: Captured queries are truncated to this length
+        """
+        self.writer = writer
+        self.writer.prepare = self._sanitize
+        self.sample_rate = sample_rate
+        self.max_query_chars = max_query_chars
+
+    def record(self, endpoint: str, queries: List[str]):
+        """
+        Record one request
+
+        Args:
+            endpoint: Path of the endpoint, e.g. "/api/query"
+            queries: The request's queries (several for the batch endpoint)
+        """
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        record: Dict[str, Any] = {
+            "ts": time.time(),
+            "endpoint": endpoint,
+            "queries": list(queries)
+        }
+        self.writer.write(record)
+
+    def _sanitize(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        return {**record, "queries": [sanitize_query(query, self.max_query_chars) for query in record["queries"]]}
+
+    def close(self):
+        self.writer.close()
@@ -0,0 +1,61 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, Callable, Optional
+
+from utils.config import settings
+
+# Executor for CPU-bound work (embedding, retrieval, indexing) so it never runs on the event loop
+cpu_executor = ThreadPoolExecutor(max_workers=settings.CPU_EXECUTOR_WORKERS, thread_name_prefix="cpu-worker")
+
+_query_semaphore: Optional[asyncio.Semaphore] = None
+
+
+class ConcurrencyLimitExceeded(Exception):
+    """Raised when no query slot frees up within QUERY_QUEUE_TIMEOUT"""
+
+
+async def run_in_executor(func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a blocking function on the CPU executor and await its result
+
+    Args:
+        func: The blocking function to run
+        *args: Positional arguments for the function
+        **kwargs: Keyword arguments for the function
+
+    Returns:
+        The function's return value
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(cpu_executor, partial(func, *args, **kwargs))
+
+
+def _get_query_semaphore() -> asyncio.Semaphore:
+    global _query_semaphore
+    if _query_semaphore is None:
+        _query_semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_QUERIES)
+    return _query_semaphore
+
+
+@asynccontextmanager
+async def query_slot():
+    """
+    Hold one of the MAX_CONCURRENT_QUERIES slots of this worker for the duration of the block
+
+    Raises:
+        ConcurrencyLimitExceeded: If no slot frees up within QUERY_QUEUE_TIMEOUT seconds
+    """
+    semaphore = _get_query_semaphore()
+    try:
+        await asyncio.wait_for(semaphore.acquire(), timeout=settings.QUERY_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise ConcurrencyLimitExceeded(
+            f"No query slot available within {settings.QUERY_QUEUE_TIMEOUT}s "
+            f"(limit: {settings.MAX_CONCURRENT_QUERIES} concurrent queries)"
+        )
+    try:
+        yield
+    finally:
+        semaphore.release()
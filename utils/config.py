@@ -1,6 +1,5 @@
 import os
 from pathlib import Path
-from haystack.utils import Secret
 
 
 class Settings:
@@ -12,23 +11,59 @@ class Settings:
     BASE_DIR = Path(__file__).resolve().parent.parent
     SCHEMA_DIR = BASE_DIR / "schemas"
     SCHEMA_PATH = SCHEMA_DIR / "intent_slot_schema.json"
-    QA_LOG_FILE = BASE_DIR / "qa_log.txt"
+    # Question/answer records, one JSON object per line (scripts/migrate_qa_log.py converts the old qa_log.txt)
+    QA_LOG_FILE = BASE_DIR / "qa_log.jsonl"
+    QA_LOG_ENABLED = True
+    QA_LOG_QUEUE_SIZE = 10000  # Records waiting for the writer thread
+    QA_LOG_BATCH_SIZE = 256  # Records written per batch at most
+    QA_LOG_FLUSH_INTERVAL = 1.0  # Seconds a record may wait before its batch is written
+    QA_LOG_MAX_BYTES = 50 * 1024 * 1024  # Rotate the file past this size
+    QA_LOG_BACKUP_COUNT = 5
+    QA_LOG_QUEUE_FULL_POLICY = "drop"  # "drop" the record, or "block" the query up to QA_LOG_BLOCK_TIMEOUT
+    QA_LOG_BLOCK_TIMEOUT = 1.0
+
+    # Traffic capture for scripts/replay.py: arrival time and sanitized queries of query requests
+    CAPTURE_ENABLED = False
+    CAPTURE_FILE = BASE_DIR / "logs" / "capture.jsonl"
+    CAPTURE_SAMPLE_RATE = 1.0  # Fraction of requests recorded
+    CAPTURE_MAX_QUERY_CHARS = 2000
+    CAPTURE_MAX_BYTES = 100 * 1024 * 1024  # Rotate the capture file past this size
 
     # Document store settings
-    DOCUMENT_STORE_TYPE = "in_memory"  # Can be changed to other types
+    # "in_memory", "persistent" (kept on local disk), "matrix" (contiguous NumPy embedding matrix with
+    # vectorized top-k, much faster exact search on large corpora) or "persistent_matrix"
+    DOCUMENT_STORE_TYPE = "in_memory"
+    DOCUMENT_STORE_PATH = BASE_DIR / "data" / "document_store"
+    # Journal of the per-file document catalog (persistent stores only)
+    DOCUMENT_CATALOG_PATH = BASE_DIR / "data" / "document_catalog.jsonl"
+    DOCUMENT_PAGE_SIZE = 100  # Files listed per /api/documents page by default
+    DOCUMENT_PAGE_MAX = 1000  # Largest page /api/documents accepts
+    DOCUMENT_STORE_FSYNC = True  # fsync every write so an acknowledged upload survives a crash
+    DOCUMENT_STORE_COMPACT_RATIO = 0.5  # Compact the log when this fraction of its records is obsolete
+    # Matrix stores only: keep embeddings as "none" (float32), "float16" or "int8" to cut RAM per chunk
+    EMBEDDING_QUANTIZATION = "none"
+    # Rescore RETRIEVER_TOP_K * this many quantized candidates with exact float32 embeddings read from disk
+    # (the document log, or RESCORE_EMBEDDINGS_PATH for the non-persistent store); 0 disables rescoring
+    RESCORE_FACTOR = 4
+    RESCORE_EMBEDDINGS_PATH = BASE_DIR / "data" / "rescore_embeddings.f32"
 
     # Model settings
     OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
-    OPENROUTER_API_KEY = Secret.from_token(os.getenv(
+    # Plain string so importing the settings does not import haystack; wrapped in a Secret where used
+    OPENROUTER_API_KEY = os.getenv(
         "OPENROUTER_API_KEY",
         "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"
-    ))
+    )
 
     # Intent processor model
     INTENT_MODEL = "qwen/qwen-2.5-7b-instruct"
     INTENT_MAX_TOKENS = 200
     INTENT_TEMPERATURE = 0.2
 
+    # Local intent classifier (nearest schema example by embedding), the LLM runs only below the threshold
+    LOCAL_INTENT_ENABLED = True
+    LOCAL_INTENT_THRESHOLD = 0.75  # Minimum cosine similarity to the nearest schema example
+
     # RAG model
     RAG_MODEL = "qwen/qwen-2.5-7b-instruct"
     RAG_MAX_TOKENS = 400
@@ -36,14 +71,73 @@ class Settings:
 
     # Embedding model
     EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+    # Load the model and run a dummy inference at startup; /api/ready reports false until this is done
+    WARMUP_ON_STARTUP = True
+
+    # Prometheus metrics on /metrics: query stage, pipeline component and ingestion timings
+    METRICS_ENABLED = True
+
+    # On-demand profiling: with PROFILING_ENABLED, requests to PROFILE_PATHS sending PROFILE_HEADER (or a
+    # PROFILE_SAMPLE_RATE fraction of them) are sampled every PROFILE_INTERVAL seconds and their folded
+    # stacks written to PROFILE_DIR, keeping the newest PROFILE_MAX_FILES
+    PROFILING_ENABLED = False
+    PROFILE_HEADER = "X-Profile"
+    PROFILE_SAMPLE_RATE = 0.0
+    PROFILE_PATHS = ("/api/query", "/api/upload")
+    PROFILE_INTERVAL = 0.005
+    PROFILE_DIR = BASE_DIR / "logs" / "profiles"
+    PROFILE_MAX_FILES = 200
 
     # Document processing
     SPLIT_BY = "sentence"
     SPLIT_LENGTH = 6
     SPLIT_OVERLAP = 1
+    # Uploads are read and indexed this many bytes (characters) at a time, bounding ingestion memory
+    UPLOAD_CHUNK_SIZE = 256 * 1024
+
+    # Background ingestion jobs
+    INGESTION_WORKERS = 2  # Indexing jobs running at once
+    INGESTION_SPOOL_DIR = BASE_DIR / "data" / "uploads"  # Uploaded files waiting to be indexed
+    INGESTION_SMALL_FILE_BYTES = 1024 * 1024  # Uploads up to this size default to high priority
+    INGESTION_JOB_HISTORY = 1000  # Finished jobs kept for GET /api/jobs/{id}
+    BULK_EMBED_BATCH_SIZE = 256  # Chunks pooled across files per embedder call in bulk ingestion
+
+    # Context packing: adjacent/overlapping chunks are merged, repeated sentences dropped and the
+    # context cut at a token budget per intent
+    CONTEXT_PACKING_ENABLED = True
+    CONTEXT_TOKEN_BUDGET = 1000  # Context tokens for intents without their own budget
+    CONTEXT_TOKEN_BUDGETS = {
+        "document_summary": 2000,
+        "find_definition": 500,
+        "document_metadata": 400
+    }
 
     # Retrieval settings
     RETRIEVER_TOP_K = 3
+    VECTOR_INDEX = "exact"  # "exact" scans every chunk, "ivf" uses an approximate index for large corpora
+    ANN_NLIST = 0  # IVF lists, 0 picks about sqrt(number of chunks)
+    ANN_NPROBE = 16  # IVF lists scanned per query: higher means better recall and slower queries
+    PARALLEL_RETRIEVAL = True  # Retrieve on the raw query while the intent LLM call is in flight
+
+    # Exact-match caches (0 disables)
+    INTENT_CACHE_SIZE = 1024  # Intent results keyed on normalized query and schema hash
+    EMBEDDING_CACHE_SIZE = 4096  # Query embeddings keyed on retrieval text and model name
+
+    # Semantic answer cache (nearest earlier query with the same intent and document-store version)
+    ANSWER_CACHE_ENABLED = True
+    ANSWER_CACHE_SIMILARITY = 0.95  # Minimum cosine similarity between query embeddings for a hit
+    ANSWER_CACHE_MAX_ENTRIES = 1000
+    ANSWER_CACHE_MAX_BYTES = 50 * 1024 * 1024
+    ANSWER_CACHE_TTL_SECONDS = 3600
+
+    # Concurrency settings (per worker process)
+    MAX_CONCURRENT_QUERIES = 8  # Queries processed at once, the rest wait for a free slot
+    QUERY_QUEUE_TIMEOUT = 30.0  # Seconds to wait for a free slot before answering 503
+    CPU_EXECUTOR_WORKERS = 4  # Threads for CPU-bound work (embedding, retrieval, indexing)
+
+    # Batch queries (/api/query/batch); a batch holds one query slot
+    BATCH_QUERY_MAX_SIZE = 1000  # Queries per request
+    BATCH_QUERY_CONCURRENCY = 16  # Intent and generation LLM calls in flight per batch
 
 
 settings = Settings()
\ No newline at end of file
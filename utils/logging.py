@@ -38,14 +38,3 @@ def setup_logging():
 
 logger = setup_logging()
 
-
-def log_qa_to_file(query: str, response: str):
-    """Log question and answer to a file"""
-    try:
-        with open(settings.QA_LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(f"Question: {query}\n")
-            f.write(f"Answer: {response}\n")
-            f.write("-" * 50 + "\n")
-        logger.info(f"QA pair logged: '{query}'")
-    except Exception as e:
-        logger.error(f"Error writing to QA log file: {str(e)}")
\ No newline at end of file
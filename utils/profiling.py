@@ -0,0 +1,116 @@
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List
+
+from utils.logging import logger
+
+# Leaf frames of threads waiting for work (executor workers, the event loop's select, condition waits);
+# samples ending in them are not time spent on the request
+IDLE_FRAMES = {
+    ("thread.py", "_worker"),
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+}
+
+PROFILER_THREAD_NAME = "sampling-profiler"
+
+
+def _frame_label(code) -> str:
+    path = Path(code.co_filename)
+    return f"{code.co_name} ({path.parent.name}/{path.name}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler sampling the Python stacks of all threads
+
+    A background thread reads `sys._current_frames()` every `interval` seconds, so work offloaded to the
+    CPU executor or other threads is captured along with the event loop. Samples of idle threads are
+    skipped. Stacks are aggregated in the "folded" format (`thread;outer;...;inner count` per line) that
+    flamegraph.pl, speedscope and inferno read directly.
+
+    Every thread of the process is sampled, so concurrent requests show up in each other's profiles.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        """
+        Initialize the profiler without starting it
+
+        Args:
+            interval: Seconds between samples
+        """
+        self.interval = interval
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=PROFILER_THREAD_NAME, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Dict[str, int]:
+        """Stop sampling and return the sample count per folded stack"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        return dict(self._stacks)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident, str(ident))
+                if name == PROFILER_THREAD_NAME:
+                    continue
+                code = frame.f_code
+                if (Path(code.co_filename).name, code.co_name) in IDLE_FRAMES:
+                    continue
+                stack: List[str] = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(name)
+                self._stacks[";".join(reversed(stack))] += 1
+
+
+def profile_name(label: str) -> str:
+    """Unique, time-sortable profile file name for a label like 'POST /api/query'"""
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", label).strip("-").lower()
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{uuid.uuid4().hex[:8]}.folded"
+
+
+def write_profile(directory: Path, name: str, stacks: Dict[str, int], max_files: int) -> Path:
+    """
+    Write folded stacks to `directory/name` and delete the oldest profiles beyond `max_files`
+
+    Args:
+        directory: Profile directory
+        name: File name
+        stacks: Sample count per folded stack
+        max_files: Profiles to keep
+
+    Returns:
+        Path of the written profile
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / name
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in sorted(stacks.items()):
+            f.write(f"{stack} {count}\n")
+
+    profiles = sorted(directory.glob("*.folded"), key=lambda profile: profile.stat().st_mtime)
+    for old in profiles[:max(len(profiles) - max_files, 0)]:
+        try:
+            os.remove(old)
+        except OSError as e:
+            logger.warning(f"Could not remove old profile {old}: {str(e)}")
+    return path
@@ -0,0 +1,228 @@
+import json
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from utils.logging import logger
+
+LEGACY_SEPARATOR = "-" * 50
+
+# Queue markers
+_STOP = object()
+
+
+class _Flush:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class QALogWriter:
+    """
+    Append question/answer records to a JSON-lines file from a background thread
+
+    The request path only puts a record on a bounded queue. A writer thread collects records into
+    batches and appends each batch with one write, once `batch_size` records are waiting or the oldest
+    has waited `flush_interval` seconds, so concurrent queries never interleave partial lines. The file
+    is rotated like `RotatingFileHandler` (`qa_log.jsonl` -> `qa_log.jsonl.1` ...) before a batch would
+    take it past `max_bytes`.
+
+    When the queue is full, the "drop" policy discards the record right away and "block" waits up to
+    `block_timeout` seconds for room before discarding it; dropped records are counted in the stats.
+    """
+
+    def __init__(self, path: Path, max_queue: int = 10000, batch_size: int = 256, flush_interval: float = 1.0,
+                 max_bytes: int = 50 * 1024 * 1024, backup_count: int = 5, queue_full_policy: str = "drop",
+                 block_timeout: float = 1.0, prepare: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None):
+        """
+        Initialize the writer; the thread starts on the first record
+
+        Args:
+            path: JSON-lines file to append to
+            max_queue: Records that may wait for the writer thread
+            batch_size: Records written per batch at most
+            flush_interval: Seconds a record may wait before its batch is written
+            max_bytes: Rotate before the file grows past this size (0 disables rotation)
+            backup_count: Rotated files to keep
+            queue_full_policy: "drop" or "block"
+            block_timeout: Seconds the "block" policy waits for room in the queue
+            prepare: Applied to each record on the writer thread before serializing (e.g. redaction)
+        """
+        if queue_full_policy not in ("drop", "block"):
+            raise ValueError(f"Unknown queue full policy: {queue_full_policy}")
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.queue_full_policy = queue_full_policy
+        self.block_timeout = block_timeout
+        self.prepare = prepare
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._file = None
+        self._drop_lock = threading.Lock()
+        self._stats = {"written": 0, "dropped": 0, "batches": 0, "rotations": 0, "write_errors": 0}
+
+    def write(self, record: Dict[str, Any]) -> bool:
+        """
+        Queue a record for writing
+
+        Args:
+            record: JSON-serializable record
+
+        Returns:
+            False if the record was dropped because the queue was full
+        """
+        self._ensure_started()
+        try:
+            if self.queue_full_policy == "block":
+                self._queue.put(record, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            with self._drop_lock:
+                self._stats["dropped"] += 1
+                dropped = self._stats["dropped"]
+            # Log the first drop and then every 1000th, not one line per query under overload
+            if dropped == 1 or dropped % 1000 == 0:
+                logger.warning(f"QA log queue full, {dropped} records dropped so far")
+            return False
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every record queued so far is written
+
+        Returns:
+            False on timeout
+        """
+        if self._thread is None:
+            return True
+        marker = _Flush()
+        self._queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 10.0):
+        """Write the queued records and stop the writer thread"""
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning("QA log writer did not finish writing within the timeout")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, "queued": self._queue.qsize(), "queue_full_policy": self.queue_full_policy}
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="qa-log-writer", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        batch: List[str] = []
+        flushes: List[_Flush] = []
+        deadline = None
+        stopping = False
+        while not stopping:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                stopping = True
+            elif isinstance(item, _Flush):
+                flushes.append(item)
+            elif item is not None:
+                try:
+                    record = self.prepare(item) if self.prepare is not None else item
+                    batch.append(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                except Exception as e:
+                    logger.error(f"Error serializing QA log record: {str(e)}")
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            due = deadline is not None and time.monotonic() >= deadline
+            if batch and (len(batch) >= self.batch_size or due or flushes or stopping):
+                self._write_batch(batch)
+                batch = []
+                deadline = None
+            elif not batch:
+                deadline = None
+            for marker in flushes:
+                marker.done.set()
+            flushes = []
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write_batch(self, lines: List[str]):
+        data = "".join(lines).encode("utf-8")
+        try:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, "ab")
+            if self.max_bytes and self._file.tell() > 0 and self._file.tell() + len(data) > self.max_bytes:
+                self._rotate()
+            self._file.write(data)
+            self._file.flush()
+            self._stats["written"] += len(lines)
+            self._stats["batches"] += 1
+        except OSError as e:
+            self._stats["write_errors"] += 1
+            logger.error(f"Error writing to QA log file: {str(e)}")
+
+    def _rotate(self):
+        self._file.close()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                source = self.path.with_name(f"{self.path.name}.{i}")
+                if source.exists():
+                    source.replace(self.path.with_name(f"{self.path.name}.{i + 1}"))
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+        self._file = open(self.path, "ab")
+        self._stats["rotations"] += 1
+
+
+def read_legacy_qa_log(path: Path) -> Iterator[Dict[str, str]]:
+    """
+    Read the old text QA log ("Question: ..." / "Answer: ..." / a line of dashes)
+
+    Answers may span several lines; a trailing entry without its separator is still returned.
+
+    Args:
+        path: The text log
+
+    Yields:
+        {"query": ..., "response": ...} per logged pair, oldest first
+    """
+    query, answer_lines = None, None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line == LEGACY_SEPARATOR and query is not None:
+                yield {"query": query, "response": "\n".join(answer_lines or [])}
+                query, answer_lines = None, None
+            elif line.startswith("Question: ") and answer_lines is None:
+                query = line[len("Question: "):]
+            elif line.startswith("Answer: ") and query is not None and answer_lines is None:
+                answer_lines = [line[len("Answer: "):]]
+            elif answer_lines is not None:
+                answer_lines.append(line)
+            elif query is not None:
+                # Question spanning several lines
+                query += "\n" + line
+    if query is not None:
+        yield {"query": query, "response": "\n".join(answer_lines or [])}
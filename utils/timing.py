@@ -0,0 +1,34 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Dict
+
+
+class StageTimer:
+    """Collects wall-clock timings (in milliseconds) of the stages of a request"""
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block as stage `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = (time.perf_counter() - start) * 1000
+
+    async def timed(self, name: str, awaitable: Awaitable) -> Any:
+        """Await `awaitable` and record its duration as stage `name`"""
+        with self.stage(name):
+            return await awaitable
+
+    def mark(self, name: str):
+        """Record the time elapsed since the start of the request as `name` (e.g. time to first token)"""
+        self.timings[name] = (time.perf_counter() - self._start) * 1000
+
+    def finish(self) -> Dict[str, float]:
+        """Record the total elapsed time and return all timings rounded to 0.1 ms"""
+        self.timings["total"] = (time.perf_counter() - self._start) * 1000
+        return {name: round(value, 1) for name, value in self.timings.items()}